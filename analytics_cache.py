@@ -0,0 +1,167 @@
+"""
+分析结果 (资产明细 + 标签聚合) 的硬盘缓存，页面、后台预热、进程池、命令行和 JSON 接口共用一份：
+
+    <数据库所在目录>/analytics_cache/u<user_id>/<代码版本>-<数据摘要>.assets.feather
+                                                                   .tags.feather
+
+- key = 成员 + 该成员的数据摘要 (core.fingerprint_digest) + 计算代码版本 (core.py 的哈希)：
+  只有改过数据的成员才会重算，其他成员重启后照样秒开；升级代码后旧文件不会再被读到。
+- 先写同目录的临时文件再 os.replace，进程中途被杀也不会留下半个文件。
+- 总大小超过 CACHE_MAX_BYTES 时，按最近访问时间 (读命中会刷新 mtime) 淘汰最旧的条目。
+- Feather 需要 pyarrow (已写进 requirements.txt)，读写时才导入。
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import core
+
+CACHE_DIR_NAME = 'analytics_cache'
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # 树莓派 SD 卡也放得下；一个成员几年的数据通常只有几 MB
+PARTS = ('assets', 'tags')
+
+# 计算代码版本：分析逻辑都在 core.py，它一改，旧的缓存文件就全部作废
+CODE_VERSION = hashlib.md5(Path(core.__file__).read_bytes()).hexdigest()[:12]
+
+
+class AnalyticsDiskCache:
+    """一个数据库一份缓存目录；多个进程同时读写也安全 (文件整体替换，删除时容忍已被别人删掉)"""
+
+    def __init__(self, root, max_bytes=CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _user_dir(self, user_id):
+        return self.root / f"u{int(user_id)}"
+
+    def _paths(self, user_id, digest):
+        stem = f"{CODE_VERSION}-{digest}"
+        return {part: self._user_dir(user_id) / f"{stem}.{part}.feather" for part in PARTS}
+
+    def contains(self, user_id, digest):
+        return all(p.exists() for p in self._paths(user_id, digest).values())
+
+    def get(self, user_id, digest):
+        """命中返回 (资产明细, 标签聚合)，否则 None；文件损坏当作未命中并删掉"""
+        import pandas as pd
+
+        paths = self._paths(user_id, digest)
+        try:
+            frames = {part: pd.read_feather(p) for part, p in paths.items()}
+            for p in paths.values():
+                os.utime(p)  # 记一次访问，LRU 淘汰看的就是它
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Analytics disk cache read failed, recomputing: {e}")
+            self._remove(paths.values())
+            return None
+        return frames['assets'], frames['tags']
+
+    def put(self, user_id, digest, df_assets, df_tags):
+        """写入一个条目 (没有资产数据就不存，重算也很便宜)；写失败只打日志，不影响页面"""
+        if df_assets is None or df_assets.empty:
+            return
+        import pandas as pd
+
+        paths = self._paths(user_id, digest)
+        frames = {'assets': df_assets, 'tags': df_tags if df_tags is not None else pd.DataFrame()}
+        try:
+            paths['assets'].parent.mkdir(parents=True, exist_ok=True)
+            for part in PARTS:
+                self._atomic_write(frames[part], paths[part])
+        except Exception as e:
+            print(f"Analytics disk cache write failed: {e}")
+            return
+        self._drop_stale_code_versions(user_id)
+        self.evict()
+
+    def invalidate(self, user_id=None):
+        """删掉一个成员的全部缓存 (user_id=None 时删掉所有成员的)"""
+        target = self.root if user_id is None else self._user_dir(user_id)
+        shutil.rmtree(target, ignore_errors=True)
+
+    def stats(self):
+        """(条目数, 总字节数)"""
+        entries = self._entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def evict(self):
+        """总大小超限时，从最久没用过的条目开始删"""
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for files, size, _ in sorted(entries, key=lambda e: e[2]):
+                if total <= self.max_bytes:
+                    break
+                self._remove(files)
+                total -= size
+
+    def _entries(self):
+        """[(该条目的文件列表, 字节数, 最近访问时间)]"""
+        groups = {}
+        for p in self.root.glob('u*/*.feather'):
+            try:
+                st = p.stat()
+            except FileNotFoundError:  # 别的进程刚删掉
+                continue
+            stem = p.name.rsplit('.', 2)[0]
+            files, size, mtime = groups.get((p.parent, stem), ([], 0, 0))
+            groups[(p.parent, stem)] = (files + [p], size + st.st_size, max(mtime, st.st_mtime))
+        return list(groups.values())
+
+    def _drop_stale_code_versions(self, user_id):
+        for p in self._user_dir(user_id).glob('*.feather'):
+            if not p.name.startswith(f"{CODE_VERSION}-"):
+                self._remove([p])
+
+    @staticmethod
+    def _atomic_write(df, path):
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')  # 不是 .feather，淘汰时不会被误删
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                df.reset_index(drop=True).to_feather(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @staticmethod
+    def _remove(files):
+        for p in files:
+            try:
+                os.unlink(p)
+            except FileNotFoundError:
+                pass
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+def get_disk_cache():
+    """当前数据库对应的缓存 (放在数据库文件旁边；--db 换了库就换一个目录)"""
+    root = os.path.join(os.path.dirname(os.path.abspath(core.DB_FILE)), CACHE_DIR_NAME)
+    with _CACHES_LOCK:
+        if root not in _CACHES:
+            _CACHES[root] = AnalyticsDiskCache(root)
+        return _CACHES[root]
+
+def load_or_compute(user_id, fp=None, rate_service=None):
+    """
+    先查硬盘缓存，没有再全量计算并写回。
+    返回 (资产明细, 标签聚合, 指纹)；fp 可以传进来，省一次指纹查询。
+    """
+    if fp is None:
+        fp = core.analytics_fingerprint(user_id)
+    digest = core.fingerprint_digest(fp)
+    cache = get_disk_cache()
+    hit = cache.get(user_id, digest)
+    if hit is not None:
+        return hit[0], hit[1], fp
+    df_assets, df_tags = core.compute_analytics(user_id, rate_service=rate_service)
+    cache.put(user_id, digest, df_assets, df_tags)
+    return df_assets, df_tags, fp
@@ -0,0 +1,306 @@
+"""
+本地只读 JSON 接口 (标准库 http.server)，和 Streamlit 并排跑，给 Home Assistant 之类的轮询用：
+
+    python api.py --port 8502 [--host 0.0.0.0] [--db /share/asset_tracker.db]
+
+    GET /api/users
+    GET /api/<用户名或 user_id>/totals                 最新总资产/本金/收益
+    GET /api/<用户>/drawdown                           回撤与 ATH 水位
+    GET /api/<用户>/allocations?group=资产大类         最新标签配置 (不传 group 返回全部标签组)
+    GET /api/<用户>/rebalance?group=资产大类           按已保存目标计算的调仓方案
+        可选参数: band=容忍带(±百分点) cash=新增资金 sell=0(只用新增资金，不卖出) min_trade=默认最小交易额
+    GET /api/<用户>/forecast?days=30                   未来定投资金需求 (days: 1 ~ 3650)
+
+参数格式不对或超出范围时回 400，错误信息里写明是哪个参数。
+
+结果按数据版本 (数据库文件 mtime + 大小) 缓存，和页面的分析缓存同一套失效规则；
+全量分析结果和页面共用硬盘缓存 (analytics_cache.py)，重启接口不用把每个成员重算一遍。
+ETag 也由数据版本 + 日期 + 请求地址生成，带 If-None-Match 轮询时，数据没变直接回 304，不做任何计算。
+"""
+import argparse
+import hashlib
+import json
+import math
+import sys
+import threading
+import traceback
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import analytics_cache
+import core
+
+
+class NotFound(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    """查询参数不合法 (回 400，不是服务端出错)"""
+    pass
+
+
+class AnalyticsCache:
+    """
+    每个用户一份 {version, assets, tags, monitor}，数据版本变了才重算；
+    同一用户的并发请求只算一次 (按用户加锁)。
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, user_id):
+        with self._guard:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+    def get(self, user_id, version):
+        with self._lock(user_id):
+            entry = self._entries.get(user_id)
+            if entry is None or entry['version'] != version:
+                df_assets, df_tags, _ = analytics_cache.load_or_compute(user_id)
+                monitor = None
+                if df_assets is not None and not df_assets.empty:
+                    monitor = core.monitor_series(user_id, df_assets)
+                entry = {'version': version, 'assets': df_assets, 'tags': df_tags, 'monitor': monitor}
+                self._entries[user_id] = entry
+            return entry
+
+
+def _round(x):
+    return round(float(x), 2)
+
+
+def _number(query, name, default, cast=float, min_value=None, max_value=None):
+    """读一个数字参数；格式不对或超出范围时抛 BadRequest，错误信息里带参数名"""
+    raw = query.get(name, '')
+    if raw == '':
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise BadRequest(f"参数 {name} 不是有效的数字: {raw}") from None
+    if not math.isfinite(value):
+        raise BadRequest(f"参数 {name} 不是有效的数字: {raw}")
+    if min_value is not None and value < min_value:
+        raise BadRequest(f"参数 {name} 不能小于 {min_value}: {raw}")
+    if max_value is not None and value > max_value:
+        raise BadRequest(f"参数 {name} 不能大于 {max_value}: {raw}")
+    return value
+
+
+def _latest_monitor(entry):
+    if entry['monitor'] is None:
+        raise NotFound("暂无资产数据")
+    return entry['monitor'].iloc[-1]
+
+
+def totals(entry, user_id, query):
+    last = _latest_monitor(entry)
+    cost = float(last['cost'])
+    return {
+        'date': last['date'].strftime('%Y-%m-%d'),
+        'amount': _round(last['amount']),
+        'cost': _round(cost),
+        'principal': _round(last['final_principal']),
+        'profit': _round(last['profit']),
+        'yield_pct': _round((last['amount'] - cost) / cost * 100) if cost else 0.0,
+        'principal_from_cashflows': bool(last['from_cashflows']),
+    }
+
+
+def drawdown(entry, user_id, query):
+    last = _latest_monitor(entry)
+    return {
+        'date': last['date'].strftime('%Y-%m-%d'),
+        'amount': _round(last['amount']),
+        'ath': _round(last['rolling_max']),
+        'dd_pct': _round(last['dd_pct']),
+        'dd_amt': _round(last['dd_amt']),
+        'max_dd_pct': _round(last['max_dd_pct']),
+        'max_dd_amt': _round(last['max_dd_amt']),
+        'profit': _round(last['profit']),
+        'ath_profit': _round(last['ath_profit']),
+    }
+
+
+def allocations(entry, user_id, query):
+    df_tags = entry['tags']
+    if df_tags is None or df_tags.empty:
+        raise NotFound("暂无标签数据")
+    latest = df_tags[df_tags['date'] == df_tags['date'].max()]
+    group = query.get('group')
+    if group:
+        latest = latest[latest['tag_group'] == group]
+        if latest.empty:
+            raise NotFound(f"没有标签组: {group}")
+    result = {}
+    for tag_group, rows in latest.groupby('tag_group', sort=False):
+        total = rows['amount'].sum()
+        result[tag_group] = [{
+            'tag_name': r.tag_name, 'amount': _round(r.amount), 'profit': _round(r.profit),
+            'pct': _round(r.amount / total * 100) if total else 0.0,
+            'yield_pct': _round(r.yield_rate), 'is_complete': bool(r.is_complete),
+        } for r in rows.sort_values('amount', ascending=False).itertuples()]
+    return {'date': df_tags['date'].max().strftime('%Y-%m-%d'), 'groups': result}
+
+
+def rebalance(entry, user_id, query):
+    df_tags = entry['tags']
+    group = query.get('group')
+    if not group:
+        raise BadRequest("缺少参数 group")
+    # 先校验参数再查数据 (取值范围与再平衡页面的输入框一致)
+    band = _number(query, 'band', 0.0, min_value=0, max_value=50)
+    cash = _number(query, 'cash', 0.0, min_value=0)
+    allow_sell = query.get('sell', '1') not in ('0', 'false', 'no')
+    min_trade = _number(query, 'min_trade', core.REBALANCE_MIN_TRADE, min_value=0)
+    if df_tags is None or df_tags.empty:
+        raise NotFound("暂无标签数据")
+    current_portfolio, total = core.latest_tag_portfolio(df_tags, group)
+    df_targets = core.load_rebalance_targets(user_id, group)
+    if df_targets.empty:
+        raise NotFound(f"没有标签组: {group}")
+    target_sum = float(df_targets['target_percentage'].sum())
+    df_calc, cash_left = core.rebalance_plan(df_targets, current_portfolio, total, band, cash, allow_sell, min_trade)
+    return {
+        'tag_group': group,
+        'total': _round(total),
+        'target_sum_pct': _round(target_sum),
+        'targets_valid': abs(target_sum - 100) <= 0.01,
+        'band_pct': band, 'new_cash': _round(cash), 'allow_sell': allow_sell, 'cash_left': _round(cash_left),
+        'rows': [{
+            'tag_name': r.tag_name, 'amount': _round(r.amount), 'target_pct': _round(r.target_percentage),
+            'target_amount': _round(r.target_amount), 'diff_amount': _round(r.diff_amount),
+            'trade_amount': _round(r.trade_amount), 'post_pct': _round(r.post_pct), 'in_band': bool(r.in_band),
+        } for r in df_calc.sort_values('trade_amount', ascending=False).itertuples()],
+    }
+
+
+FORECAST_MAX_DAYS = 3650  # 定投预测最多往后看 10 年
+
+def forecast(entry, user_id, query):
+    days = _number(query, 'days', 30, cast=int, min_value=1, max_value=FORECAST_MAX_DAYS)
+    active_plans, _ = core.load_active_plans(user_id)
+    df_proj = core.project_plan_cashflows(active_plans, core.load_rate_service().latest_map(),
+                                          date.today(), future_days=days)
+    daily = df_proj.groupby('date')['amount_cny'].sum()
+    by_asset = df_proj.groupby('asset_name')['amount_cny'].sum().sort_values(ascending=False)
+    total = float(df_proj['amount_cny'].sum())
+    return {
+        'days': days,
+        'total_cny': _round(total),
+        'daily_avg_cny': _round(total / days),
+        'daily': [{'date': str(d), 'amount_cny': _round(v)} for d, v in daily.items()],
+        'by_asset': [{'asset_name': n, 'amount_cny': _round(v)} for n, v in by_asset.items()],
+    }
+
+
+# 接口名 -> (处理函数, 是否需要分析数据)
+ENDPOINTS = {
+    'totals': (totals, True),
+    'drawdown': (drawdown, True),
+    'allocations': (allocations, True),
+    'rebalance': (rebalance, True),
+    'forecast': (forecast, False),
+}
+
+
+INTERNAL_ERROR_MESSAGE = "服务器内部错误"
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    cache = AnalyticsCache()
+    # 已生成的响应体：(数据版本, 日期, 地址) -> bytes，数据版本一变自然作废
+    responses = {}
+    responses_lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        version = core.get_data_version()
+        # 定投预测是“从今天起”的，日期也算进版本里
+        etag = '"%s"' % hashlib.md5(f"{version}|{date.today()}|{url.path}?{url.query}".encode()).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, None, etag)
+            return
+
+        key = (version, date.today(), self.path)
+        body = self.responses.get(key)
+        if body is None:
+            try:
+                payload = self._dispatch(unquote(url.path), {k: v[-1] for k, v in parse_qs(url.query).items()}, version)
+            except BadRequest as e:
+                self._send(400, json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8'))
+                return
+            except NotFound as e:
+                self._send(404, json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8'))
+                return
+            except Exception:
+                # 异常内容 (可能带 SQL、文件路径、数据) 只打在服务端日志里，客户端只拿到固定的提示
+                print(f"Internal error on {self.path}:\n{traceback.format_exc()}", file=sys.stderr)
+                self._send(500, json.dumps({'error': INTERNAL_ERROR_MESSAGE}, ensure_ascii=False).encode('utf-8'))
+                return
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            with self.responses_lock:
+                # 只保留当前数据版本的响应
+                for k in [k for k in self.responses if k[:2] != key[:2]]:
+                    del self.responses[k]
+                self.responses[key] = body
+        self._send(200, body, etag)
+
+    def _dispatch(self, path, query, version):
+        parts = [p for p in path.split('/') if p]
+        if parts == ['api', 'users']:
+            return [{'user_id': uid, 'username': name} for uid, name in core.list_user_ids()]
+        if len(parts) != 3 or parts[0] != 'api' or parts[2] not in ENDPOINTS:
+            raise NotFound(f"未知接口: {path}")
+        user_id = core.resolve_user_id(parts[1])
+        if user_id is None:
+            raise NotFound(f"找不到用户: {parts[1]}")
+        handler, needs_analytics = ENDPOINTS[parts[2]]
+        entry = self.cache.get(user_id, version) if needs_analytics else None
+        return handler(entry, user_id, query)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        # 允许缓存，但每次都要带 ETag 回来确认 (数据没变就是一个 304)
+        self.send_header('Cache-Control', 'no-cache')
+        if body is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="个人资产管理系统 - 本地只读 JSON 接口")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--db', help="数据库文件路径 (默认 asset_tracker.db)")
+    parser.add_argument('--verbose', action='store_true', help="打印每个请求")
+    args = parser.parse_args(argv)
+    if args.db:
+        core.DB_FILE = args.db
+
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    server.verbose = args.verbose
+    print(f"✅ JSON 接口已启动: http://{args.host}:{args.port}/api/users", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+命令行入口：不开浏览器也能跑分析、备份、AI 复盘和推演 (适合树莓派 cron)
+
+    python cli.py analytics --all                 # 每个成员的最新总额与回撤
+    python cli.py backup --if-due                 # 按“系统设置”里的频率备份
+    python cli.py ai-prompt --user 爸爸 --group 资产大类 --start 2025-01-01 --end 2025-06-30
+    python cli.py plans --user 爸爸 --days 30     # 未来定投资金需求
+    python cli.py fire --user 爸爸 --age 30       # FIRE 复利推演
+
+全历史数据导出见 exporter.py。只有用到的子命令才会加载 pandas。
+"""
+import argparse
+import json
+import sys
+
+
+def _users(args):
+    """--user / --all -> [(user_id, username)]"""
+    import core
+
+    if getattr(args, 'all', False):
+        return core.list_user_ids()
+    user_id = core.resolve_user_id(args.user)
+    if user_id is None:
+        raise SystemExit(f"找不到用户: {args.user}")
+    return [(user_id, args.user)]
+
+
+def _emit(args, payload, lines):
+    """--json 时输出 JSON，否则输出给人看的文字"""
+    if args.json:
+        print(json.dumps(payload, ensure_ascii=False, indent=2, default=str))
+    else:
+        print('\n'.join(lines))
+
+
+def cmd_analytics(args):
+    import core
+
+    users = _users(args)
+    # 多个成员时分给进程池并行算
+    computed = core.compute_analytics_many([uid for uid, _ in users], parallel=not args.serial)
+    results, lines = [], []
+    for user_id, username in users:
+        df_assets, df_tags, monitor, _ = computed[user_id]
+        if df_assets is None or df_assets.empty:
+            results.append({'user_id': user_id, 'username': username, 'date': None})
+            lines.append(f"👤 {username}: 暂无资产数据")
+            continue
+        last = monitor.iloc[-1]
+        results.append({
+            'user_id': user_id, 'username': username, 'date': last['date'].strftime('%Y-%m-%d'),
+            'amount': float(last['amount']), 'principal': float(last['final_principal']),
+            'profit': float(last['profit']), 'ath': float(last['rolling_max']),
+            'dd_pct': float(last['dd_pct']), 'max_dd_pct': float(last['max_dd_pct']),
+            'assets': int(df_assets['asset_id'].nunique()),
+            'tag_rows': 0 if df_tags is None else len(df_tags),
+        })
+        r = results[-1]
+        lines.append(f"👤 {username} ({r['date']}): 总资产 ¥{r['amount']:,.0f} | 本金 ¥{r['principal']:,.0f} | "
+                     f"累计收益 ¥{r['profit']:,.0f} | 当前回撤 {r['dd_pct']:.2f}% (最大 {r['max_dd_pct']:.2f}%)")
+    _emit(args, results, lines)
+
+
+def cmd_backup(args):
+    import core
+
+    if args.if_due:
+        conn = core.get_db_connection()
+        try:
+            row = conn.execute('SELECT backup_frequency, last_backup_at FROM system_settings WHERE id = 1').fetchone()
+        finally:
+            conn.close()
+        if not row or not core.backup_due(row['backup_frequency'], row['last_backup_at']):
+            print("⏭️ 还没到备份时间", file=sys.stderr)
+            return 0
+    success, msg = core.perform_backup(manual=not args.if_due)
+    print(("✅ " if success else "❌ ") + msg, file=sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_ai_prompt(args):
+    import core
+
+    (user_id, _), = _users(args)
+    if args.print:
+        success, msg = core.build_ai_prompt(user_id, args.group, args.start, args.end)
+        print(msg if success else "❌ " + msg, file=sys.stdout if success else sys.stderr)
+    else:
+        success, msg = core.generate_and_send_ai_prompt(user_id, args.group, args.start, args.end)
+        print(("✅ " if success else "❌ ") + msg, file=sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_plans(args):
+    from datetime import datetime
+    import core
+
+    (user_id, username), = _users(args)
+    active_plans, _ = core.load_active_plans(user_id)
+    df_proj = core.project_plan_cashflows(active_plans, core.load_rate_service().latest_map(),
+                                          datetime.now().date(), future_days=args.days)
+    daily = df_proj.groupby('date')['amount_cny'].sum()
+    total = float(df_proj['amount_cny'].sum())
+    lines = [f"🗓️ {username} 未来 {args.days} 天定投: ¥{total:,.2f} (平均每日 ¥{total / args.days:,.2f})"]
+    lines += [f"  {d}  ¥{v:,.2f}" for d, v in daily.items()]
+    _emit(args, {'total_cny': total, 'days': args.days,
+                 'daily': [{'date': str(d), 'amount_cny': float(v)} for d, v in daily.items()]}, lines)
+
+
+def cmd_fire(args):
+    import core
+
+    (user_id, username), = _users(args)
+    if args.base_wan is None:
+        base_amount = core.current_total_assets_cny(user_id, core.load_rate_service().latest_map())
+    else:
+        base_amount = args.base_wan * 10000
+    income, coverage, fire_number = core.fire_kpis(base_amount, args.expense)
+    df_proj = core.project_fire(base_amount, args.addition_wan * 10000, args.age, args.rate, args.inflation,
+                                years_to_project=args.years)
+    rows = df_proj[df_proj.index % 5 == 0]
+    lines = [f"🔥 {username}: 当前 ¥{base_amount / 10000:,.2f}万 | 每月被动收入 (4%) ¥{income:,.0f} | "
+             f"生活费覆盖率 {coverage:.1f}% | FIRE 目标 ¥{fire_number / 10000:,.0f}万"]
+    lines += [f"  {int(r.year)} ({int(r.age)} 岁): 名义 {r.balance_w:,.0f}万 | 真实购买力 {r.balance_real_w:,.0f}万 | "
+              f"累计本金 {r.principal_w:,.0f}万" for r in rows.itertuples()]
+    _emit(args, {'base_amount': base_amount, 'monthly_passive_income': income, 'coverage_pct': coverage,
+                 'fire_number': fire_number, 'projection': df_proj.to_dict('records')}, lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="个人资产管理系统 - 命令行")
+    parser.add_argument('--db', help="数据库文件路径 (默认 asset_tracker.db)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('analytics', help="重算分析数据并输出最新总额与回撤")
+    who = p.add_mutually_exclusive_group(required=True)
+    who.add_argument('--user', help="用户名或 user_id")
+    who.add_argument('--all', action='store_true', help="所有家庭成员 (多核时并行计算)")
+    p.add_argument('--serial', action='store_true', help="不用进程池，逐个成员计算")
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(func=cmd_analytics)
+
+    p = sub.add_parser('backup', help="本地备份数据库 (配置了邮箱则同时发邮件)")
+    p.add_argument('--if-due', action='store_true', help="按系统设置里的备份频率判断，没到时间就跳过")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser('ai-prompt', help="生成 AI 复盘提示词并发邮件")
+    p.add_argument('--user', required=True)
+    p.add_argument('--group', required=True, help="复盘的标签组，如 资产大类")
+    p.add_argument('--start', required=True, help="YYYY-MM-DD")
+    p.add_argument('--end', required=True, help="YYYY-MM-DD")
+    p.add_argument('--print', action='store_true', help="只打印提示词，不发邮件")
+    p.set_defaults(func=cmd_ai_prompt)
+
+    p = sub.add_parser('plans', help="未来 N 天定投资金需求 (折合人民币)")
+    p.add_argument('--user', required=True)
+    p.add_argument('--days', type=int, default=30)
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(func=cmd_plans)
+
+    p = sub.add_parser('fire', help="FIRE 复利推演")
+    p.add_argument('--user', required=True)
+    p.add_argument('--base-wan', type=float, help="起始资产 (万)，默认取最新快照总额")
+    p.add_argument('--addition-wan', type=float, default=20.0, help="每年追加 (万)")
+    p.add_argument('--age', type=int, default=28)
+    p.add_argument('--rate', type=float, default=8.0, help="预期年化收益率 (%%)")
+    p.add_argument('--inflation', type=float, default=3.0, help="通胀率 (%%)")
+    p.add_argument('--expense', type=float, default=10000, help="理想月生活费 (元)")
+    p.add_argument('--years', type=int, default=40)
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(func=cmd_fire)
+
+    args = parser.parse_args(argv)
+    if args.db:
+        import core
+        core.DB_FILE = args.db
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
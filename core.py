@@ -0,0 +1,1140 @@
+"""
+纯数据逻辑：数据库、汇率、分析计算、本金序列、备份、AI 提示词、定投与 FIRE 推演。
+
+这里不依赖 streamlit，页面 (app.py) 和命令行 (cli.py) 共用同一套计算；
+pandas / numpy 一律在函数内部延迟导入，只用到备份之类轻量功能时不会加载它们。
+"""
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+SHARE_DB_FILE = '/share/asset_tracker.db'
+# 数据库文件：/share/asset_tracker.db 已经存在就用它 (Home Assistant 加载项里 /share 重启、升级都不会丢)，
+# 否则沿用当前目录的 asset_tracker.db —— 以前的版本一直用这一份，升级后不会换成一个空库。
+# 页面、命令行、JSON 接口、导出和硬盘缓存都从这里取路径 (cli.py / api.py 的 --db 会覆盖它)
+DB_FILE = SHARE_DB_FILE if os.path.isfile(SHARE_DB_FILE) else 'asset_tracker.db'
+
+
+# ==============================================================================
+# 🗄️ 数据库工具函数
+# ==============================================================================
+def get_db_connection():
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def json_ids(ids):
+    """
+    把一组 id 打包成【一个】JSON 参数，配合 `IN (SELECT value FROM json_each(?))` 使用：
+    SQL 文本固定不变 (语句缓存/执行计划可复用)，也不会碰到 SQLite 的变量个数和语句长度上限。
+    """
+    return json.dumps([int(i) for i in ids])
+
+def get_data_version():
+    """
+    数据版本号：用数据库文件的修改时间 + 大小做指纹。
+    任何一次 commit 都会让它变化，适合作为各类缓存的 key。
+    """
+    try:
+        info = os.stat(DB_FILE)
+        return f"{info.st_mtime_ns}-{info.st_size}"
+    except OSError:
+        return "0"
+
+def resolve_user_id(user):
+    """用户名或 user_id -> user_id，找不到返回 None"""
+    conn = get_db_connection()
+    try:
+        row = conn.execute('SELECT user_id FROM users WHERE username = ?', (str(user),)).fetchone()
+        if row is None and str(user).isdigit():
+            row = conn.execute('SELECT user_id FROM users WHERE user_id = ?', (int(user),)).fetchone()
+    finally:
+        conn.close()
+    return None if row is None else row['user_id']
+
+def list_user_ids():
+    """所有家庭成员的 (user_id, username)"""
+    conn = get_db_connection()
+    try:
+        return [(r['user_id'], r['username']) for r in conn.execute('SELECT user_id, username FROM users ORDER BY user_id')]
+    finally:
+        conn.close()
+
+
+# ==============================================================================
+# 💱 汇率服务
+# ==============================================================================
+class RateService:
+    """
+    内存汇率矩阵 (行=日期, 列=币种)，数据来自 exchange_rates 全表。
+    三类查询都是 O(1) 的数组下标运算：
+      - latest(currency)         最新一次录入的汇率
+      - on_date(date, currency)  当天录入的汇率，没录返回 None
+      - as_of(date, currency)    截至当天最近一次的汇率 (forward-fill)
+    早于第一条记录的日期用最早的汇率兜底；CNY 恒为 1.0；从未录过的币种按 1.0 处理。
+    """
+
+    def __init__(self, df_rates, start, end):
+        import numpy as np
+        import pandas as pd
+
+        self.start = np.datetime64(start, 'D')
+        n_days = int((np.datetime64(end, 'D') - self.start).astype(int)) + 1
+
+        currencies = sorted(set(df_rates['currency'].dropna()) | {'CNY'})
+        self.col = {c: i for i, c in enumerate(currencies)}
+
+        # exact: 只有真正录入过的格子有值；filled: 向前填充后的稠密矩阵
+        exact = np.full((n_days, len(currencies)), np.nan)
+        if not df_rates.empty:
+            rows = (df_rates['date'].to_numpy().astype('datetime64[D]') - self.start).astype(int)
+            cols = df_rates['currency'].map(self.col).to_numpy()
+            exact[rows, cols] = df_rates['rate'].to_numpy(dtype=float)
+        exact[:, self.col['CNY']] = 1.0
+        self.exact = exact
+        self.filled = pd.DataFrame(exact).ffill().bfill().fillna(1.0).to_numpy()
+
+    def _row(self, date):
+        import numpy as np
+        offset = int((np.datetime64(date, 'D') - self.start).astype(int))
+        return min(max(offset, 0), len(self.filled) - 1)
+
+    def latest(self, currency, default=1.0):
+        c = self.col.get(currency)
+        return default if c is None else float(self.filled[-1, c])
+
+    def latest_map(self):
+        return {cur: float(self.filled[-1, c]) for cur, c in self.col.items()}
+
+    def on_date(self, date, currency):
+        import numpy as np
+        c = self.col.get(currency)
+        offset = int((np.datetime64(date, 'D') - self.start).astype(int))
+        if c is None or not 0 <= offset < len(self.exact):
+            return None
+        val = self.exact[offset, c]
+        return None if np.isnan(val) else float(val)
+
+    def as_of(self, date, currency, default=1.0):
+        c = self.col.get(currency)
+        return default if c is None else float(self.filled[self._row(date), c])
+
+    def as_of_many(self, dates, currencies):
+        """向量化版本的 as_of：dates / currencies 为等长的 Series，返回汇率数组"""
+        import numpy as np
+
+        rows = (dates.to_numpy().astype('datetime64[D]') - self.start).astype(int)
+        rows = np.clip(rows, 0, len(self.filled) - 1)
+        cols = currencies.fillna('CNY').map(self.col).to_numpy(dtype=float)
+        found = ~np.isnan(cols)
+        rates = np.ones(len(rows))
+        rates[found] = self.filled[rows[found], cols[found].astype(int)]
+        return rates
+
+
+def load_rate_service():
+    """从 exchange_rates 全表构建汇率服务 (页面里按数据版本缓存，命令行里每次现算)"""
+    import pandas as pd
+
+    local_conn = sqlite3.connect(DB_FILE)
+    try:
+        df_rates = pd.read_sql("SELECT date, currency, rate FROM exchange_rates", local_conn)
+        snap_range = local_conn.execute("SELECT MIN(date), MAX(date) FROM snapshots").fetchone()
+    finally:
+        local_conn.close()
+
+    # 日期范围：覆盖所有快照日期、汇率日期，并延伸到今天
+    df_rates['date'] = pd.to_datetime(df_rates['date'])
+    bounds = [pd.Timestamp(datetime.now().date())]
+    bounds += [pd.Timestamp(d) for d in snap_range if d]
+    if not df_rates.empty:
+        bounds += [df_rates['date'].min(), df_rates['date'].max()]
+    return RateService(df_rates, min(bounds), max(bounds))
+
+
+# ==============================================================================
+# 📊 分析计算：资产明细 (折合人民币) + 标签聚合
+# ==============================================================================
+def compute_analytics(user_id, since=None, rate_service=None):
+    """
+    分析数据的计算主体 (原 process_analytics_data)。
+    since 不为空时只计算 date >= since 的快照，供增量追加使用。
+    rate_service 不传时现场从数据库加载 (命令行场景)。
+    返回 (资产明细, 标签聚合)，没有快照时返回 (None, None)。
+    """
+    # 延迟加载重型库
+    import pandas as pd
+    
+    # 函数内部建立连接 (因为连接对象不能被缓存)
+    local_conn = sqlite3.connect(DB_FILE)
+    
+    try:
+        # --- 原有逻辑开始 ---
+        # 1. 获取基础数据 (按日期排序，保证增量拼接后顺序一致)
+        df_raw = pd.read_sql('''
+            SELECT s.date, s.asset_id, s.amount, s.profit, s.cost, s.yield_rate, a.name, a.currency, a.type
+            FROM snapshots s
+            JOIN assets a ON s.asset_id = a.asset_id
+            WHERE a.user_id = ? AND s.date >= ?
+            ORDER BY s.date, s.asset_id
+        ''', local_conn, params=(user_id, since or ''))
+
+        if df_raw.empty:
+            return None, None
+
+        df_raw['date'] = pd.to_datetime(df_raw['date'])
+        
+        # 2. 获取汇率服务 (内存中的稠密汇率矩阵，已按“截至当天最近汇率”填充)
+        if rate_service is None:
+            rate_service = load_rate_service()
+
+        # 3. 汇率匹配与折算 (当天没录汇率时沿用之前最近的一次，而不是按 1.0 折算)
+        df_merged = df_raw.copy()
+        df_merged['rate'] = rate_service.as_of_many(df_merged['date'], df_merged['currency'])
+
+        df_merged['amount_cny'] = df_merged['amount'] * df_merged['rate']
+        df_merged['profit_cny'] = df_merged['profit'] * df_merged['rate']
+        df_merged['cost_cny'] = df_merged['cost'] * df_merged['rate']
+        
+        # 4. 获取标签 (🔥 恢复全量查询，不在这里剔除，以免影响其他图表)
+        df_tags = pd.read_sql('''
+            SELECT t.tag_group, t.tag_name, atm.asset_id
+            FROM tags t
+            JOIN asset_tag_map atm ON t.tag_id = atm.tag_id
+            WHERE t.user_id = ?
+        ''', local_conn, params=(user_id,))
+
+        # --- 🔥 准备工作：获取“已清仓”资产 ID 集合 ---
+        # 仅用于下方的完整性校验逻辑
+        cleared_assets_set = set()
+        status_df = pd.read_sql('SELECT asset_id, is_cleared FROM snapshots ORDER BY date DESC', local_conn)
+        if not status_df.empty:
+            # 这里的 drop_duplicates 会保留每个 asset_id 的最新一条记录
+            latest_status = status_df.drop_duplicates(subset=['asset_id'])
+            # 拿到所有最新状态为 1 (已清仓) 的 ID
+            cleared_assets_set = set(latest_status[latest_status['is_cleared'] == 1]['asset_id'].tolist())
+
+        # 5. 标签聚合计算
+        tag_analytics = []
+        if not df_tags.empty:
+            merged_tags = pd.merge(df_merged, df_tags, on='asset_id', how='inner')
+            
+            # 🔥 核心修改：预先计算每个标签组下【理论上应该有哪些资产 ID】
+            # 变成字典：{ ('资产大类', '基金'): {1, 2, 3}, ... }
+            tag_expected_ids_map = df_tags.groupby(['tag_group', 'tag_name'])['asset_id'].apply(set).to_dict()
+            
+            grouped = merged_tags.groupby(['date', 'tag_group', 'tag_name'])
+            
+            for name, group in grouped:
+                date, tag_group, tag_name = name
+                total_amount = group['amount_cny'].sum()
+                total_profit = group['profit_cny'].sum()
+                total_cost = group['cost_cny'].sum()
+                weighted_yield = (total_profit / total_cost * 100) if total_cost != 0 else 0.0
+                
+                # --- 🔥 微调后的校验逻辑 ---
+                # 1. 理论应有的资产 ID 集合
+                expected_ids = tag_expected_ids_map.get((tag_group, tag_name), set())
+                # 2. 实际当日录入的资产 ID 集合
+                current_ids = set(group['asset_id'])
+                
+                # 3. 计算缺失的 ID
+                missing_ids = expected_ids - current_ids
+                
+                # 4. 关键一步：从缺失名单中，剔除掉那些“已清仓”的
+                # 如果缺失的资产本来就是已清仓的，那就不算缺失
+                real_missing_ids = missing_ids - cleared_assets_set
+                
+                tag_analytics.append({
+                    'date': date, 'tag_group': tag_group, 'tag_name': tag_name,
+                    'amount': total_amount, 'profit': total_profit, 'cost': total_cost,
+                    'yield_rate': weighted_yield, 
+                    # 只有当【真正】缺失的数量为 0 时，才算完整
+                    'is_complete': len(real_missing_ids) == 0,
+                    'missing_count': len(real_missing_ids)
+                })
+                
+        df_tags_agg = pd.DataFrame(tag_analytics)
+        
+        # 构造返回
+        df_final_assets = df_merged.copy()
+        df_final_assets['amount'] = df_final_assets['amount_cny']
+        df_final_assets['profit'] = df_final_assets['profit_cny']
+        df_final_assets['cost'] = df_final_assets['cost_cny']
+        
+        return df_final_assets, df_tags_agg
+        
+    finally:
+        local_conn.close()
+
+def analytics_fingerprint(user_id):
+    """
+    轻量指纹 (几条 SQL，不做任何 pandas 计算)，用来判断“哪些日期变了”：
+      dates: 每个快照日期当天全部快照行 (资产、金额、收益、成本、收益率、清仓标记) 的 md5，
+             改任何一个字段都会变，不会出现两处修改恰好互相抵消的情况
+      rates: 每个汇率日期的 (币种, 汇率)
+      meta:  资产属性、标签关联、清仓状态 —— 这些一变就会影响全部历史
+    """
+    conn = sqlite3.connect(DB_FILE)  # 纯元组结果，便于直接比较/哈希
+    try:
+        rows = conn.execute('''
+            SELECT s.date, s.asset_id, s.amount, s.profit, s.cost, s.yield_rate, s.is_cleared
+            FROM snapshots s
+            JOIN assets a ON s.asset_id = a.asset_id
+            WHERE a.user_id = ?
+            ORDER BY s.date, s.asset_id
+        ''', (user_id,))
+        dates = {d: hashlib.md5(repr([r[1:] for r in day]).encode()).hexdigest()
+                 for d, day in itertools.groupby(rows, key=lambda r: r[0])}
+
+        rates = {}
+        for d, curr, rate in conn.execute("SELECT date, currency, rate FROM exchange_rates ORDER BY date, currency"):
+            rates.setdefault(d, []).append((curr, rate))
+
+        meta = hashlib.md5()
+        meta.update(repr(conn.execute(
+            'SELECT asset_id, name, code, currency, type FROM assets WHERE user_id = ? ORDER BY asset_id',
+            (user_id,)).fetchall()).encode())
+        meta.update(repr(conn.execute('''
+            SELECT t.tag_group, t.tag_name, atm.asset_id
+            FROM tags t JOIN asset_tag_map atm ON t.tag_id = atm.tag_id
+            WHERE t.user_id = ? ORDER BY t.tag_group, t.tag_name, atm.asset_id
+        ''', (user_id,)).fetchall()).encode())
+        meta.update(repr(conn.execute('''
+            SELECT s.asset_id FROM snapshots s
+            JOIN assets a ON s.asset_id = a.asset_id
+            WHERE a.user_id = ? AND s.is_cleared = 1
+              AND s.date = (SELECT MAX(date) FROM snapshots WHERE asset_id = s.asset_id)
+            ORDER BY s.asset_id
+        ''', (user_id,)).fetchall()).encode())
+    finally:
+        conn.close()
+
+    return {'dates': dates, 'rates': rates, 'meta': meta.hexdigest()}
+
+def fingerprint_digest(fp):
+    """指纹压成一个短哈希：同一成员的数据没变，摘要就不变 (别的成员改数据不影响它)"""
+    return hashlib.md5(repr(sorted(fp['dates'].items())).encode()
+                       + repr(sorted(fp['rates'].items())).encode()
+                       + fp['meta'].encode()).hexdigest()
+
+
+# ==============================================================================
+# 🌊 本金序列与水位监控
+# ==============================================================================
+def load_principal_series(user_id):
+    """
+    从现金流表计算累计净投入本金 (收入=+，支出=-)。
+    返回 [date, cumulative_principal]，没有现金流记录时返回空表。
+    """
+    import pandas as pd
+    import numpy as np
+
+    conn = get_db_connection()
+    try:
+        df_cf = pd.read_sql("SELECT date, type, amount FROM cashflows WHERE user_id = ?", conn, params=(user_id,))
+    finally:
+        conn.close()
+    if df_cf.empty:
+        return pd.DataFrame(columns=['date', 'cumulative_principal'])
+
+    df_cf['date'] = pd.to_datetime(df_cf['date'])
+    df_cf['net_flow'] = np.where(df_cf['type'] == '收入', df_cf['amount'], -df_cf['amount'])
+    df_principal = df_cf.groupby('date')['net_flow'].sum().sort_index().cumsum().reset_index()
+    return df_principal.rename(columns={'net_flow': 'cumulative_principal'})
+
+def build_daily_totals(df_assets, df_principal):
+    """
+    每日总资产/总成本 + 当日对应的累计本金 (final_principal)。
+    没有现金流记录时，降级使用快照里的 cost 作为本金。
+    """
+    import pandas as pd
+
+    daily = df_assets.groupby('date')[['amount', 'cost']].sum().reset_index().sort_values('date')
+    if df_principal is not None and not df_principal.empty:
+        daily = pd.merge_asof(daily, df_principal, on='date', direction='backward')
+        daily['final_principal'] = daily['cumulative_principal'].fillna(0)
+        daily = daily.drop(columns=['cumulative_principal'])
+        daily['from_cashflows'] = True
+    else:
+        daily['final_principal'] = daily['cost']
+        daily['from_cashflows'] = False
+    return daily.reset_index(drop=True)
+
+def compute_monitor_series(daily, seed=None):
+    """
+    在每日总额上计算水位指标 (每一行都是“截至当天”的值)：
+      profit       累计收益 = 总资产 - 本金
+      rolling_max  历史最高资产 (ATH)
+      dd_amt/pct   当前回撤
+      max_dd_*     截至当天的最大回撤
+      ath_profit   截至当天的最高累计收益
+    seed: 已有序列的最后一行，增量追加新日期时用来接续滚动最大值。
+    """
+    import numpy as np
+
+    m = daily.copy()
+    amount = m['amount'].to_numpy(dtype=float)
+    profit = amount - m['final_principal'].to_numpy(dtype=float)
+
+    rolling_max = np.maximum.accumulate(amount)
+    if seed is not None:
+        rolling_max = np.maximum(rolling_max, seed['rolling_max'])
+    dd_amt = rolling_max - amount
+    dd_pct = np.divide(dd_amt * 100, rolling_max, out=np.zeros_like(dd_amt), where=rolling_max > 0)
+
+    max_dd_pct = np.maximum.accumulate(dd_pct)
+    max_dd_amt = np.maximum.accumulate(dd_amt)
+    ath_profit = np.maximum.accumulate(profit)
+    if seed is not None:
+        max_dd_pct = np.maximum(max_dd_pct, seed['max_dd_pct'])
+        max_dd_amt = np.maximum(max_dd_amt, seed['max_dd_amt'])
+        ath_profit = np.maximum(ath_profit, seed['ath_profit'])
+
+    m['profit'] = profit
+    m['rolling_max'] = rolling_max
+    m['dd_amt'] = dd_amt
+    m['dd_pct'] = dd_pct
+    m['max_dd_pct'] = max_dd_pct
+    m['max_dd_amt'] = max_dd_amt
+    m['ath_profit'] = ath_profit
+    return m
+
+def monitor_series(user_id, df_assets):
+    """每日总额 + 水位指标的一次性全量计算 (页面里有增量缓存版 get_monitor_series)"""
+    return compute_monitor_series(build_daily_totals(df_assets, load_principal_series(user_id)))
+
+
+# ==============================================================================
+# 🧵 多成员并行计算：每个家庭成员的数据互不依赖，分给多个进程同时算
+# ==============================================================================
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def default_workers():
+    """树莓派 4/5 都是 4 核，再多也只是排队"""
+    return max(1, min(os.cpu_count() or 1, 4))
+
+def get_process_pool():
+    """
+    进程池单例，跨多次刷新复用 (worker 里的 pandas 只导入一次)。
+    用 spawn 启动：父进程 (Streamlit) 里已经有别的线程，fork 出来的子进程可能卡在它们持有的锁上。
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            _POOL = ProcessPoolExecutor(max_workers=default_workers(),
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _POOL
+
+def _analytics_job(db_path, user_id):
+    """
+    在 worker 进程里跑一个成员看板要用的全部 pandas 计算：
+    资产明细、标签聚合 (先查硬盘缓存)、水位序列，以及看板默认的年度财富归因 (连同现金流本金)。
+    """
+    global DB_FILE
+    DB_FILE = db_path
+    import analytics_cache  # 它依赖本模块，只能在这里导入
+
+    df_assets, df_tags, _ = analytics_cache.load_or_compute(user_id)
+    monitor, attribution = None, None
+    if df_assets is not None and not df_assets.empty:
+        principal = load_principal_series(user_id)
+        monitor = compute_monitor_series(build_daily_totals(df_assets, principal))
+        yearly = compute_wealth_attribution(monitor[['date', 'amount']], principal, ATTRIBUTION_GRANULARITY["年度"][0])
+        attribution = {'principal': principal, 'frames': {"年度": yearly}}
+    return df_assets, df_tags, monitor, attribution
+
+def compute_analytics_many(user_ids, parallel=True):
+    """
+    多个成员一起全量计算，返回 {user_id: (资产明细, 标签聚合, 水位序列, 财富归因)}；
+    财富归因是 {'principal': 现金流本金, 'frames': {粒度: 归因表}}，没有资产数据时水位和归因都是 None。
+    只有一个成员、单核或 parallel=False 时就在当前进程里算 (省掉进程间传输 DataFrame 的开销)。
+    """
+    if not parallel or len(user_ids) <= 1 or default_workers() <= 1:
+        return {uid: _analytics_job(DB_FILE, uid) for uid in user_ids}
+    pool = get_process_pool()
+    futures = {uid: pool.submit(_analytics_job, DB_FILE, uid) for uid in user_ids}
+    return {uid: f.result() for uid, f in futures.items()}
+
+
+# 财富归因的统计粒度：显示名 -> (pandas Period 频率, 周期单位)
+ATTRIBUTION_GRANULARITY = {"年度": ("Y", "年"), "季度": ("Q", "季"), "月度": ("M", "月")}
+
+def compute_wealth_attribution(daily, df_principal, freq):
+    """
+    按周期拆分资产增量 = 净投入本金 + 市场收益。
+      daily:        每日总资产 [date, amount] (已按日期排序)
+      df_principal: 现金流累计本金 [date, cumulative_principal]
+      freq:         'Y' / 'Q' / 'M'
+    期末资产取每个周期最后一个快照日；净投入是周期内所有现金流之和 (没有快照的周期不展示)。
+    """
+    import numpy as np
+
+    periods = daily['date'].dt.to_period(freq)
+    df = daily.groupby(periods)['amount'].last().rename('end_amount').to_frame()
+    # 第一期默认从 0 开始 (即第一期增量就是期末余额)
+    df['prev_amount'] = df['end_amount'].shift(1).fillna(0)
+    df['asset_delta'] = df['end_amount'] - df['prev_amount']
+
+    if df_principal is not None and not df_principal.empty:
+        # 累计本金差分回逐日净流入 (收入=+，支出=-)，再按周期求和
+        cum = df_principal['cumulative_principal'].to_numpy(dtype=float)
+        flows = df_principal.assign(net_flow=np.diff(cum, prepend=0.0))
+        net_input = flows.groupby(flows['date'].dt.to_period(freq))['net_flow'].sum()
+        df['net_input'] = net_input.reindex(df.index, fill_value=0.0)
+    else:
+        df['net_input'] = 0.0
+
+    df['market_alpha'] = df['asset_delta'] - df['net_input']
+    for c in ['end_amount', 'asset_delta', 'net_input', 'market_alpha']:
+        df[f'{c}_w'] = df[c] / 10000
+    df.index = df.index.astype(str)
+    return df.rename_axis('period').reset_index()
+
+
+# ==============================================================================
+# 💾 备份
+# ==============================================================================
+def send_email_backup(filepath, settings):
+    """发送带有数据库附件的邮件 (修复 SSL 关闭报错版)"""
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.application import MIMEApplication
+
+    if not settings['email_host'] or not settings['email_user'] or not settings['email_password']:
+        return False, "邮箱配置不完整"
+
+    try:
+        msg = MIMEMultipart()
+        msg['Subject'] = f'【自动备份】资产数据备份 - {datetime.now().strftime("%Y-%m-%d")}'
+        msg['From'] = settings['email_user']
+        msg['To'] = settings['email_to'] if settings['email_to'] else settings['email_user']
+        
+        # 正文
+        body = "这是您的个人资产管理系统数据库自动备份，请妥善保管。\n\n"
+        body += f"备份时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        msg.attach(MIMEText(body, 'plain'))
+
+        # 附件
+        filename = os.path.basename(filepath)
+        with open(filepath, "rb") as f:
+            part = MIMEApplication(f.read(), Name=filename)
+            part['Content-Disposition'] = f'attachment; filename="{filename}"'
+            msg.attach(part)
+
+        # --- 核心修改开始：手动管理连接，忽略退出错误 ---
+        server = smtplib.SMTP_SSL(settings['email_host'], settings['email_port'])
+        try:
+            server.login(settings['email_user'], settings['email_password'])
+            server.send_message(msg)
+            
+            # 邮件已发送成功，尝试礼貌退出，但如果报错则忽略
+            try:
+                server.quit()
+            except Exception:
+                pass  # 忽略 (-1, b'\x00\x00\x00') 这种退出错误
+            
+            return True, "邮件发送成功"
+            
+        except Exception as e:
+            # 只有发送过程中的错误才是真正的失败
+            return False, f"发送中断: {str(e)}"
+        finally:
+            # 确保连接关闭
+            try:
+                server.close()
+            except Exception:
+                pass
+        # --- 核心修改结束 ---
+
+    except Exception as e:
+        return False, f"邮件准备失败: {str(e)}"
+
+
+def perform_backup(manual=False):
+    """执行备份：1.本地复制 2.发送邮件 3.更新时间"""
+    import shutil
+
+    conn = get_db_connection()
+    settings = conn.execute('SELECT * FROM system_settings WHERE id = 1').fetchone()
+    
+    # 1. 准备目录
+    backup_dir = "backups"
+    if not os.path.exists(backup_dir):
+        os.makedirs(backup_dir)
+        
+    # 2. 生成本地备份文件
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"asset_tracker_{timestamp}.db"
+    backup_path = os.path.join(backup_dir, filename)
+    
+    try:
+        # 为了防止复制时数据库正在写入，虽然 sqlite 允许读时复制，但稳妥起见我们用 connection 的 backup API 或者简单 copy
+        # 简单 copy 对于单用户系统通常足够
+        shutil.copy2(DB_FILE, backup_path)
+        
+        log_msg = f"本地备份已保存: {filename}"
+        email_status = "未配置邮件"
+        
+        # 3. 发送邮件
+        if settings['email_host']:
+            success, msg = send_email_backup(backup_path, settings)
+            email_status = "邮件已发送" if success else f"邮件失败: {msg}"
+        
+        # 4. 更新上次备份时间
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn.execute('UPDATE system_settings SET last_backup_at = ? WHERE id = 1', (now_str,))
+        conn.commit()
+        
+        conn.close()
+        return True, f"{log_msg} | {email_status}"
+    
+    except Exception as e:
+        conn.close()
+        return False, f"备份出错: {e}"
+
+def backup_due(freq, last_at, now=None):
+    """按备份频率 ('关闭'/'每天'/'每周'/'每月') 和上次备份时间判断现在是否该备份"""
+    if freq == '关闭':
+        return False
+    if not last_at:
+        return True
+    now = now or datetime.now()
+    delta = now - datetime.strptime(last_at, '%Y-%m-%d %H:%M:%S')
+    return ((freq == '每天' and delta.days >= 1)
+            or (freq == '每周' and delta.days >= 7)
+            or (freq == '每月' and delta.days >= 30))
+
+
+# ==============================================================================
+# 🤖 AI 顾问提示词
+# ==============================================================================
+def build_ai_prompt(user_id, target_group, start_date_str, end_date_str, df_assets=None, df_tags=None, daily_monitor=None):
+    """
+    生成 AI 顾问提示词 (CIO 宏观视角版 - 包含精准水位与本金分析)
+    df_assets / df_tags / daily_monitor 不传时现场计算 (页面里传缓存好的结果)。
+    返回 (是否成功, 提示词或错误信息)。
+    """
+    import pandas as pd
+
+    # --- 2. 搜集与计算核心数据 (对齐看板逻辑) ---
+    # A. 获取资产快照
+    if df_assets is None:
+        df_assets, df_tags = compute_analytics(user_id)
+
+    if df_assets is None or df_assets.empty:
+        return False, "暂无资产数据，无法生成分析。"
+
+    # 转换日期格式
+    start_date = pd.to_datetime(start_date_str)
+    end_date = pd.to_datetime(end_date_str)
+
+    # B/C/D. 每日总资产、真实本金 (Cashflows)、收益与水位指标
+    if daily_monitor is None:
+        daily_monitor = monitor_series(user_id, df_assets)
+
+    # --- 3. 提取关键节点数据 ---
+    
+    # 获取 起点(Start) 和 终点(End) 的行数据
+    # 使用 asof 或直接查找 (这里假设 start_date 可能不是交易日，用 asof 找最近的前一天比较稳妥，或者精确匹配)
+    # 为了简化，这里先尝试精确匹配，匹配不到找最近的
+    
+    def get_closest_row(target_date):
+        # 找小于等于 target_date 的最后一条 (日期已排序，二分查找)
+        pos = daily_monitor['date'].searchsorted(target_date, side='right')
+        if pos == 0: return None
+        return daily_monitor.iloc[pos - 1]
+
+    row_start = get_closest_row(start_date)
+    row_end = get_closest_row(end_date)
+
+    if row_end is None:
+        return False, f"找不到 {end_date_str} 之前的任何数据。"
+
+    # 提取端点值
+    # 期初
+    s_amt = row_start['amount'] if row_start is not None else 0.0
+    s_prin = row_start['final_principal'] if row_start is not None else 0.0
+    s_prof = row_start['profit'] if row_start is not None else 0.0
+    
+    # 期末
+    e_amt = row_end['amount']
+    e_prin = row_end['final_principal']
+    e_prof = row_end['profit']
+    
+    # 计算期间变动
+    period_yield_val = e_prof - s_prof # 期间产生的利润
+    # 期间收益率 (分母用 期初本金 或 期初资产，这里用期初资产作为参考)
+    period_yield_pct = (period_yield_val / s_amt * 100) if s_amt > 0 else 0.0
+
+    # --- 4. 六大水位指标 (截至 End Date) ---
+    # 序列的每一行都是“截至当天”的滚动值，所以直接取期末那一行即可，无需再截取历史重算
+    curr_asset = e_amt
+    ath_asset = row_end['rolling_max']
+    curr_dd_pct = row_end['dd_pct']
+    curr_dd_amt = row_end['dd_amt']
+    max_dd_pct = row_end['max_dd_pct']
+    max_dd_amt = row_end['max_dd_amt']
+    curr_profit = e_prof
+    max_profit = row_end['ath_profit'] # 历史最高累计收益
+
+    # --- 5. 核心持仓结构 (占比 > 0.5%) ---
+    target_assets = df_assets[df_assets['date'] == end_date].copy()
+    target_assets = target_assets.sort_values('amount', ascending=False)
+    target_assets['ratio'] = target_assets['amount'] / e_amt if e_amt > 0 else 0
+    
+    significant_assets = target_assets[target_assets['ratio'] > 0.005]
+    
+    holdings_str = ""
+    if significant_assets.empty:
+        holdings_str = "无单一资产占比超过 0.5%。"
+    else:
+        for i, row in significant_assets.iterrows():
+            currency_info = f" ({row['currency']})" if 'currency' in row and row['currency'] != 'CNY' else ""
+            holdings_str += f"- {row['name']}{currency_info}: ¥{row['amount']:,.0f} (占比 {row['ratio']*100:.2f}%)\n"
+
+    # --- 6. 维度配置变化复盘 (Start vs End) ---
+    analysis_str = ""
+    if df_tags is not None and not df_tags.empty:
+        # 注意：这里需要重新按照 start_date 和 end_date 筛选 tags 数据
+        # 因为 df_tags 是预计算好的，可以直接过滤
+        tags_start = df_tags[(df_tags['date'] == start_date) & (df_tags['tag_group'] == target_group)].copy()
+        tags_end = df_tags[(df_tags['date'] == end_date) & (df_tags['tag_group'] == target_group)].copy()
+        
+        # 如果 precise match 失败，尝试找最近的 (简单处理：如果为空就不展示了，或者你可以加类似 get_closest 的逻辑)
+        # 这里保持原逻辑，假设 tags 数据是连续的
+        
+        tags_start = tags_start[['tag_name', 'amount']].rename(columns={'amount': 's_amt'})
+        tags_end = tags_end[['tag_name', 'amount']].rename(columns={'amount': 'e_amt'})
+        
+        df_compare = pd.merge(tags_end, tags_start, on='tag_name', how='outer').fillna(0)
+        
+        df_compare['s_ratio'] = (df_compare['s_amt'] / s_amt * 100) if s_amt > 0 else 0.0
+        df_compare['e_ratio'] = (df_compare['e_amt'] / e_amt * 100) if e_amt > 0 else 0.0
+        
+        df_compare = df_compare.sort_values('e_amt', ascending=False)
+        
+        analysis_str += f"基于【{target_group}】维度的变化对比：\n"
+        for _, row in df_compare.iterrows():
+            if row['s_amt'] < 100 and row['e_amt'] < 100: continue
+            analysis_str += (
+                f"- **{row['tag_name']}**:\n"
+                f"  - 资金: ¥{row['s_amt']:,.0f} ➡️ ¥{row['e_amt']:,.0f}\n"
+                f"  - 占比: {row['s_ratio']:.1f}% ➡️ {row['e_ratio']:.1f}%\n"
+            )
+    else:
+        analysis_str = "(暂无标签数据)"
+
+    # --- 7. 组装 Prompt 模板 (更新版) ---
+    prompt_content = f"""
+===== 请将以下内容完整发送给 AI (如 ChatGPT/Claude) =====
+
+# Role / 角色设定
+**你是一位拥有华尔街顶级投行背景的首席投资官 (CIO)。**
+你精通全球宏观经济分析、大类资产配置策略（如耶鲁模式、全天候策略）以及行为金融学。你不仅关注账户的绝对数字，更擅长将个人投资组合的表现置于宏观市场背景下进行“归因分析”。你的分析风格是：客观、犀利、数据驱动，并能给出可落地的战术建议。
+
+# Context / 复盘背景
+- **复盘周期**：{start_date_str} 至 {end_date_str}
+- **用户画像**：中国个人投资者，以人民币计价。
+
+# Internal Data / 内部投资组合数据
+
+## 1. 资金面概况 (Financial Overview)
+
+### A. 周期端点快照 (Snapshot)
+- **期初 ({start_date_str})**:
+  - 投入本金: ¥{s_prin:,.0f}
+  - 累计收益: ¥{s_prof:,.0f}
+  - 资产总值: ¥{s_amt:,.0f}
+- **期末 ({end_date_str})**:
+  - 投入本金: ¥{e_prin:,.0f}
+  - 累计收益: ¥{e_prof:,.0f}
+  - 资产总值: ¥{e_amt:,.0f}
+
+**👉 期间变化**: 本金投入变动 ¥{e_prin - s_prin:+,.0f}，期间创造利润 ¥{period_yield_val:+,.0f}。
+
+### B. 风险水位监控 (截至期末 {end_date_str})
+> 以下指标基于全历史数据统计：
+- **当前总资产**: ¥{curr_asset:,.0f} (历史最高 ATH: ¥{ath_asset:,.0f})
+- **当前回撤**: {curr_dd_pct:.2f}% (浮亏金额: -¥{curr_dd_amt:,.0f})
+- **历史最大回撤**: {max_dd_pct:.2f}% (最大亏损额: -¥{max_dd_amt:,.0f})
+- **当前累计收益**: ¥{curr_profit:,.0f} (历史最高收益: ¥{max_profit:,.0f})
+
+## 2. 核心持仓 (Top Holdings > 0.5%)
+{holdings_str}
+
+## 3. 结构演变 (维度：{target_group})
+{analysis_str}
+
+---
+
+# Action Required / 你的任务
+请务必执行以下步骤进行分析：
+
+## 第一步：外部市场环境扫描 (必须联网搜索)
+请利用你的联网能力，**查询 {start_date_str} 至 {end_date_str} 期间的以下市场数据**，作为分析的基准锚点：
+1.  **关键指数表现**：纳斯达克100 (NDX)、标普500 (SPX)、黄金 (Gold)。
+2.  **核心宏观事件**：期间是否有美联储议息、重大地缘政治事件、或科技巨头(如 NVDA/AAPL)的财报发布？
+
+## 第二步：深度归因分析
+基于查询到的外部数据和上述内部数据，回答以下两个问题：
+
+### 1. 风险与收益评估 (Risk & Return)
+- **水位分析**：用户当前的累计收益 ({curr_profit:,.0f}) 距离历史最高收益 ({max_profit:,.0f}) 还有多远？结合当前的回撤水平 ({curr_dd_pct:.2f}%)，评价当前账户的“安全垫”厚度。
+- **阿尔法验证**：用户的期间利润 ({period_yield_val:+,.0f}) 是来自市场的 Beta 普涨，还是用户的 Alpha 选择？(对比同期的指数表现)
+
+### 2. 战术建议 (Tactical Advice)
+- **再平衡指引**：基于期末的持仓结构和当前宏观环境，给出具体的调仓建议。
+
+================================
+    """
+    return True, prompt_content
+
+
+def generate_and_send_ai_prompt(user_id, target_group, start_date_str, end_date_str, df_assets=None, df_tags=None, daily_monitor=None):
+    """生成 AI 顾问提示词并发到备份邮箱"""
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    # --- 1. 获取系统设置 ---
+    conn = get_db_connection()
+    try:
+        settings = conn.execute('SELECT * FROM system_settings WHERE id = 1').fetchone()
+    finally:
+        conn.close()
+    if not settings['email_host']:
+        return False, "未配置邮箱 SMTP，无法发送。"
+
+    ok, prompt_content = build_ai_prompt(user_id, target_group, start_date_str, end_date_str,
+                                         df_assets, df_tags, daily_monitor)
+    if not ok:
+        return False, prompt_content
+
+    # --- 8. 发送邮件 ---
+    try:
+        msg = MIMEMultipart()
+        msg['Subject'] = f'🤖 AI 宏观对冲复盘 ({start_date_str} ~ {end_date_str})'
+        msg['From'] = settings['email_user']
+        msg['To'] = settings['email_to'] if settings['email_to'] else settings['email_user']
+        
+        body = "这是为您自动生成的 CIO 级深度复盘提示词。\n\n" + prompt_content
+        msg.attach(MIMEText(body, 'plain'))
+
+        server = smtplib.SMTP_SSL(settings['email_host'], settings['email_port'])
+        server.login(settings['email_user'], settings['email_password'])
+        server.send_message(msg)
+        server.quit()
+        
+        return True, f"已发送 {start_date_str} 至 {end_date_str} 的深度分析提示词！"
+    except Exception as e:
+        return False, f"邮件发送失败: {str(e)}"
+
+
+# ==============================================================================
+# ⚖️ 再平衡
+# ==============================================================================
+def latest_tag_portfolio(df_tags, tag_group):
+    """标签聚合里最新一天、指定标签组的持仓 [tag_name, amount, ...]，以及该组总额"""
+    latest_date = df_tags['date'].max()
+    current_portfolio = df_tags[
+        (df_tags['date'] == latest_date) &
+        (df_tags['tag_group'] == tag_group)
+    ].copy()
+    return current_portfolio, current_portfolio['amount'].sum()
+
+def load_rebalance_targets(user_id, tag_group):
+    """该标签组下所有标签 + 已保存的目标占比 (没设过的按 0%) 和最小交易额 (0 表示用默认值)"""
+    import pandas as pd
+
+    conn = get_db_connection()
+    try:
+        saved_targets = pd.read_sql(
+            "SELECT * FROM rebalance_targets WHERE user_id = ? AND tag_group = ?",
+            conn, params=(user_id, tag_group)
+        )
+        # 这样即使用户还没持有某个标签的资产，也能给它设目标（准备买入）
+        all_tags_in_group = pd.read_sql(
+            "SELECT tag_name FROM tags WHERE user_id = ? AND tag_group = ?",
+            conn, params=(user_id, tag_group)
+        )
+    finally:
+        conn.close()
+    if 'min_trade' not in saved_targets:  # 还没迁移过的老库
+        saved_targets['min_trade'] = 0.0
+    df_targets = pd.merge(all_tags_in_group, saved_targets[['tag_name', 'target_percentage', 'min_trade']],
+                          on='tag_name', how='left')
+    df_targets['target_percentage'] = df_targets['target_percentage'].fillna(0.0)
+    df_targets['min_trade'] = df_targets['min_trade'].fillna(0.0)
+    return df_targets
+
+def rebalance_deltas(df_targets, current_portfolio, total_asset_val):
+    """
+    理想金额 = 总资产 * 目标% ；diff_amount = 理想金额 - 实际持有 (正数买入，负数卖出)。
+    以目标表为主：还没买的标签持有金额按 0 计。
+    """
+    import pandas as pd
+
+    df_calc = pd.merge(
+        df_targets[['tag_name', 'target_percentage']],
+        current_portfolio[['tag_name', 'amount']],
+        on='tag_name',
+        how='left'
+    )
+    df_calc['amount'] = df_calc['amount'].fillna(0.0)
+    df_calc['target_amount'] = total_asset_val * (df_calc['target_percentage'] / 100.0)
+    df_calc['diff_amount'] = df_calc['target_amount'] - df_calc['amount']
+    return df_calc
+
+REBALANCE_MIN_TRADE = 100.0  # 默认最小交易额 (元)：再小的调仓不值得做
+
+def _water_fill(amount, gap, cap):
+    """
+    把 amount 按“缺口最大的先补”分下去：y_i = clip(gap_i - λ, 0, cap_i)，找 λ 使 Σy = amount。
+    Σy 随 λ 分段线性单调递减，在所有拐点上一次性向量化求值再线性插值，不用迭代。
+    """
+    import numpy as np
+
+    cap = np.maximum(cap, 0.0)
+    if amount <= 0 or cap.sum() <= 0:
+        return np.zeros_like(gap)
+    if amount >= cap.sum():
+        return cap.copy()
+    knots = np.unique(np.concatenate([gap, gap - cap]))
+    filled = np.clip(gap[None, :] - knots[:, None], 0.0, cap[None, :]).sum(axis=1)
+    # 第一个拐点 filled == cap.sum() > amount，最后一个 filled == 0，所以 k >= 1
+    k = int(np.argmax(filled <= amount))
+    hi, lo = filled[k - 1], filled[k]
+    lam = knots[k - 1] + (hi - amount) / (hi - lo) * (knots[k] - knots[k - 1])
+    return np.clip(gap - lam, 0.0, cap)
+
+def _settle(rest, x, a, target, lo, hi, frozen):
+    """
+    把资金差额 rest 分到各标签上 (正数买入、负数卖出)，使 Σx 正好等于新增资金。按顺序放宽，直到分完：
+      1. 没取消的标签，不越出区间；2. 连取消了零碎单的标签也用上，仍不越出区间；
+      3. 没取消的标签越出区间 (买入不设上限，卖出最多卖光)；4. 所有标签越出区间。
+    容忍带和最小交易额抬高的那些单子可能让区间内的余地不够，这时宁可越界或留一笔零碎单，也不让方案凭空缺钱。
+    """
+    import numpy as np
+
+    everyone = np.ones(a.shape, dtype=bool)
+    for eligible, in_band in ((~frozen, True), (everyone, True), (~frozen, False), (everyone, False)):
+        if abs(rest) <= 1e-9:
+            break
+        post = a + x
+        if rest > 0:
+            cap = hi - post if in_band else np.full(a.shape, rest)
+            y = _water_fill(rest, target - post, np.where(eligible, cap, 0.0))
+        else:
+            cap = post - lo if in_band else post
+            y = -_water_fill(-rest, post - target, np.where(eligible, cap, 0.0))
+        x = x + y
+        rest -= y.sum()
+    return x
+
+def solve_rebalance(amounts, target_pct, band_pct=0.0, new_cash=0.0, allow_sell=True,
+                    min_trade=REBALANCE_MIN_TRADE):
+    """
+    成交额最小的调仓方案 (numpy 数组进出)。
+    调仓后总额 T = 当前总额 + 新增资金，每个标签的目标区间是 [(目标% - 容忍带) T, (目标% + 容忍带) T]：
+      - 可以卖出时：越界的标签只拉回到区间边界 (必须的成交)，剩下的资金差额再按“离目标最远的先处理”
+        分给区间内还有余地的标签。总成交额 Σ|x| 因此最小，同样的成交额下又尽量贴近目标；
+        方案总是自负盈亏 (Σx == 新增资金)，区间内放不下时见 _settle 的放宽顺序。
+      - 只用新增资金时 (allow_sell=False)：新增资金全部买入，缺口最大的先补，不超过区间上沿。
+      - min_trade (标量或逐个标签)：低于它的零碎单一次取消一笔 (最小的那笔)，钱重新分给其他标签，
+        直到没有零碎单；容忍带为 0 时就相当于原来“忽略小额噪音”的做法。
+    返回 (交易额：正数买入、负数卖出, 没投出去的现金 (负数表示还差多少))。
+    """
+    import numpy as np
+
+    a = np.asarray(amounts, dtype=float)
+    w = np.asarray(target_pct, dtype=float) / 100.0
+    m = np.broadcast_to(np.asarray(min_trade, dtype=float), a.shape)
+    total = a.sum() + new_cash
+    target = w * total
+    lo = np.maximum(w - band_pct / 100.0, 0.0) * total
+    hi = (w + band_pct / 100.0) * total
+
+    frozen = np.zeros(a.shape, dtype=bool)  # 取消了零碎单的标签，不再参与分配
+    while True:
+        if allow_sell:
+            buy = np.where(frozen, 0.0, np.maximum(lo - a, 0.0))
+            sell = np.where(frozen, 0.0, np.maximum(a - hi, 0.0))
+            # 必须的单子不足最小交易额时抬到最小额 (不越过区间另一侧)
+            buy = np.where(buy > 0, np.minimum(np.maximum(buy, m), hi - a), 0.0)
+            sell = np.where(sell > 0, np.minimum(np.maximum(sell, m), a - lo), 0.0)
+            x = buy - sell
+            x = _settle(new_cash - x.sum(), x, a, target, lo, hi, frozen)
+        else:
+            x = _water_fill(new_cash, target - a, np.where(frozen, 0.0, hi - a))
+
+        small = ~frozen & (np.abs(x) > 1e-6) & (np.abs(x) < m - 1e-6)
+        if not small.any():
+            return x, new_cash - x.sum()
+        idx = np.flatnonzero(small)
+        frozen[idx[np.argmin(np.abs(x[idx]))]] = True
+
+def rebalance_plan(df_targets, current_portfolio, total_asset_val, band_pct=0.0, new_cash=0.0,
+                   allow_sell=True, min_trade=REBALANCE_MIN_TRADE):
+    """
+    rebalance_deltas 的求解版：在其结果上加 trade_amount (正数买入、负数卖出)、调仓后金额/占比、是否落在区间内。
+    df_targets 里有 min_trade 列时逐个标签使用 (<= 0 的用 min_trade 默认值)。
+    返回 (计算表, 没投出去的现金)。
+    """
+    import numpy as np
+
+    df_calc = rebalance_deltas(df_targets, current_portfolio, total_asset_val)
+    per_tag = df_targets.set_index('tag_name')['min_trade'] if 'min_trade' in df_targets else None
+    mins = np.full(len(df_calc), float(min_trade))
+    if per_tag is not None:
+        custom = df_calc['tag_name'].map(per_tag).fillna(0.0).to_numpy(dtype=float)
+        mins = np.where(custom > 0, custom, mins)
+
+    trades, cash_left = solve_rebalance(df_calc['amount'].to_numpy(), df_calc['target_percentage'].to_numpy(),
+                                        band_pct, new_cash, allow_sell, mins)
+    total = total_asset_val + new_cash
+    df_calc['trade_amount'] = trades
+    df_calc['post_amount'] = df_calc['amount'] + trades
+    df_calc['post_pct'] = df_calc['post_amount'] / total * 100 if total else 0.0
+    df_calc['in_band'] = (df_calc['post_pct'] - df_calc['target_percentage']).abs() <= band_pct + 1e-6
+    return df_calc, cash_left
+
+
+# ==============================================================================
+# 📅 定投计划推演
+# ==============================================================================
+def load_active_plans(user_id):
+    """启用中的定投计划 (含币种) 与这些用户的资产标签"""
+    import pandas as pd
+
+    conn = get_db_connection()
+    try:
+        active_plans = pd.read_sql('''
+            SELECT p.asset_id, a.name, a.currency, p.amount, p.frequency, p.execution_day
+            FROM investment_plans p
+            JOIN assets a ON p.asset_id = a.asset_id
+            WHERE p.user_id = ? AND p.is_active = 1
+        ''', conn, params=(user_id,))
+        asset_tags = pd.read_sql('''
+            SELECT atm.asset_id, t.tag_group, t.tag_name
+            FROM asset_tag_map atm
+            JOIN tags t ON atm.tag_id = t.tag_id
+            WHERE t.user_id = ?
+        ''', conn, params=(user_id,))
+    finally:
+        conn.close()
+    return active_plans, asset_tags
+
+def project_plan_cashflows(active_plans, rates_map, start_date, future_days=30):
+    """
+    未来 future_days 天每个定投日的资金需求 (按最新汇率折合人民币)。
+    返回 [date, asset_id, asset_name, amount_cny, raw_info]，没有命中的定投日时返回空表。
+    """
+    import pandas as pd
+
+    projection_data = []
+    for i in range(future_days):
+        current_date = start_date + timedelta(days=i)
+        current_weekday = current_date.weekday()
+        current_day = current_date.day
+
+        for plan in active_plans.itertuples(index=False):
+            hit = False
+            if plan.frequency == '每天': hit = True
+            elif plan.frequency == '每周' and int(plan.execution_day) == current_weekday: hit = True
+            elif plan.frequency == '每月' and int(plan.execution_day) == current_day: hit = True
+
+            if hit:
+                # 金额折算：原币 -> 人民币
+                rate = 1.0 if plan.currency == 'CNY' else rates_map.get(plan.currency, 1.0)
+                projection_data.append({
+                    "date": current_date,
+                    "asset_id": plan.asset_id,
+                    "asset_name": plan.name,
+                    "amount_cny": plan.amount * rate,
+                    "raw_info": f"{plan.amount} {plan.currency}"  # 备注原币金额
+                })
+
+    return pd.DataFrame(projection_data, columns=['date', 'asset_id', 'asset_name', 'amount_cny', 'raw_info'])
+
+
+# ==============================================================================
+# 🔥 FIRE 推演
+# ==============================================================================
+SAFE_WITHDRAWAL_RATE = 0.04  # 4% 法则
+
+def current_total_assets_cny(user_id, rates_map):
+    """最新快照日的总资产 (按最新汇率折合人民币)，没有快照时为 0"""
+    conn = get_db_connection()
+    try:
+        latest_date_row = conn.execute('SELECT MAX(date) as d FROM snapshots JOIN assets ON snapshots.asset_id = assets.asset_id WHERE assets.user_id = ?', (user_id,)).fetchone()
+        if not latest_date_row or not latest_date_row['d']:
+            return 0.0
+        rows = conn.execute('''
+            SELECT s.amount, a.currency
+            FROM snapshots s
+            JOIN assets a ON s.asset_id = a.asset_id
+            WHERE a.user_id = ? AND s.date = ?
+        ''', (user_id, latest_date_row['d'])).fetchall()
+    finally:
+        conn.close()
+
+    total = 0.0
+    for row in rows:
+        curr = row['currency']
+        total += row['amount'] * (1.0 if curr == 'CNY' else rates_map.get(curr, 1.0))
+    return total
+
+def fire_kpis(base_amount, target_monthly_expense):
+    """4% 法则：(每月被动收入, 生活费覆盖率 %, FIRE 目标金额)"""
+    monthly_passive_income = (base_amount * SAFE_WITHDRAWAL_RATE) / 12
+    coverage_ratio = (monthly_passive_income / target_monthly_expense) * 100
+    fire_number = (target_monthly_expense * 12) / SAFE_WITHDRAWAL_RATE
+    return monthly_passive_income, coverage_ratio, fire_number
+
+def project_fire(base_amount, annual_addition, current_age, annual_rate, inflation_rate,
+                 start_year=None, years_to_project=40):
+    """
+    复利推演：每年 余额 * (1 + 年化) + 追加；真实购买力按通胀折回今天。
+    返回 [year, age, balance, balance_real, principal] 及对应的 *_w (万元) 列。
+    """
+    import pandas as pd
+
+    start_year = start_year or datetime.now().year
+    curr_bal = base_amount
+    curr_principal = base_amount
+
+    # 初始年份数据
+    projection_data = [{
+        "year": start_year, "age": current_age,
+        "balance": curr_bal, "balance_real": curr_bal,
+        "principal": curr_principal
+    }]
+
+    for i in range(1, years_to_project + 1):
+        # 核心复利公式
+        curr_bal = curr_bal * (1 + annual_rate / 100.0) + annual_addition
+        curr_principal += annual_addition
+
+        # 真实购买力 (剔除通胀)
+        real_purchasing_power = curr_bal / ((1 + inflation_rate / 100.0) ** i)
+
+        projection_data.append({
+            "year": start_year + i, "age": current_age + i,
+            "balance": curr_bal, "balance_real": real_purchasing_power,
+            "principal": curr_principal
+        })
+
+    df_proj = pd.DataFrame(projection_data)
+    # 单位换算为“万”
+    for c in ['balance', 'balance_real', 'principal']:
+        df_proj[f'{c}_w'] = df_proj[c] / 10000
+    return df_proj
@@ -0,0 +1,196 @@
+"""
+全历史数据导出 (CSV / Parquet / JSONL)
+
+直接从 SQLite 按块读取 (cursor.fetchmany)，边读边写，内存占用与历史长度无关。
+既给看板的下载按钮用，也可以在命令行里跑 (比如树莓派上的 cron)：
+
+    python exporter.py snapshots --user demo --format csv -o snapshots.csv
+    python exporter.py principal --user demo --format parquet -o principal.parquet
+"""
+import argparse
+import csv
+import io
+import json
+import sqlite3
+import sys
+
+from core import DB_FILE  # 与页面同一个库 (HA 里是 /share 下的那份)
+
+EXPORT_CHUNK_ROWS = 5000
+# 格式 -> (MIME 类型, 扩展名)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'jsonl': ('application/x-ndjson', '.jsonl'),
+}
+# 需要额外依赖的格式 -> 模块名 (没装时页面和命令行都不提供这个格式)
+_FORMAT_REQUIRES = {'parquet': 'pyarrow'}
+
+# 快照 + 截至当天最近一次汇率，与看板 (RateService) 口径一致：
+# 早于第一条汇率的日期用该币种最早的汇率兜底，人民币等从没录过汇率的币种按 1.0 计
+_SNAPSHOTS_WITH_RATE = '''
+    SELECT s.date, a.asset_id, a.name, a.code, a.type, a.currency,
+           s.amount, s.profit, s.cost, s.yield_rate, s.is_cleared,
+           COALESCE((SELECT r.rate FROM exchange_rates r
+                     WHERE r.currency = a.currency AND r.date <= s.date
+                     ORDER BY r.date DESC LIMIT 1),
+                    (SELECT r.rate FROM exchange_rates r
+                     WHERE r.currency = a.currency
+                     ORDER BY r.date LIMIT 1), 1.0) AS rate
+    FROM snapshots s
+    JOIN assets a ON a.asset_id = s.asset_id
+    WHERE a.user_id = ?
+'''
+
+# 数据集：名称 -> (显示名, SQL, [(列名, Parquet 类型)])；SQL 只接受一个 user_id 参数
+EXPORT_DATASETS = {
+    'snapshots': ('资产快照明细', f'''
+        SELECT date, asset_id, name, code, type, currency, amount, profit, cost, yield_rate, is_cleared,
+               rate, amount * rate AS amount_cny, profit * rate AS profit_cny
+        FROM ({_SNAPSHOTS_WITH_RATE})
+        ORDER BY date, asset_id
+    ''', [('date', 'string'), ('asset_id', 'int64'), ('name', 'string'), ('code', 'string'),
+          ('type', 'string'), ('currency', 'string'), ('amount', 'float64'), ('profit', 'float64'),
+          ('cost', 'float64'), ('yield_rate', 'float64'), ('is_cleared', 'int64'), ('rate', 'float64'),
+          ('amount_cny', 'float64'), ('profit_cny', 'float64')]),
+    'tag_aggregates': ('标签聚合 (人民币)', f'''
+        SELECT s.date, t.tag_group, t.tag_name, COUNT(*) AS asset_count,
+               SUM(s.amount * s.rate) AS amount, SUM(s.profit * s.rate) AS profit, SUM(s.cost * s.rate) AS cost
+        FROM ({_SNAPSHOTS_WITH_RATE}) s
+        JOIN asset_tag_map atm ON atm.asset_id = s.asset_id
+        JOIN tags t ON t.tag_id = atm.tag_id
+        GROUP BY s.date, t.tag_group, t.tag_name
+        ORDER BY s.date, t.tag_group, t.tag_name
+    ''', [('date', 'string'), ('tag_group', 'string'), ('tag_name', 'string'), ('asset_count', 'int64'),
+          ('amount', 'float64'), ('profit', 'float64'), ('cost', 'float64')]),
+    'cashflows': ('现金流', '''
+        SELECT date, type, amount, category, note
+        FROM cashflows
+        WHERE user_id = ?
+        ORDER BY date, id
+    ''', [('date', 'string'), ('type', 'string'), ('amount', 'float64'), ('category', 'string'),
+          ('note', 'string')]),
+    'principal': ('累计投入本金', '''
+        SELECT date,
+               SUM(CASE WHEN type = '收入' THEN amount ELSE -amount END) AS net_flow,
+               SUM(SUM(CASE WHEN type = '收入' THEN amount ELSE -amount END)) OVER (ORDER BY date) AS cumulative_principal
+        FROM cashflows
+        WHERE user_id = ?
+        GROUP BY date
+        ORDER BY date
+    ''', [('date', 'string'), ('net_flow', 'float64'), ('cumulative_principal', 'float64')]),
+}
+
+
+def iter_chunks(db_path, user_id, dataset, chunk_rows=EXPORT_CHUNK_ROWS):
+    """按块产出行 (元组列表)，同一时间内存里只有一块"""
+    _, sql, _ = EXPORT_DATASETS[dataset]
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(sql, (user_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def write_csv(out, db_path, user_id, dataset, chunk_rows=EXPORT_CHUNK_ROWS):
+    """写 CSV 到二进制文件对象 (带 BOM，Excel 直接打开不乱码)；返回行数"""
+    columns = [c for c, _ in EXPORT_DATASETS[dataset][2]]
+    text = io.TextIOWrapper(out, encoding='utf-8-sig', newline='', write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    n = 0
+    for rows in iter_chunks(db_path, user_id, dataset, chunk_rows):
+        writer.writerows(rows)
+        n += len(rows)
+    text.detach()  # 交还底层文件，由调用方关闭
+    return n
+
+
+def write_jsonl(out, db_path, user_id, dataset, chunk_rows=EXPORT_CHUNK_ROWS):
+    """每行一个 JSON 对象；返回行数"""
+    columns = [c for c, _ in EXPORT_DATASETS[dataset][2]]
+    n = 0
+    for rows in iter_chunks(db_path, user_id, dataset, chunk_rows):
+        out.write(''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows).encode('utf-8'))
+        n += len(rows)
+    return n
+
+
+def write_parquet(out, db_path, user_id, dataset, chunk_rows=EXPORT_CHUNK_ROWS):
+    """每块写成一个 row group；需要 pyarrow (只有选 Parquet 时才导入)；返回行数"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(c, getattr(pa, t)() if t != 'string' else pa.string()) for c, t in EXPORT_DATASETS[dataset][2]])
+    n = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in iter_chunks(db_path, user_id, dataset, chunk_rows):
+            columns = list(zip(*rows))
+            writer.write_table(pa.table([pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema))
+            n += len(rows)
+    return n
+
+
+_WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'parquet': write_parquet}
+
+
+def available_formats():
+    """当前环境能用的导出格式 (只查找依赖、不导入)"""
+    import importlib.util
+
+    return [fmt for fmt in EXPORT_FORMATS
+            if fmt not in _FORMAT_REQUIRES or importlib.util.find_spec(_FORMAT_REQUIRES[fmt]) is not None]
+
+
+def export_dataset(out, db_path, user_id, dataset, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    """把一个数据集流式写到二进制文件对象 out；返回写出的行数"""
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"未知的数据集: {dataset}")
+    if fmt not in _WRITERS:
+        raise ValueError(f"不支持的格式: {fmt}")
+    return _WRITERS[fmt](out, db_path, user_id, dataset, chunk_rows)
+
+
+def resolve_user_id(db_path, user):
+    """命令行里既可以写用户名，也可以直接写 user_id"""
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute('SELECT user_id FROM users WHERE username = ?', (user,)).fetchone()
+        if row is None and str(user).isdigit():
+            row = conn.execute('SELECT user_id FROM users WHERE user_id = ?', (int(user),)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        raise SystemExit(f"找不到用户: {user}")
+    return row[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导出全历史数据 (CSV / Parquet / JSONL)")
+    parser.add_argument('dataset', choices=list(EXPORT_DATASETS.keys()))
+    parser.add_argument('--user', required=True, help="用户名或 user_id")
+    parser.add_argument('--format', default='csv', choices=list(EXPORT_FORMATS.keys()))
+    parser.add_argument('-o', '--output', help="输出文件 (默认 <dataset><扩展名>，写 - 表示标准输出)")
+    parser.add_argument('--db', default=DB_FILE, help="数据库文件路径")
+    parser.add_argument('--chunk-rows', type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+    if args.format not in available_formats():
+        parser.error(f"导出 {args.format} 需要安装 {_FORMAT_REQUIRES[args.format]}：pip install {_FORMAT_REQUIRES[args.format]}")
+
+    user_id = resolve_user_id(args.db, args.user)
+    output = args.output or args.dataset + EXPORT_FORMATS[args.format][1]
+    if output == '-':
+        n = export_dataset(sys.stdout.buffer, args.db, user_id, args.dataset, args.format, args.chunk_rows)
+    else:
+        with open(output, 'wb') as f:
+            n = export_dataset(f, args.db, user_id, args.dataset, args.format, args.chunk_rows)
+    print(f"✅ 已导出 {n} 行 -> {output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
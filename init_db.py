@@ -109,7 +109,8 @@ def init_db():
         email_port INTEGER,
         email_user TEXT,
         email_password TEXT,
-        email_to TEXT
+        email_to TEXT,
+        chart_render_mode TEXT DEFAULT '自动'  -- 图表渲染模式: 自动 / 强制 WebGL / 强制 SVG
     )
     ''')
     # 初始化默认设置
@@ -149,6 +150,7 @@ def init_db():
         tag_group TEXT NOT NULL,
         tag_name TEXT NOT NULL,
         target_percentage REAL NOT NULL,
+        min_trade REAL DEFAULT 0,  -- 该标签的最小交易额，0 表示用默认值
         created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
         updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
         UNIQUE(user_id, tag_group, tag_name),
@@ -0,0 +1,217 @@
+"""
+分析结果的进程内缓存：资产明细/标签聚合 (增量重算 + 硬盘缓存)、按日期索引、水位监控序列、财富归因。
+页面线程和后台预热线程共用同一个仓库，按成员加锁。
+"""
+import streamlit as st
+import hashlib
+from pathlib import Path
+import threading
+
+import core
+import analytics_cache
+from core import (
+    get_data_version, compute_analytics, analytics_fingerprint, load_principal_series,
+    build_daily_totals, compute_monitor_series, ATTRIBUTION_GRANULARITY, compute_wealth_attribution,
+)
+from services.rates import get_rate_service
+
+
+# 代码版本：计算代码 (本模块和 core.py) 有改动时，进程内的预计算结果一律作废 (防止调试时读到旧代码算出的结果)
+CODE_VERSION = hashlib.md5(Path(__file__).read_bytes() + Path(core.__file__).read_bytes()).hexdigest()[:12]
+
+@st.cache_resource(show_spinner=False)
+def _analytics_store(code_version):
+    """进程内的预计算结果仓库 {key: {'version': ..., ...}}，按数据版本失效；代码版本变了整个换新"""
+    return {}
+
+@st.cache_resource(show_spinner=False)
+def _analytics_locks(code_version):
+    """每个成员一把锁 (页面线程和后台预热线程共用)"""
+    return {'guard': threading.Lock(), 'users': {}}
+
+def _analytics_lock(user_id):
+    locks = _analytics_locks(CODE_VERSION)
+    with locks['guard']:
+        return locks['users'].setdefault(user_id, threading.RLock())
+
+def _analytics_recompute_from(old_fp, new_fp):
+    """
+    对比新旧指纹，决定从哪天开始重算：
+      None      -> 没有任何变化，直接复用
+      'YYYY-MM-DD' -> 只重算该日期及之后的部分
+      'full'    -> 需要全量重算
+    """
+    if old_fp is None or old_fp['meta'] != new_fp['meta']:
+        return 'full'
+
+    def diff_keys(old, new):
+        return {k for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
+
+    changed = diff_keys(old_fp['dates'], new_fp['dates'])
+    changed_rates = diff_keys(old_fp['rates'], new_fp['rates'])
+    if changed_rates:
+        # 早于第一条汇率的日期是用最早汇率兜底的，动到这里就影响全部历史
+        if not old_fp['rates'] or min(changed_rates) <= min(old_fp['rates']):
+            return 'full'
+        changed |= changed_rates
+    return min(changed) if changed else None
+
+def get_cached_analytics_data(user_id, force=False):
+    """
+    替代原来的 process_analytics_data，增加了智能缓存机制：
+    - 数据版本没变：直接返回内存里的结果
+    - 只有某天之后的数据变了 (典型场景：录入了今天的快照)：
+      只重算这些日期的资产明细和标签聚合，拼接到已缓存的结果后面
+    - 其他情况 (改了资产属性/标签/清仓状态等)：全量重算，先查硬盘缓存 (重启/升级后未改动的成员直接读盘)
+    force=True 时删掉该成员的硬盘缓存并全量重算，算完再整体替换 (期间页面继续读旧结果，不会被锁住)
+    """
+    import pandas as pd
+
+    store = _analytics_store(CODE_VERSION)
+    key = ('analytics', user_id)
+    version = get_data_version()
+    entry = store.get(key)
+
+    if force or entry is None or entry['version'] != version:
+        # 同一成员同一时间只算一次：后台预热正在算的时候，页面会等它算完直接命中
+        with _analytics_lock(user_id):
+            # 拿到锁后再确认一次 (可能刚被别的线程算好)
+            version = get_data_version()
+            entry = store.get(key)
+            if force or entry is None or entry['version'] != version:
+                fp = analytics_fingerprint(user_id)
+                since = 'full' if force else _analytics_recompute_from(entry['fp'] if entry else None, fp)
+
+                if since == 'full':
+                    if force:
+                        analytics_cache.get_disk_cache().invalidate(user_id)
+                    # 全量结果落盘 (按成员 + 数据摘要 + 代码版本)，重启后只有改过数据的成员需要重算
+                    df_assets, df_tags, _ = analytics_cache.load_or_compute(user_id, fp, get_rate_service())
+                elif since is None:
+                    df_assets, df_tags = entry['assets'], entry['tags']
+                else:
+                    since_ts = pd.Timestamp(since)
+                    new_assets, new_tags = compute_analytics(user_id, since=since, rate_service=get_rate_service())
+                    old_assets, old_tags = entry['assets'], entry['tags']
+
+                    parts = [] if old_assets is None else [old_assets[old_assets['date'] < since_ts]]
+                    if new_assets is not None:
+                        parts.append(new_assets)
+                    df_assets = pd.concat(parts, ignore_index=True) if parts else None
+
+                    parts = [] if old_tags is None or old_tags.empty else [old_tags[old_tags['date'] < since_ts]]
+                    if new_tags is not None and not new_tags.empty:
+                        parts.append(new_tags)
+                    df_tags = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+                    if df_assets is None or df_assets.empty:
+                        df_assets, df_tags = None, None
+
+                entry = {'version': version, 'fp': fp, 'assets': df_assets, 'tags': df_tags}
+                store[key] = entry
+
+    # 浅拷贝：调用方加列不会污染缓存
+    df_assets, df_tags = entry['assets'], entry['tags']
+    return (None if df_assets is None else df_assets.copy(deep=False),
+            None if df_tags is None else df_tags.copy(deep=False))
+
+def get_date_index(user_id, kind='assets'):
+    """
+    按日期索引的分析表 (每个缓存条目只建一次，数据版本变化时随条目一起失效)。
+    kind: 'assets' 资产明细 / 'tags' 标签聚合
+    返回 (以 date 为索引、已排序的表, 升序的快照日期)；没有数据时返回 (None, None)。
+    """
+    get_cached_analytics_data(user_id)  # 确保缓存条目是当前数据版本
+    entry = _analytics_store(CODE_VERSION)[('analytics', user_id)]
+    indexes = entry.setdefault('date_index', {})
+    if kind not in indexes:
+        frame = entry[kind]
+        if frame is None or frame.empty:
+            indexes[kind] = (None, None)
+        else:
+            indexed = frame.set_index('date').sort_index()
+            indexes[kind] = (indexed, indexed.index.unique())
+    return indexes[kind]
+
+def snap_to_snapshot_date(dates, target):
+    """在升序的快照日期里找离 target 最近的一天 (距离相同取较早的那天)"""
+    import pandas as pd
+
+    target = pd.Timestamp(target)
+    pos = dates.searchsorted(target)
+    if pos == 0:
+        return dates[0]
+    if pos == len(dates):
+        return dates[-1]
+    before, after = dates[pos - 1], dates[pos]
+    return after if (after - target) < (target - before) else before
+
+# ==============================================================================
+# 🌊 水位监控序列：每日总额 + 本金 + 回撤/ATH 等滚动指标，按数据版本预计算
+# ==============================================================================
+def get_monitor_series(user_id, df_assets=None):
+    """
+    取预计算好的水位监控序列 (每个数据版本只算一次)。
+    如果只是最近的日期有变化 (比如录入了今天的快照)，就只计算变化的那几天再拼接上去。
+    """
+    import pandas as pd
+
+    store = _analytics_store(CODE_VERSION)
+    key = ('monitor', user_id)
+    version = get_data_version()
+    entry = store.get(key)
+    if entry is not None and entry['version'] == version:
+        return entry['frame']
+
+    if df_assets is None:
+        df_assets, _ = get_cached_analytics_data(user_id)
+    if df_assets is None or df_assets.empty:
+        store.pop(key, None)
+        return None
+
+    daily = build_daily_totals(df_assets, load_principal_series(user_id))
+
+    # 找出与旧序列完全一致的前缀，只重算之后的部分
+    prev = entry['frame'] if entry is not None else None
+    keep = 0
+    if prev is not None:
+        n = min(len(prev), len(daily))
+        base_cols = ['amount', 'cost', 'final_principal', 'from_cashflows']
+        diff = ((daily['date'].to_numpy()[:n] != prev['date'].to_numpy()[:n])
+                | (daily[base_cols].to_numpy(dtype=float)[:n] != prev[base_cols].to_numpy(dtype=float)[:n]).any(axis=1))
+        keep = int(diff.argmax()) if diff.any() else n
+
+    if keep == 0:
+        frame = compute_monitor_series(daily)
+    elif keep == len(prev) == len(daily):
+        frame = prev
+    else:
+        tail = compute_monitor_series(daily.iloc[keep:], seed=prev.iloc[keep - 1])
+        frame = pd.concat([prev.iloc[:keep], tail], ignore_index=True)
+
+    store[key] = {'version': version, 'frame': frame}
+    return frame
+
+def get_wealth_attribution(user_id, granularity="年度", df_assets=None):
+    """
+    取财富归因表 (每个数据版本、每种粒度只算一次)。
+    复用水位监控的每日总额，现金流本金也跟着数据版本缓存，不再每次切页重新查询。
+    返回 (归因表, 是否有现金流记录)。
+    """
+    store = _analytics_store(CODE_VERSION)
+    key = ('attribution', user_id)
+    version = get_data_version()
+    entry = store.get(key)
+    if entry is None or entry['version'] != version:
+        daily = get_monitor_series(user_id, df_assets)
+        if daily is None or daily.empty:
+            store.pop(key, None)
+            return None, False
+        entry = {'version': version, 'daily': daily[['date', 'amount']],
+                 'principal': load_principal_series(user_id), 'frames': {}}
+        store[key] = entry
+
+    if granularity not in entry['frames']:
+        freq = ATTRIBUTION_GRANULARITY[granularity][0]
+        entry['frames'][granularity] = compute_wealth_attribution(entry['daily'], entry['principal'], freq)
+    return entry['frames'][granularity], not entry['principal'].empty
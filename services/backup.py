@@ -0,0 +1,42 @@
+"""
+自动备份：运行时被动检查备份频率，到点就备份。
+"""
+import streamlit as st
+import threading
+import time
+
+from core import get_db_connection, perform_backup, backup_due
+
+
+# --- 备份核心逻辑 ---
+BACKUP_CHECK_INTERVAL = 600  # 自动备份检查的最小间隔 (秒)：备份频率最细也是“每天”，不必每次重跑脚本都查
+
+@st.cache_resource(show_spinner=False)
+def _backup_check_state():
+    return {'next': 0.0, 'lock': threading.Lock()}
+
+def auto_backup_check():
+    """在 App 运行时被动检查是否需要备份 (整个进程每 BACKUP_CHECK_INTERVAL 秒最多查一次)"""
+    state = _backup_check_state()
+    with state['lock']:
+        if time.monotonic() < state['next']:
+            return
+        state['next'] = time.monotonic() + BACKUP_CHECK_INTERVAL
+    conn = get_db_connection()
+    try:
+        row = conn.execute('SELECT backup_frequency, last_backup_at FROM system_settings WHERE id = 1').fetchone()
+        if not row: return
+
+        if backup_due(row['backup_frequency'], row['last_backup_at']):
+            # 执行备份 (不阻塞 UI 太久，使用 toast 提示)
+            st.toast("正在后台执行自动备份...", icon="⏳")
+            success, msg = perform_backup(manual=False)
+            if success:
+                st.toast(f"自动备份完成！\n{msg}", icon="✅")
+            else:
+                st.error(f"自动备份失败: {msg}")
+                
+    except Exception as e:
+        print(f"Auto backup check failed: {e}")
+    finally:
+        conn.close()
@@ -0,0 +1,94 @@
+"""
+图表工具：长序列降采样 (min/max per bucket) 与 WebGL 渲染开关。
+"""
+import sqlite3
+
+from core import get_db_connection
+
+
+# ==============================================================================
+# 📉 图表降采样：长序列只把“形状”发给浏览器，手机上也不卡
+# ==============================================================================
+CHART_POINT_BUDGET = 500  # 每条曲线最多发送的点数
+
+def minmax_indices(y, n_out, keep=()):
+    """
+    分桶取极值的降采样 (min/max per bucket)，返回要保留的点的下标 (升序)。
+    每个桶保留最高点和最低点，所以回撤的峰和谷不会被“抹平”；
+    全程是 NumPy 的整块运算，几百条曲线也能在毫秒级完成。
+    首尾两点必定保留；keep 里的下标也强制保留。
+    """
+    import numpy as np
+
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = (n_out - 2) // 2
+    size = -(-n // n_buckets)  # 向上取整
+    blocks = np.full(n_buckets * size, np.nan)
+    blocks[:n] = y
+    blocks = blocks.reshape(n_buckets, size)
+    base = np.arange(n_buckets) * size
+    hi = base + np.where(np.isnan(blocks), -np.inf, blocks).argmax(axis=1)
+    lo = base + np.where(np.isnan(blocks), np.inf, blocks).argmin(axis=1)
+
+    idx = np.concatenate([[0, n - 1], hi, lo, np.asarray(keep, dtype=np.int64)])
+    return np.unique(idx[idx < n])
+
+def series_extremes(y):
+    """一条曲线的关键点下标：最高点、最低点、最大回撤的峰与谷"""
+    import numpy as np
+
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    if len(y) == 0:
+        return []
+    drawdown = np.maximum.accumulate(y) - y
+    trough = int(drawdown.argmax())
+    peak = int(y[:trough + 1].argmax())
+    return [int(y.argmax()), int(y.argmin()), peak, trough]
+
+def downsample_frame(df, y_cols, budget=CHART_POINT_BUDGET):
+    """
+    按第一列 y 分桶降采样，其余列的极值点也一并保留；多条曲线共用同一批 x，悬停对齐。
+    df 需已按日期排序；行数不超过预算时原样返回。
+    """
+    if len(df) <= budget:
+        return df
+    keep = [i for col in y_cols for i in series_extremes(df[col])]
+    return df.iloc[minmax_indices(df[y_cols[0]], budget, keep=keep)]
+
+def downsample_groups(df, x_col, y_col, group_col, budget=CHART_POINT_BUDGET):
+    """长表 (每个 group 一条曲线) 逐条降采样，每条曲线各自不超过预算"""
+    import pandas as pd
+
+    if df.empty or df.groupby(group_col).size().max() <= budget:
+        return df
+    parts = [downsample_frame(g.sort_values(x_col), [y_col], budget)
+             for _, g in df.groupby(group_col, sort=False)]
+    return pd.concat(parts)
+
+
+# 超过这个点数就切换到 WebGL 渲染 (与 Plotly 自己的 auto 阈值一致)
+WEBGL_POINT_THRESHOLD = 1000
+RENDER_MODE_OPTIONS = ["自动", "强制 WebGL", "强制 SVG"]
+
+def get_chart_render_mode():
+    """读取系统设置里的图表渲染模式 (老数据库没有该列时按“自动”处理)"""
+    conn = get_db_connection()
+    try:
+        row = conn.execute('SELECT chart_render_mode FROM system_settings WHERE id = 1').fetchone()
+        return row['chart_render_mode'] if row and row['chart_render_mode'] else "自动"
+    except sqlite3.OperationalError:
+        return "自动"
+    finally:
+        conn.close()
+
+def use_webgl(n_points, render_mode):
+    """点数多时用 WebGL (Scattergl) 渲染，平板上多年多资产对比也能流畅缩放"""
+    if render_mode == "强制 WebGL":
+        return True
+    if render_mode == "强制 SVG":
+        return False
+    return n_points > WEBGL_POINT_THRESHOLD
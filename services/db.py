@@ -0,0 +1,250 @@
+"""
+页面共用的数据库操作：成员列表、建库检查与迁移、表格同步保存、成员增删。
+"""
+import streamlit as st
+import sqlite3
+import hashlib
+import os
+
+import core
+from core import get_db_connection, json_ids, get_data_version
+from services.filters import clear_asset_filter_index
+
+
+# --- 数据库工具函数 ---
+def get_all_usernames():
+    """获取数据库中所有已注册的用户名列表 (按数据版本缓存，每次重跑脚本不再查库)"""
+    return list(_load_usernames(get_data_version()))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_usernames(data_version):
+    """data_version 只参与缓存 key：新增/删除成员会提交数据库，版本一变就重新查"""
+    conn = get_db_connection()
+    try:
+        users = conn.execute('SELECT username FROM users').fetchall()
+        # 将结果转换为纯字符串列表 ['爸爸', '妈妈', '孩子']
+        return [u['username'] for u in users]
+    except Exception:
+        return []
+    finally:
+        conn.close()
+
+def init_db():
+    """确保数据库表存在，如果不存在则创建"""
+    # 这里直接复用你提供的 init_db.py 的逻辑，为节省篇幅，仅做检查
+    if not os.path.exists(core.DB_FILE):
+        # 如果文件不存在，建议先运行 init_db.py 或在这里写完整的建表逻辑
+        st.error("数据库文件未找到，请先运行 init_db.py 初始化数据库！")
+        st.stop()
+    _migrate_db_once(core.DB_FILE)
+
+@st.cache_resource(show_spinner=False)
+def _migrate_db_once(db_file):
+    """迁移每个进程只需要跑一次，之后的每次重跑脚本直接跳过"""
+    migrate_db()
+    return True
+
+def migrate_db():
+    """给老数据库补上新版本用到的列/表 (只增不删，可重复执行)"""
+    conn = get_db_connection()
+    try:
+        cols = {r['name'] for r in conn.execute('PRAGMA table_info(system_settings)')}
+        if 'chart_render_mode' not in cols:
+            conn.execute("ALTER TABLE system_settings ADD COLUMN chart_render_mode TEXT DEFAULT '自动'")
+        cols = {r['name'] for r in conn.execute('PRAGMA table_info(rebalance_targets)')}
+        if 'min_trade' not in cols:
+            conn.execute("ALTER TABLE rebalance_targets ADD COLUMN min_trade REAL DEFAULT 0")
+        # 笔记时间轴按 (created_at, note_id) 做 keyset 分页
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_notes_user_created ON investment_notes (user_id, created_at, note_id)')
+        migrate_notes_fts(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+def migrate_notes_fts(conn):
+    """
+    笔记全文索引：FTS5 外部内容表 (trigram 分词，中文也能按任意 3 字片段检索) + 同步触发器。
+    SQLite 没有编译 FTS5 时静默跳过，搜索会退回 LIKE。
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'investment_notes_fts'").fetchone()
+    if exists:
+        return
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE investment_notes_fts USING fts5(
+                title, content, content='investment_notes', content_rowid='note_id', tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return
+    conn.executescript('''
+        CREATE TRIGGER IF NOT EXISTS investment_notes_fts_ai AFTER INSERT ON investment_notes BEGIN
+            INSERT INTO investment_notes_fts (rowid, title, content) VALUES (new.note_id, new.title, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS investment_notes_fts_ad AFTER DELETE ON investment_notes BEGIN
+            INSERT INTO investment_notes_fts (investment_notes_fts, rowid, title, content) VALUES ('delete', old.note_id, old.title, old.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS investment_notes_fts_au AFTER UPDATE ON investment_notes BEGIN
+            INSERT INTO investment_notes_fts (investment_notes_fts, rowid, title, content) VALUES ('delete', old.note_id, old.title, old.content);
+            INSERT INTO investment_notes_fts (rowid, title, content) VALUES (new.note_id, new.title, new.content);
+        END;
+    ''')
+    # 已有笔记一次性灌进索引
+    conn.execute("INSERT INTO investment_notes_fts (investment_notes_fts) VALUES ('rebuild')")
+
+# --- 核心逻辑：智能表格同步 ---
+def save_changes_to_db(edited_df, original_df, table_name, id_col, user_id, fixed_cols=None):
+    """
+    对比编辑前后的数据，自动处理新增、修改、删除
+    :param edited_df: 编辑后的 DataFrame
+    :param original_df: 原始从数据库读出的 DataFrame
+    :param table_name: 数据库表名
+    :param id_col: 主键列名 (如 'asset_id')
+    :param user_id: 当前用户ID
+    :param fixed_cols: 需要在插入/更新时强制固定的列 (如 {'user_id': 1})
+    """
+    import pandas as pd  # 👈 加上这句
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # 1. 处理删除
+        # 原表中存在，但编辑后表中不存在的 ID，就是被删除的
+        if not original_df.empty and not edited_df.empty:
+            orig_ids = set(original_df[id_col].dropna().astype(int))
+            new_ids = set(edited_df[id_col].dropna().astype(int))
+            deleted_ids = orig_ids - new_ids
+        elif not original_df.empty and edited_df.empty:
+            deleted_ids = set(original_df[id_col].dropna().astype(int))
+        else:
+            deleted_ids = set()
+
+        if deleted_ids:
+            # 级联删除处理（简单粗暴版）：所有待删 id 作为一个 JSON 参数一次删完
+            del_ids = json_ids(deleted_ids)
+            if table_name == 'assets':
+                cursor.execute('DELETE FROM snapshots WHERE asset_id IN (SELECT value FROM json_each(?))', (del_ids,))
+                cursor.execute('DELETE FROM asset_tag_map WHERE asset_id IN (SELECT value FROM json_each(?))', (del_ids,))
+            elif table_name == 'tags':
+                cursor.execute('DELETE FROM asset_tag_map WHERE tag_id IN (SELECT value FROM json_each(?))', (del_ids,))
+            
+            cursor.execute(f'DELETE FROM {table_name} WHERE {id_col} IN (SELECT value FROM json_each(?)) AND user_id = ?', (del_ids, user_id))
+
+        # 2. 处理新增和修改
+        for index, row in edited_df.iterrows():
+            # 准备数据字典
+            data = row.to_dict()
+            if fixed_cols:
+                data.update(fixed_cols)
+            
+            # 如果 ID 为空或 NaN，视为新增
+            if pd.isna(row[id_col]) or row[id_col] == 0:
+                # 构建 INSERT 语句
+                cols = [k for k in data.keys() if k != id_col and k != 'created_at'] # 排除自增ID和时间
+                placeholders = ', '.join(['?'] * len(cols))
+                col_names = ', '.join(cols)
+                values = [data[c] for c in cols]
+                
+                query = f"INSERT INTO {table_name} ({col_names}) VALUES ({placeholders})"
+                cursor.execute(query, values)
+            
+            # 如果 ID 存在且在原始 ID 集合中，视为修改
+            elif row[id_col] in (original_df[id_col].values if not original_df.empty else []):
+                # 检查数据是否真的变了（简化起见，这里直接 Update，性能损耗可忽略）
+                cols = [k for k in data.keys() if k != id_col and k != 'created_at']
+                set_clause = ', '.join([f"{c} = ?" for c in cols])
+                values = [data[c] for c in cols]
+                values.append(row[id_col]) # Where clause value
+                values.append(user_id)     # Where clause user_id
+                
+                query = f"UPDATE {table_name} SET {set_clause} WHERE {id_col} = ? AND user_id = ?"
+                cursor.execute(query, values)
+
+        conn.commit()
+        # 资产/标签变了：立刻丢掉旧的筛选与关键字索引，下次筛选按新数据重建
+        if table_name in ('assets', 'tags'):
+            clear_asset_filter_index()
+        st.success("数据已成功同步！")
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        st.error(f"保存失败: {str(e)}")
+        return False
+    finally:
+        conn.close()
+
+# --- 核心逻辑：级联删除用户所有数据 ---
+def delete_user_fully(target_user_id):
+    """
+    彻底删除一个用户及其名下所有数据。
+    顺序很重要：先删子表（快照、关联），再删主表（资产），最后删用户。
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # 1. 删除该用户资产下的快照和标签关联 (子查询直接在库里取 asset_id，不用把 id 列表拼进 SQL)
+        owned_assets = 'SELECT asset_id FROM assets WHERE user_id = ?'
+        
+        # 删除 snapshots (关联 asset_id)
+        cursor.execute(f'DELETE FROM snapshots WHERE asset_id IN ({owned_assets})', (target_user_id,))
+        
+        # 删除 asset_tag_map (关联 asset_id)
+        cursor.execute(f'DELETE FROM asset_tag_map WHERE asset_id IN ({owned_assets})', (target_user_id,))
+
+        # 2. 删除属于该用户的直接数据表
+        tables_with_userid = [
+            'assets',           # 资产表
+            'tags',             # 标签表
+            'cashflows',        # 现金流
+            'investment_plans', # 定投计划
+            'investment_notes', # 笔记
+            'monthly_profits',  # 月度收益
+            'monthly_reviews',  # 月度复盘
+            'rebalance_targets',# 再平衡目标
+            'user_sessions'     # 会话记录
+        ]
+        
+        for table in tables_with_userid:
+            cursor.execute(f'DELETE FROM {table} WHERE user_id = ?', (target_user_id,))
+
+        # 3. 最后删除用户本身
+        cursor.execute('DELETE FROM users WHERE user_id = ?', (target_user_id,))
+        
+        conn.commit()
+        return True, "删除成功"
+    except Exception as e:
+        conn.rollback()
+        return False, f"删除失败: {str(e)}"
+    finally:
+        conn.close()
+
+# --- 简化版用户管理 (无密码模式) ---
+def get_or_create_user_by_name(username):
+    """
+    根据名字直接获取用户，如果不存在则自动创建。
+    不再校验密码，主打一个家庭内部互信。
+    """
+    conn = get_db_connection()
+    try:
+        # 1. 尝试查找用户
+        user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+        
+        if user:
+            return dict(user)
+        else:
+            # 2. 如果不存在，自动注册一个 (密码留空即可，反正不查了)
+            # 注意：这里给一个默认后的 dummy 密码哈希，防止数据库非空约束报错
+            dummy_hash = hashlib.sha256("123456".encode()).hexdigest() 
+            cursor = conn.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)', 
+                                 (username, dummy_hash))
+            user_id = cursor.lastrowid
+            conn.commit()
+            
+            # 返回新创建的用户
+            return {'user_id': user_id, 'username': username}
+    except Exception as e:
+        st.error(f"用户获取失败: {e}")
+        return None
+    finally:
+        conn.close()
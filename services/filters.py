@@ -0,0 +1,178 @@
+"""
+资产筛选索引：标签组 -> 标签 -> 资产位图，资产管理、数据录入、定投计划、看板的筛选器共用。
+"""
+import streamlit as st
+
+import core
+from core import get_data_version
+
+
+# ==============================================================================
+# 🏷️ 资产筛选索引：标签组 -> 标签 -> 资产位图，所有页面的筛选器共用
+# ==============================================================================
+NO_TAG_OPTION = "【无此标签】"
+
+class KeywordIndex:
+    """
+    资产关键字的 n-gram 倒排索引 (名称 / 代码 / 备注，不区分大小写)。
+      - 关键字不超过 3 个字：直接取该片段的倒排表
+      - 更长的关键字：各个 3 字片段的倒排表求交集得到候选，再逐个确认确实包含整个关键字
+    中文名称按字切分，同样适用。
+    """
+    GRAM = 3
+
+    def __init__(self, asset_ids, fields):
+        import numpy as np
+
+        postings = {}
+        self.texts = {}
+        for aid, values in zip(asset_ids, zip(*fields)):
+            values = [str(v).lower() for v in values if v is not None and v == v]
+            self.texts[aid] = '\x00'.join(values)  # 分隔符保证关键字不会跨字段匹配
+            grams = set()
+            for v in values:
+                for n in range(1, self.GRAM + 1):
+                    grams.update(v[i:i + n] for i in range(len(v) - n + 1))
+            for g in grams:
+                postings.setdefault(g, []).append(aid)
+        self.postings = {g: np.array(ids, dtype=int) for g, ids in postings.items()}
+
+    def search(self, kw):
+        """返回名称/代码/备注包含 kw 的 asset_id 数组"""
+        import numpy as np
+
+        kw = kw.strip().lower()
+        empty = np.array([], dtype=int)
+        if len(kw) <= self.GRAM:
+            return self.postings.get(kw, empty)
+
+        candidates = None
+        for i in range(len(kw) - self.GRAM + 1):
+            ids = self.postings.get(kw[i:i + self.GRAM])
+            if ids is None:
+                return empty
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                return empty
+        return np.array([aid for aid in candidates if kw in self.texts[aid]], dtype=int)
+
+
+class AssetFilterIndex:
+    """
+    某个用户的资产筛选索引 (按数据版本构建一次，常驻内存)。
+    每个资产在位图里占一位 (下标 = asset_id)，筛选条件之间只做位运算：
+      - groups / tags_by_group     标签组、组内标签名 (供下拉框使用，无需再查库)
+      - keyword_mask(kw)           名称/代码/备注包含关键字的资产 (走 n-gram 倒排索引)
+      - tag_mask(group, names)     拥有所选标签的资产；names 含【无此标签】时并上“该组下没打标签”的资产
+      - match(asset_ids, ...)      对任意一列 asset_id 给出是否命中的布尔数组
+      - code_to_id / name_to_id    代码、名称 -> asset_id (批量导入时解析资产用)
+    """
+
+    def __init__(self, df_assets, df_tags):
+        import numpy as np
+
+        size = int(df_assets['asset_id'].max()) + 1 if not df_assets.empty else 1
+        self.size = size
+        self.all_mask = np.zeros(size, dtype=bool)
+        self.all_mask[df_assets['asset_id'].to_numpy()] = True
+        # 关键字索引覆盖全部资产 (含已清仓的)，每次按键只查倒排表
+        self.keywords = KeywordIndex(df_assets['asset_id'].tolist(),
+                                     [df_assets[c].tolist() for c in ('name', 'code', 'remarks')])
+        with_code = df_assets.dropna(subset=['code'])
+        self.code_to_id = dict(zip(with_code['code'].astype(str).str.strip().str.upper(), with_code['asset_id']))
+        self.name_to_id = dict(zip(df_assets['name'].astype(str).str.strip(), df_assets['asset_id']))
+        self.currency_by_id = dict(zip(df_assets['asset_id'], df_assets['currency'].fillna('CNY')))
+
+        self.groups = []
+        self.tags_by_group = {}
+        self.tag_masks = {}    # (group, tag_name) -> 位图
+        self.group_masks = {}  # group -> 该组下打过任一标签的资产位图
+        for row in df_tags.itertuples(index=False):
+            if row.tag_group not in self.tags_by_group:
+                self.groups.append(row.tag_group)
+                self.tags_by_group[row.tag_group] = []
+                self.group_masks[row.tag_group] = np.zeros(size, dtype=bool)
+            if (row.tag_group, row.tag_name) not in self.tag_masks:
+                self.tags_by_group[row.tag_group].append(row.tag_name)
+                self.tag_masks[(row.tag_group, row.tag_name)] = np.zeros(size, dtype=bool)
+        mapped = df_tags.dropna(subset=['asset_id'])
+        mapped = mapped[mapped['asset_id'] < size]
+        for (group, tag_name), ids in mapped.groupby(['tag_group', 'tag_name'], sort=False)['asset_id']:
+            ids = ids.to_numpy(dtype=int)
+            self.tag_masks[(group, tag_name)][ids] = True
+            self.group_masks[group][ids] = True
+
+    def keyword_mask(self, kw):
+        import numpy as np
+
+        mask = np.zeros(self.size, dtype=bool)
+        kw = (kw or '').strip().lower()
+        if not kw:
+            mask[:] = self.all_mask
+            return mask
+        mask[self.keywords.search(kw)] = True
+        return mask
+
+    def tag_mask(self, tag_group, tag_names):
+        import numpy as np
+
+        mask = np.zeros(self.size, dtype=bool)
+        if tag_group not in self.group_masks:
+            return mask
+        for name in tag_names:
+            if name == NO_TAG_OPTION:
+                mask |= self.all_mask & ~self.group_masks[tag_group]
+            elif (tag_group, name) in self.tag_masks:
+                mask |= self.tag_masks[(tag_group, name)]
+        return mask
+
+    def match(self, asset_ids, keyword="", tag_group=None, tag_names=()):
+        """
+        asset_ids: 任意 asset_id 序列 (可以重复，比如看板里按日期展开的长表)
+        tag_group 为空或 tag_names 为空时不做标签筛选 (与各页面“留空=全部”的约定一致)
+        """
+        import numpy as np
+
+        mask = self.keyword_mask(keyword) if keyword else self.all_mask
+        if tag_group and tag_names:
+            mask = mask & self.tag_mask(tag_group, tag_names)
+        ids = np.asarray(asset_ids, dtype=int)
+        inside = (ids >= 0) & (ids < self.size)
+        hit = np.zeros(len(ids), dtype=bool)
+        hit[inside] = mask[ids[inside]]
+        return hit
+
+    def filter(self, df, keyword="", tag_group=None, tag_names=()):
+        """按 df['asset_id'] 筛选行"""
+        if not keyword and not (tag_group and tag_names):
+            return df
+        return df[self.match(df['asset_id'], keyword, tag_group, tag_names)]
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _load_asset_filter_index(user_id, data_version):
+    """data_version 只参与缓存 key：资产或标签有改动就重建一次"""
+    import pandas as pd
+    import sqlite3
+
+    local_conn = sqlite3.connect(core.DB_FILE)
+    try:
+        df_assets = pd.read_sql("SELECT asset_id, name, code, currency, remarks FROM assets WHERE user_id = ?", local_conn, params=(user_id,))
+        df_tags = pd.read_sql('''
+            SELECT t.tag_group, t.tag_name, atm.asset_id
+            FROM tags t
+            LEFT JOIN asset_tag_map atm ON t.tag_id = atm.tag_id
+            WHERE t.user_id = ?
+            ORDER BY t.tag_group, t.tag_name
+        ''', local_conn, params=(user_id,))
+    finally:
+        local_conn.close()
+    return AssetFilterIndex(df_assets, df_tags)
+
+def get_asset_filter_index(user_id):
+    """资产管理、数据录入、定投计划、看板共用的筛选索引"""
+    return _load_asset_filter_index(user_id, get_data_version())
+
+def clear_asset_filter_index():
+    """资产/标签表保存后立即作废 (不等数据版本变化)"""
+    _load_asset_filter_index.clear()
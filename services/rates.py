@@ -0,0 +1,19 @@
+"""
+汇率服务：按数据版本加载一次，常驻内存，各页面共用。
+"""
+import streamlit as st
+
+from core import get_data_version, load_rate_service
+
+
+# ==============================================================================
+# 💱 汇率服务：按数据版本加载一次，常驻内存
+# ==============================================================================
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_rate_service(data_version):
+    """data_version 只参与缓存 key：数据库有写入就重新加载一次"""
+    return load_rate_service()
+
+def get_rate_service():
+    """数据录入、定投、FIRE、看板共用的汇率服务"""
+    return _load_rate_service(get_data_version())
@@ -0,0 +1,17 @@
+"""
+启动计时：进程级的运行计时记录 (主程序 main() 写入，“🩺 启动诊断”页读取)。
+"""
+import streamlit as st
+
+import startup_profile
+
+
+# ==============================================================================
+# 🩺 启动诊断：每次运行的分阶段耗时 (含进程冷启动那一次) + 模块导入耗时拆解
+# ==============================================================================
+FIRST_PAINT_PHASE = "侧边栏 (首屏)"
+
+@st.cache_resource(show_spinner=False)
+def get_startup_log():
+    """进程级的运行计时记录 (所有会话共用)"""
+    return startup_profile.StartupLog()
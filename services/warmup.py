@@ -0,0 +1,176 @@
+"""
+缓存预热：服务启动后、以及每次数据版本变化后，在后台把所有成员的结果提前算好。
+"""
+import streamlit as st
+import threading
+import logging
+from datetime import datetime
+
+import core
+import analytics_cache
+from core import get_data_version, analytics_fingerprint, fingerprint_digest
+from services.rates import get_rate_service
+from services.filters import get_asset_filter_index
+from services.analytics import (
+    CODE_VERSION, get_cached_analytics_data, get_monitor_series, get_wealth_attribution,
+    _analytics_lock, _analytics_recompute_from, _analytics_store,
+)
+
+
+# ==============================================================================
+# 🔥 缓存预热：服务启动后、以及每次数据版本变化后，在后台把所有成员的结果提前算好
+# ==============================================================================
+WARMUP_POLL_SECONDS = 5  # 兜底检查数据版本的间隔 (只是一次 os.stat)；页面触发的刷新靠 Event 立即唤醒
+
+def warm_user_caches(user_id, force=False):
+    """把一个成员看板要用的结果都算进缓存：分析明细/标签聚合、本金与水位序列、财富归因、筛选索引"""
+    df_assets, _ = get_cached_analytics_data(user_id, force=force)
+    store = _analytics_store(CODE_VERSION)
+    if force:
+        # 分析结果已整体替换，依赖它的序列也跟着重建
+        store.pop(('monitor', user_id), None)
+        store.pop(('attribution', user_id), None)
+    if df_assets is not None and not df_assets.empty:
+        get_monitor_series(user_id, df_assets)
+        get_wealth_attribution(user_id, "年度", df_assets)
+    get_asset_filter_index(user_id)
+
+def _full_refresh_fingerprint(user_id, force=False):
+    """该成员需要全量重算时返回当前指纹，否则 None (命中或增量的情况留给常规路径，很便宜)"""
+    entry = _analytics_store(CODE_VERSION).get(('analytics', user_id))
+    if not force and entry is not None and entry['version'] == get_data_version():
+        return None
+    fp = analytics_fingerprint(user_id)
+    if force or _analytics_recompute_from(entry['fp'] if entry else None, fp) == 'full':
+        return fp
+    return None
+
+def install_analytics_results(results, version, fingerprints):
+    """把进程池算好的 {user_id: (资产明细, 标签聚合, 水位序列, 财富归因)} 装进共享缓存，页面直接命中"""
+    store = _analytics_store(CODE_VERSION)
+    for user_id, (df_assets, df_tags, monitor, attribution) in results.items():
+        with _analytics_lock(user_id):
+            store[('analytics', user_id)] = {'version': version, 'fp': fingerprints[user_id],
+                                             'assets': df_assets, 'tags': df_tags}
+            if monitor is not None:
+                store[('monitor', user_id)] = {'version': version, 'frame': monitor}
+                # 与 get_wealth_attribution 的缓存条目同一结构，其他粒度切换时再在页面里算
+                store[('attribution', user_id)] = {'version': version, 'daily': monitor[['date', 'amount']],
+                                                   'principal': attribution['principal'],
+                                                   'frames': dict(attribution['frames'])}
+            else:
+                store.pop(('monitor', user_id), None)
+                store.pop(('attribution', user_id), None)
+
+class _WarmerLogFilter(logging.Filter):
+    """预热线程不属于任何页面会话，每次读缓存 streamlit 都会提示 missing ScriptRunContext，这里屏蔽掉"""
+
+    def filter(self, record):
+        return record.threadName != "cache-warmer"
+
+class CacheWarmer:
+    """
+    后台守护线程：数据版本一变 (任何一次写入) 就把所有成员重新预热一遍，
+    页面上下一次打开时直接命中缓存，不用在 spinner 下等全量计算。
+    trigger() 在页面的脚本线程里调用：待办状态都在 self._lock 下读写，唤醒用 Event，
+    预热进行中来的请求也不会丢，做完这一轮马上再做一轮。
+    """
+
+    def __init__(self):
+        ctx_logger = logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context")
+        if not any(isinstance(f, _WarmerLogFilter) for f in ctx_logger.filters):
+            ctx_logger.addFilter(_WarmerLogFilter())
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()  # 保护下面三个待办字段
+        self._force_all = False
+        self._force_users = set()
+        self._pending = False
+        self.warmed_version = None
+        self.last_run = None  # (完成时间, 耗时秒, 成员数)
+        self.thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+        self.thread.start()
+
+    def trigger(self, force=False, user_id=None):
+        """
+        立即预热一次；force=True 时忽略现有缓存 (含硬盘缓存) 全量重算 (“强制刷新数据”)。
+        指定 user_id 就只强制重算这一位成员，其他成员的缓存原样保留。
+        """
+        with self._lock:
+            if force and user_id is None:
+                self._force_all = True
+            elif force:
+                self._force_users.add(user_id)
+            self._pending = True
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            # 先清掉唤醒标记再取待办：之后来的 trigger 会重新置位，下面的 wait 立刻返回
+            self._wake.clear()
+            with self._lock:
+                pending, self._pending = self._pending, False
+                force_all, self._force_all = self._force_all, False
+                force_users, self._force_users = self._force_users, set()
+            version = get_data_version()
+            if pending or version != self.warmed_version:
+                self._warm_all(force_all, force_users)
+                self.warmed_version = version
+            self._wake.wait(WARMUP_POLL_SECONDS)
+
+    def _warm_all(self, force_all=False, force_users=()):
+        import time
+
+        start = time.perf_counter()
+        get_rate_service()
+        users = core.list_user_ids()
+
+        # 多个成员都要全量重算时 (启动、强制刷新、改了汇率等)：分给进程池并行算，多核一起上
+        version = get_data_version()
+        disk_cache = analytics_cache.get_disk_cache()
+        forced = {user_id for user_id, _ in users if force_all or user_id in force_users}
+        full = {}
+        for user_id, _ in users:
+            if user_id in forced:
+                disk_cache.invalidate(user_id)
+            fp = _full_refresh_fingerprint(user_id, user_id in forced)
+            # 硬盘缓存里已有的 (比如重启后没改过数据的成员) 直接读盘就行，不占进程池
+            if fp is not None and not disk_cache.contains(user_id, fingerprint_digest(fp)):
+                full[user_id] = fp
+        if len(full) > 1:
+            try:
+                install_analytics_results(core.compute_analytics_many(list(full)), version, full)
+                forced -= set(full)
+            except Exception as e:
+                print(f"Parallel analytics refresh failed, falling back to serial: {e}")
+
+        # 其余的 (增量重算、单个成员的全量重算) 和筛选索引 (页面进程里的 st.cache_resource，
+        # 只能在本进程里建) 在本线程里补齐；进程池算过的成员在这里都是直接命中
+        for user_id, username in users:
+            if self._stopped.is_set():
+                return
+            try:
+                warm_user_caches(user_id, force=user_id in forced)
+            except Exception as e:
+                print(f"Cache warm-up failed for {username}: {e}")
+        self.last_run = (datetime.now(), time.perf_counter() - start, len(users))
+
+@st.cache_resource(show_spinner=False)
+def _cache_warmer_slot():
+    """跨代码版本共用的槽位：代码热更新后先停掉旧线程，避免两个线程一起算"""
+    return {}
+
+@st.cache_resource(show_spinner=False)
+def _start_cache_warmer(code_version):
+    slot = _cache_warmer_slot()
+    if slot.get('warmer') is not None:
+        slot['warmer'].stop()
+    slot['warmer'] = CacheWarmer()
+    return slot['warmer']
+
+def get_cache_warmer():
+    return _start_cache_warmer(CODE_VERSION)
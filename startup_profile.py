@@ -0,0 +1,123 @@
+"""
+启动耗时分析：每次脚本运行分阶段计时，以及 `python -X importtime` 式的模块导入耗时拆解。
+只用标准库，页面 (app.py 的“🩺 启动诊断”) 和命令行都能用：
+
+    python startup_profile.py          # 打印启动时导入 / 页面里延迟导入的各模块耗时
+"""
+import ast
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+# 只在页面函数里延迟导入的模块 (用到时才付出的代价)
+DEFERRED_IMPORTS = ['pandas', 'numpy', 'plotly.express', 'plotly.graph_objects', 'pyarrow.feather', 'exporter']
+
+RECENT_RUNS = 20  # 保留最近多少次运行的计时
+
+
+class RunTimer:
+    """一次脚本运行的分阶段计时：mark(阶段名) 记录从上一个标记到现在的耗时"""
+
+    def __init__(self, t0):
+        self.t0 = t0
+        self._last = t0
+        self.phases = []  # [(阶段名, 毫秒)]
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    @property
+    def total_ms(self):
+        return (self._last - self.t0) * 1000
+
+
+class StartupLog:
+    """进程级记录：冷启动 (本进程第一次运行) 那一次单独保留，其余只留最近 RECENT_RUNS 次"""
+
+    def __init__(self):
+        self.process_started = datetime.now()
+        self.cold = None
+        self.recent = []
+        self._lock = threading.Lock()
+
+    def record(self, timer, label):
+        run = {'at': datetime.now(), 'label': label, 'phases': list(timer.phases), 'total_ms': timer.total_ms}
+        with self._lock:
+            if self.cold is None:
+                self.cold = run
+            self.recent = (self.recent + [run])[-RECENT_RUNS:]
+
+
+def app_startup_imports(app_file=APP_FILE):
+    """
+    app.py 顶层导入的模块 (决定首屏之前的导入耗时)，标准库除外，按出现顺序。
+    直接读源码，拆分页面、增减依赖之后测的仍然是真实的启动路径。
+    """
+    with open(app_file, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names = [node.module]
+        else:
+            continue
+        modules += [n for n in names if n.split('.')[0] not in sys.stdlib_module_names and n not in modules]
+    return modules
+
+def parse_importtime(stderr, roots):
+    """
+    解析 -X importtime 的输出，返回 {顶层模块: (自身微秒, 累计微秒)}。
+    每一行是 `import time: self [us] | cumulative | 名字`，名字前的缩进是嵌套深度，只取 roots 里的顶层模块。
+    """
+    result = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        name = parts[2][1:].rstrip()  # 分隔符后固定一个空格，再往后的空格才是嵌套缩进
+        if name in roots:
+            result[name] = (int(parts[0]), int(parts[1]))
+    return result
+
+def profile_imports(startup=None, deferred=DEFERRED_IMPORTS, cwd=None, timeout=120):
+    """
+    在一个全新的子进程里按顺序导入 startup (默认 app.py 顶层导入的模块) 再导入 deferred，测出各自的导入耗时。
+    先导入的模块已经带进来的依赖不会重复计时，所以 deferred 的数字就是“首屏之后才付的额外代价”。
+    返回 [(模块, 分组, 自身毫秒, 累计毫秒)]；已被前面的模块顺带导入的 (如 pandas 带进来的 numpy) 和导入失败的不出现在结果里。
+    """
+    if startup is None:
+        startup = app_startup_imports()
+    code = '\n'.join(f"try:\n    import {m}\nexcept Exception:\n    pass" for m in startup + deferred)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True, cwd=cwd, timeout=timeout)
+    times = parse_importtime(proc.stderr, set(startup + deferred))
+    rows = []
+    for group, modules in (('启动时导入', startup), ('延迟导入', deferred)):
+        for m in modules:
+            if m in times:
+                self_us, cum_us = times[m]
+                rows.append((m, group, self_us / 1000, cum_us / 1000))
+    return rows
+
+
+def main():
+    rows = profile_imports()
+    for group in ('启动时导入', '延迟导入'):
+        print(f"== {group} ==")
+        for m, g, self_ms, cum_ms in rows:
+            if g == group:
+                print(f"  {m:<24} {cum_ms:8.1f} ms (自身 {self_ms:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
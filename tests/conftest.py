@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# 测试直接导入项目根目录下的模块 (core、exporter 等)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """init_db.py 建好表的临时数据库，core.DB_FILE 指向它；返回文件路径"""
+    import core
+    import init_db
+
+    path = str(tmp_path / 'asset_tracker.db')
+    monkeypatch.setattr(init_db, 'DB_FILE', path)
+    monkeypatch.setattr(core, 'DB_FILE', path)
+    init_db.init_db()
+    return path
@@ -0,0 +1,60 @@
+import pytest
+
+import api
+
+
+def test_number_parses_and_defaults():
+    assert api._number({'band': '2.5'}, 'band', 0.0) == 2.5
+    assert api._number({}, 'band', 0.0) == 0.0
+    assert api._number({'days': ''}, 'days', 30, cast=int) == 30
+
+
+@pytest.mark.parametrize('query, name, kwargs', [
+    ({'band': 'abc'}, 'band', {}),
+    ({'cash': 'nan'}, 'cash', {}),
+    ({'band': '-1'}, 'band', {'min_value': 0}),
+    ({'days': '0'}, 'days', {'cast': int, 'min_value': 1}),
+    ({'days': '1.5'}, 'days', {'cast': int, 'min_value': 1}),
+])
+def test_number_rejects_bad_input_with_param_name(query, name, kwargs):
+    with pytest.raises(api.BadRequest, match=name):
+        api._number(query, name, 0, **kwargs)
+
+
+def test_bad_rebalance_params_are_rejected_before_lookup():
+    with pytest.raises(api.BadRequest, match='band'):
+        api.rebalance({'tags': None}, 1, {'group': '资产大类', 'band': '-1'})
+
+
+def test_internal_errors_return_500_without_details(db, monkeypatch, capsys):
+    import json
+    import sqlite3
+    import threading
+    import urllib.error
+    import urllib.request
+    from http.server import ThreadingHTTPServer
+
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO users (user_id, username, password_hash) VALUES (1, 'demo', '')")
+    conn.commit()
+    conn.close()
+
+    def boom(entry, user_id, query):
+        raise sqlite3.OperationalError("no such table: secret_table (/home/someone/asset_tracker.db)")
+
+    monkeypatch.setitem(api.ENDPOINTS, 'boom', (boom, False))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), api.ApiHandler)
+    server.verbose = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/api/demo/boom", timeout=10)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    body = err.value.read().decode('utf-8')
+    assert err.value.code == 500
+    assert json.loads(body) == {'error': api.INTERNAL_ERROR_MESSAGE}
+    assert 'secret_table' not in body
+    assert 'secret_table' in capsys.readouterr().err  # 完整的 traceback 留在服务端日志里
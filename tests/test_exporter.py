@@ -0,0 +1,46 @@
+import csv
+import io
+import sqlite3
+
+import pytest
+
+import core
+import exporter
+
+
+def _seed(path):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO users (user_id, username, password_hash) VALUES (1, 'demo', '')")
+    conn.executemany("INSERT INTO assets (asset_id, user_id, name, type, currency) VALUES (?, 1, ?, '股票', ?)",
+                     [(1, '美股', 'USD'), (2, 'A股', 'CNY')])
+    conn.executemany("INSERT INTO exchange_rates (date, currency, rate) VALUES (?, 'USD', ?)",
+                     [('2025-02-01', 7.2), ('2025-03-01', 7.3)])
+    conn.executemany('''
+        INSERT INTO snapshots (asset_id, date, amount, profit, cost) VALUES (?, ?, 100, 10, 90)
+    ''', [(aid, d) for d in ('2025-01-01', '2025-02-15', '2025-03-01') for aid in (1, 2)])
+    conn.commit()
+    conn.close()
+
+
+def _export_rates(path):
+    out = io.BytesIO()
+    exporter.export_dataset(out, path, 1, 'snapshots', 'csv')
+    rows = csv.DictReader(io.StringIO(out.getvalue().decode('utf-8-sig')))
+    return {(r['date'], r['currency']): float(r['rate']) for r in rows}
+
+
+def test_snapshot_before_first_rate_uses_earliest_rate(db):
+    _seed(db)
+    rates = _export_rates(db)
+
+    assert rates[('2025-01-01', 'USD')] == 7.2  # 早于第一条汇率：用最早的汇率，不是 1:1
+    assert rates[('2025-02-15', 'USD')] == 7.2
+    assert rates[('2025-03-01', 'USD')] == 7.3
+    assert rates[('2025-01-01', 'CNY')] == 1.0
+
+
+def test_export_rates_match_dashboard(db):
+    _seed(db)
+    service = core.load_rate_service()
+    for (date, currency), rate in _export_rates(db).items():
+        assert rate == pytest.approx(service.as_of(date, currency))
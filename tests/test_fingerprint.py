@@ -0,0 +1,51 @@
+import sqlite3
+
+import core
+from services.analytics import _analytics_recompute_from
+
+
+def _seed(path):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO users (user_id, username, password_hash) VALUES (1, 'demo', '')")
+    conn.executemany("INSERT INTO assets (asset_id, user_id, name, type) VALUES (?, 1, ?, '基金')",
+                     [(1, 'A'), (2, 'B'), (3, 'C')])
+    conn.executemany('''
+        INSERT INTO snapshots (asset_id, date, amount, profit, cost, yield_rate) VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(aid, d, 1000.0 * aid, 10.0, 1000.0 * aid - 10.0, 1.0)
+          for d in ('2025-01-01', '2025-02-01', '2025-03-01') for aid in (1, 2, 3)])
+    conn.commit()
+    conn.close()
+
+
+def _update(path, sql, params):
+    conn = sqlite3.connect(path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def test_yield_rate_edit_triggers_recompute(db):
+    _seed(db)
+    old = core.analytics_fingerprint(1)
+    _update(db, "UPDATE snapshots SET yield_rate = 5.0 WHERE asset_id = 2 AND date = '2025-02-01'", ())
+    new = core.analytics_fingerprint(1)
+
+    assert _analytics_recompute_from(old, new) == '2025-02-01'
+    assert core.fingerprint_digest(old) != core.fingerprint_digest(new)
+
+
+def test_offsetting_edits_do_not_collide(db):
+    """+1 / -2 / +1 这样总额和按 asset_id 加权的和都不变的修改，也要能发现"""
+    _seed(db)
+    old = core.analytics_fingerprint(1)
+    for aid, delta in ((1, 1.0), (2, -2.0), (3, 1.0)):
+        _update(db, "UPDATE snapshots SET amount = amount + ? WHERE asset_id = ? AND date = '2025-03-01'",
+                (delta, aid))
+    new = core.analytics_fingerprint(1)
+
+    assert _analytics_recompute_from(old, new) == '2025-03-01'
+
+
+def test_unchanged_data_is_reused(db):
+    _seed(db)
+    assert _analytics_recompute_from(core.analytics_fingerprint(1), core.analytics_fingerprint(1)) is None
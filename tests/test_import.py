@@ -0,0 +1,45 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from views.data_entry import _normalize_import_columns, _xlsx_chunk, validate_import_chunk
+
+# 与 services.filters 的筛选索引同名的三张映射表
+FILTER_INDEX = SimpleNamespace(
+    code_to_id={'510300': 1, 'AAPL': 2},
+    name_to_id={'沪深300ETF': 1, '苹果': 2, '货币基金': 3},
+    currency_by_id={1: 'CNY', 2: 'USD', 3: 'CNY'},
+)
+
+
+def _validate(header, rows):
+    """按 openpyxl values_only 读出的样子 (数字、None、datetime) 构造一块再校验"""
+    chunk = _normalize_import_columns(_xlsx_chunk(rows, header))
+    return validate_import_chunk(chunk, FILTER_INDEX, 2)
+
+
+def test_blank_xlsx_cells_behave_like_csv():
+    header = ['日期', '代码', '名称', '市值', '收益', '币种']
+    rows = [
+        (datetime(2025, 1, 2), 510300.0, None, 1000.0, 50.0, None),  # 币种留空
+        (datetime(2025, 1, 2), None, '货币基金', 500, 0, None),     # 代码留空：按名称找，也不会把整列变成 float
+        (datetime(2025, 1, 2), 'AAPL', None, 200.5, -10, 'usd'),
+    ]
+    good, errors = _validate(header, rows)
+
+    assert errors.empty, errors.to_dict('records')
+    assert good['asset_id'].tolist() == [1, 3, 2]
+    assert good['date'].tolist() == ['2025-01-02'] * 3
+
+
+def test_real_errors_are_still_reported():
+    header = ['日期', '代码', '市值', '收益', '币种']
+    rows = [
+        (datetime(2025, 1, 2), 510300, 1000, 50, 'USD'),
+        (datetime(2025, 1, 2), 999999, 1000, 50, None),
+        (None, 510300, None, 50, None),
+    ]
+    good, errors = _validate(header, rows)
+
+    assert good.empty
+    assert errors['行号'].tolist() == [2, 3, 4]
+    assert errors['原因'].tolist() == ["币种与资产设置不一致", "找不到对应的资产 (代码/名称)", "日期无法识别"]
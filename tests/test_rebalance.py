@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import core
+
+
+def _random_case(rng):
+    n = int(rng.integers(2, 8))
+    amounts = rng.choice([0, 1], size=n, p=[0.2, 0.8]) * rng.lognormal(9, 1.5, size=n)
+    if amounts.sum() == 0:
+        amounts[0] = 1000.0
+    target_pct = rng.dirichlet(np.ones(n)) * 100
+    band = float(rng.choice([0, 1, 2, 5]))
+    min_trade = rng.choice([0, 100, 1000, 5000], size=n if rng.random() < 0.3 else None)
+    return amounts, target_pct, band, min_trade
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_sell_mode_is_self_financing(seed):
+    """可以卖出、没有新增资金时，方案总是自负盈亏，也不会卖出超过持有的金额"""
+    rng = np.random.default_rng(seed)
+    for _ in range(2000):
+        amounts, target_pct, band, min_trade = _random_case(rng)
+        x, cash_left = core.solve_rebalance(amounts, target_pct, band, 0.0, True, min_trade)
+        assert abs(cash_left) < 0.01
+        assert (amounts + x >= -1e-6).all()
+
+
+def test_sell_mode_spends_new_cash_exactly():
+    rng = np.random.default_rng(42)
+    for _ in range(2000):
+        amounts, target_pct, band, min_trade = _random_case(rng)
+        new_cash = float(rng.uniform(0, amounts.sum()))
+        x, cash_left = core.solve_rebalance(amounts, target_pct, band, new_cash, True, min_trade)
+        assert abs(cash_left) < 0.01
+        assert abs(x.sum() - new_cash) < 0.01
+
+
+def test_minimal_turnover_inside_bands():
+    """不设最小交易额时，成交额等于把越界标签拉回区间的下限，且调仓后全部落在区间内"""
+    rng = np.random.default_rng(7)
+    for _ in range(2000):
+        n = int(rng.integers(2, 10))
+        amounts = rng.lognormal(9, 1.5, size=n)
+        target_pct = rng.dirichlet(np.ones(n)) * 100
+        band = float(rng.choice([0, 1, 2, 5]))
+        x, _ = core.solve_rebalance(amounts, target_pct, band, 0.0, True, 0.0)
+        total = amounts.sum()
+        lo = np.maximum(target_pct - band, 0) / 100 * total
+        hi = (target_pct + band) / 100 * total
+        lower_bound = 2 * max(np.maximum(lo - amounts, 0).sum(), np.maximum(amounts - hi, 0).sum())
+        post = amounts + x
+        assert np.abs(x).sum() == pytest.approx(lower_bound, abs=1e-6 * total)
+        assert (post >= lo - 1e-6).all() and (post <= hi + 1e-6).all()
+
+
+def test_cash_only_mode_never_sells():
+    x, cash_left = core.solve_rebalance([60000, 30000, 10000], [50, 30, 20], 0.0, 20000, False, 100)
+    assert (x >= 0).all()
+    assert x.sum() + cash_left == pytest.approx(20000)
@@ -0,0 +1,15 @@
+import startup_profile
+
+
+def test_startup_imports_follow_app_py():
+    modules = startup_profile.app_startup_imports()
+    assert {'streamlit', 'services.db', 'services.warmup', 'services.backup', 'services.startup'} <= set(modules)
+    assert 'exporter' not in modules  # 只有看板页才导入
+    assert 'os' not in modules and 'importlib' not in modules  # 标准库不算
+
+
+def test_parse_importtime_reads_dotted_roots():
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |   services.filters\n"
+              "import time:       300 |        900 | services.db\n")
+    assert startup_profile.parse_importtime(stderr, {'services.db'}) == {'services.db': (300, 900)}
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from services import warmup
+
+
+class RecordingWarmer(warmup.CacheWarmer):
+    """不做真正的计算，只记下每一轮被强制刷新的成员"""
+
+    def __init__(self):
+        self.forced = set()
+        self.rounds = 0
+        super().__init__()
+
+    def _warm_all(self, force_all=False, force_users=()):
+        self.forced |= set(force_users)
+        self.rounds += 1
+        time.sleep(0.002)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_concurrent_force_triggers_are_not_lost():
+    warmer = RecordingWarmer()
+    try:
+        def hammer(offset):
+            for user_id in range(offset, 400, 4):
+                warmer.trigger(force=True, user_id=user_id)
+
+        threads = [threading.Thread(target=hammer, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert _wait_for(lambda: warmer.forced == set(range(400)))
+    finally:
+        warmer.stop()
+
+
+def test_trigger_wakes_the_thread_without_waiting_for_the_poll():
+    warmer = RecordingWarmer()
+    try:
+        assert _wait_for(lambda: warmer.rounds >= 1)
+        rounds = warmer.rounds
+        start = time.monotonic()
+        warmer.trigger(force=True, user_id=1)
+        assert _wait_for(lambda: 1 in warmer.forced, timeout=warmup.WARMUP_POLL_SECONDS - 1)
+        assert warmer.rounds > rounds
+        assert time.monotonic() - start < 1.0
+    finally:
+        warmer.stop()
@@ -0,0 +1,270 @@
+"""
+🏦 资产管理：资产与标签的维护。
+"""
+import streamlit as st
+
+from core import get_db_connection, json_ids
+from services.db import save_changes_to_db
+from services.filters import NO_TAG_OPTION, get_asset_filter_index
+
+
+
+def page_assets_tags():
+    import pandas as pd  # 👈 加上这句
+    st.header("资产与标签管理")
+    user_id = st.session_state.user['user_id']
+    conn = get_db_connection()
+    
+    # --- 公共筛选逻辑 (封装在这里以便复用) ---
+    def apply_advanced_filters(df, context_key):
+        """
+        df: 必须包含 asset_id 列
+        返回: 筛选后的 df
+        """
+        filter_index = get_asset_filter_index(user_id)
+        with st.expander("🔍 高级筛选 (支持查找未分类资产)", expanded=False):
+            c1, c2, c3 = st.columns([2, 1, 2])
+            
+            # 1. 关键字搜索
+            with c1:
+                kw = st.text_input("1. 关键字搜索", placeholder="资产名或代码...", key=f"kw_{context_key}")
+            
+            # 2. 标签组选择 (直接读筛选索引，不再查库)
+            groups_list = ["(不筛选)"] + filter_index.groups
+            
+            with c2:
+                sel_group = st.selectbox("2. 选择标签组", groups_list, key=f"grp_{context_key}")
+            
+            # 3. 标签名选择 (根据组动态变化)
+            selected_tag_names = []
+            if sel_group != "(不筛选)":
+                # ★★★ 核心功能：添加【无标签】选项 ★★★
+                options = [NO_TAG_OPTION] + filter_index.tags_by_group[sel_group]
+                
+                with c3:
+                    selected_tag_names = st.multiselect(
+                        f"3. 筛选 '{sel_group}' 下的状态", 
+                        options=options,
+                        key=f"tag_{context_key}",
+                        placeholder="留空则显示全部"
+                    )
+        
+        # --- 开始执行筛选 (关键字 ∩ 标签，全部在内存位图上完成) ---
+        return filter_index.filter(df, kw, None if sel_group == "(不筛选)" else sel_group, selected_tag_names)
+
+    tab1, tab2, tab3 = st.tabs(["1. 资产列表", "2. 标签定义", "3. 关联打标"])
+    
+    # 1. 资产管理
+    with tab1:
+        # --- 修改点: SQL 查询增加 currency ---
+        assets_df = pd.read_sql(
+            'SELECT asset_id, name, code, type, currency, remarks FROM assets WHERE user_id = ?', 
+            conn, params=(user_id,)
+        )
+        
+        # 应用筛选 (保持不变)
+        assets_df = apply_advanced_filters(assets_df, "tab1")
+        
+        st.caption(f"共显示 {len(assets_df)} 条资产")
+        
+        # --- 修改点: 配置 currency 列 ---
+        edited_assets = st.data_editor(
+            assets_df,
+            num_rows="dynamic",
+            column_config={
+                "asset_id": st.column_config.NumberColumn("ID", disabled=True),
+                "name": st.column_config.TextColumn("资产名称", required=True),
+                "code": "代码",
+                "type": st.column_config.SelectboxColumn("大类", options=["基金", "股票", "债券", "现金", "其他"]),
+                # 新增币种选择
+                "currency": st.column_config.SelectboxColumn(
+                    "币种", 
+                    options=["CNY", "USD", "HKD", "JPY", "EUR", "GBP", "BTC"],
+                    required=True,
+                    default="CNY",
+                    width="small"
+                ),
+                "remarks": st.column_config.TextColumn("备注", width="medium")
+            },
+            key="editor_assets",
+            use_container_width=True
+        )
+        
+        if st.button("💾 保存资产变动", type="primary"):
+            if save_changes_to_db(edited_assets, assets_df, 'assets', 'asset_id', user_id, fixed_cols={'user_id': user_id}):
+                st.rerun()
+    
+    # 2. 标签管理 (不需要筛选，逻辑不变)
+    with tab2:
+        tags_df = pd.read_sql('SELECT tag_id, tag_group, tag_name FROM tags WHERE user_id = ?', conn, params=(user_id,))
+        edited_tags = st.data_editor(
+            tags_df,
+            num_rows="dynamic",
+            column_config={
+                "tag_id": st.column_config.NumberColumn("ID", disabled=True),
+                "tag_group": st.column_config.TextColumn("标签组", required=True),
+                "tag_name": st.column_config.TextColumn("标签名", required=True)
+            },
+            key="editor_tags",
+            use_container_width=True
+        )
+        if st.button("💾 保存标签变动", type="primary"):
+            if save_changes_to_db(edited_tags, tags_df, 'tags', 'tag_id', user_id, fixed_cols={'user_id': user_id}):
+                st.rerun()
+
+    # 3. 关联打标 (级联筛选 + 全选支持)
+    with tab3:
+        st.write("### 🏷️ 批量资产打标")
+        
+        # --- A. 准备资产列表数据 ---
+        df_assets_tags = pd.read_sql('''
+            SELECT 
+                a.asset_id, 
+                a.name, 
+                a.code, 
+                GROUP_CONCAT(t.tag_group || '-' || t.tag_name, ', ') as "当前标签"
+            FROM assets a
+            LEFT JOIN asset_tag_map atm ON a.asset_id = atm.asset_id
+            LEFT JOIN tags t ON atm.tag_id = t.tag_id
+            WHERE a.user_id = ?
+            GROUP BY a.asset_id
+        ''', conn, params=(user_id,))
+        
+        # 初始化选择列（默认为 False，后续可能会被全选按钮覆盖）
+        df_assets_tags.insert(0, "选择", False)
+
+        # --- B. 应用高级筛选 ---
+        df_filtered = apply_advanced_filters(df_assets_tags, "tab3")
+        
+        # --- C. 全选/反选 控制区 (新增) ---
+        # 引入 session state 来控制 data_editor 的重置
+        if 'tag_batch_version' not in st.session_state:
+            st.session_state.tag_batch_version = 0
+        if 'tag_batch_default_val' not in st.session_state:
+            st.session_state.tag_batch_default_val = False
+
+        c_info, c_btn1, c_btn2 = st.columns([3, 1, 1])
+        with c_info:
+             st.caption(f"当前筛选结果: {len(df_filtered)} 个资产")
+        
+        with c_btn1:
+            if st.button("✅ 全选当前", key="btn_sel_all", help="选中当前列表中的所有资产", use_container_width=True):
+                st.session_state.tag_batch_default_val = True
+                st.session_state.tag_batch_version += 1 # 强制更新 key，触发表格重绘
+                st.rerun()
+        
+        with c_btn2:
+            if st.button("⬜ 取消全选", key="btn_sel_none", help="取消所有勾选", use_container_width=True):
+                st.session_state.tag_batch_default_val = False
+                st.session_state.tag_batch_version += 1
+                st.rerun()
+
+        # 根据按钮状态，强制设置某一列的值
+        df_filtered["选择"] = st.session_state.tag_batch_default_val
+
+        # --- D. 表格显示 ---
+        # 关键点：key 包含了 version。一旦 version 变了，Streamlit 会认为这是一个全新的表格，
+        # 从而丢弃之前的编辑状态，重新加载 df_filtered (也就是我们刚设为 True 的那些数据)
+        unique_key = f"tag_editor_{len(df_filtered)}_{st.session_state.tag_batch_version}"
+        
+        edited_df = st.data_editor(
+            df_filtered,
+            column_config={
+                "选择": st.column_config.CheckboxColumn("✅", default=False),
+                "asset_id": st.column_config.NumberColumn("ID", disabled=True, width="small"),
+                "name": st.column_config.TextColumn("资产名称", disabled=True),
+                "code": st.column_config.TextColumn("代码", disabled=True),
+                "当前标签": st.column_config.TextColumn("当前标签", disabled=True, width="large"),
+            },
+            hide_index=True,
+            use_container_width=True,
+            key=unique_key
+        )
+        
+        # --- E. 操作区域 (级联标签选择) ---
+        st.divider()
+        st.markdown("##### 🛠️ 批量操作")
+        
+        col_actions, col_submit = st.columns([3, 1])
+        
+        with col_actions:
+            all_tags_data = conn.execute('SELECT tag_id, tag_group, tag_name FROM tags WHERE user_id = ? ORDER BY tag_group, tag_name', (user_id,)).fetchall()
+            
+            if not all_tags_data:
+                st.warning("暂无标签，请先去【标签定义】页签添加。")
+                selected_tags_to_apply = []
+                action_mode = "➕ 添加"
+            else:
+                all_groups = sorted(list(set([t['tag_group'] for t in all_tags_data])))
+                
+                # [第一级] 标签组
+                filter_groups = st.multiselect(
+                    "1. 先筛选标签组", 
+                    options=all_groups,
+                    placeholder="留空则显示全部标签...",
+                    key="tag_action_group_filter"
+                )
+                
+                # [第二级] 具体标签
+                if filter_groups:
+                    available_tags = [t for t in all_tags_data if t['tag_group'] in filter_groups]
+                else:
+                    available_tags = all_tags_data
+                
+                tag_options = {t['tag_id']: f"【{t['tag_group']}】{t['tag_name']}" for t in available_tags}
+                
+                selected_tags_to_apply = st.multiselect(
+                    f"2. 选择要应用的标签 (可选 {len(available_tags)} 个)", 
+                    options=tag_options.keys(), 
+                    format_func=lambda x: tag_options[x],
+                    placeholder="可多选...",
+                    key="tag_action_final_select"
+                )
+                
+                action_mode = st.radio("3. 操作模式", ["➕ 添加 (保留已有)", "🔄 覆盖 (清除旧标)", "➖ 移除 (仅删选中)"], horizontal=True)
+
+        with col_submit:
+            st.write(" ")
+            st.write(" ")
+            st.write(" ")
+            if st.button("🚀 执行更新", type="primary", use_container_width=True):
+                # 统计有多少行被选中了
+                selected_assets = edited_df[edited_df["选择"] == True]["asset_id"].tolist()
+                
+                if not selected_assets:
+                    st.warning("请在表格左侧勾选至少一个资产！")
+                elif not selected_tags_to_apply:
+                    st.warning("请选择要操作的标签！")
+                else:
+                    try:
+                        cursor = conn.cursor()
+                        if "覆盖" in action_mode:
+                            cursor.execute('DELETE FROM asset_tag_map WHERE asset_id IN (SELECT value FROM json_each(?))', (json_ids(selected_assets),))
+                            for aid in selected_assets:
+                                for tid in selected_tags_to_apply:
+                                    cursor.execute('INSERT INTO asset_tag_map (asset_id, tag_id) VALUES (?, ?)', (aid, tid))
+                                    
+                        elif "添加" in action_mode:
+                            for aid in selected_assets:
+                                for tid in selected_tags_to_apply:
+                                    cursor.execute('INSERT OR IGNORE INTO asset_tag_map (asset_id, tag_id) VALUES (?, ?)', (aid, tid))
+                                    
+                        elif "移除" in action_mode:
+                            for aid in selected_assets:
+                                for tid in selected_tags_to_apply:
+                                    cursor.execute('DELETE FROM asset_tag_map WHERE asset_id = ? AND tag_id = ?', (aid, tid))
+                                    
+                        conn.commit()
+                        st.success(f"✅ 成功更新 {len(selected_assets)} 个资产！")
+                        
+                        # 更新后，我们重置一下全选状态，防止误操作
+                        st.session_state.tag_batch_default_val = False
+                        st.session_state.tag_batch_version += 1
+                        
+                        import time
+                        time.sleep(0.5)
+                        st.rerun()
+                    except Exception as e:
+                        conn.rollback()
+                        st.error(str(e))
+    conn.close()
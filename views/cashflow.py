@@ -0,0 +1,141 @@
+"""
+💰 现金流与本金：记录投入/取出，推算累计本金。
+"""
+import streamlit as st
+from datetime import datetime
+
+from core import get_db_connection
+
+
+def page_cashflow():
+    import pandas as pd
+    import plotly.express as px
+    
+    st.header("💰 现金流与本金归集")
+    st.caption("“模糊记账法”核心：只记大额进出，倒推本金投入。")
+    
+    user_id = st.session_state.user['user_id']
+    conn = get_db_connection()
+
+    # --- 1. 顶部：极简录入区 ---
+    with st.container(border=True):
+        st.subheader("➕ 新增记录")
+        c1, c2, c3, c4, c5 = st.columns([2, 2, 2, 3, 1])
+        
+        with c1:
+            record_date = st.date_input("日期", datetime.now(), key="cf_date")
+        
+        with c2:
+            flow_type = st.selectbox("类型", ["📥 收入 (投入本金)", "📤 支出 (消耗本金)"], key="cf_type")
+            
+        with c3:
+            amount = st.number_input("金额", min_value=0.0, step=1000.0, format="%.2f", key="cf_amt")
+            
+        with c4:
+            # 根据类型动态改变建议选项
+            if "收入" in flow_type:
+                options = ["工资/奖金", "理财赎回", "其他收入"]
+            else:
+                options = ["信用卡/花呗账单", "房贷/房租", "大额转账", "其他大额支出"]
+            category = st.selectbox("类别 (可编辑)", options, key="cf_cat") # 也可以用 text_input + suggestions
+            
+        with c5:
+            st.write("")
+            st.write("")
+            if st.button("💾 记一笔", type="primary", use_container_width=True):
+                if amount > 0:
+                    real_type = "收入" if "收入" in flow_type else "支出"
+                    conn.execute('''
+                        INSERT INTO cashflows (user_id, date, type, amount, category, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (user_id, record_date.strftime('%Y-%m-%d'), real_type, amount, category, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                    conn.commit()
+                    st.success("已记录")
+                    import time
+                    time.sleep(0.5)
+                    st.rerun()
+                else:
+                    st.warning("金额需大于0")
+
+    # --- 2. 中部：年度统计卡片 ---
+    current_year = datetime.now().year
+    df_cf = pd.read_sql('''
+        SELECT id, date, type, amount, category, note 
+        FROM cashflows 
+        WHERE user_id = ? 
+        ORDER BY date DESC
+    ''', conn, params=(user_id,))
+    
+    if not df_cf.empty:
+        df_cf['date'] = pd.to_datetime(df_cf['date'])
+        df_cf['year'] = df_cf['date'].dt.year
+        
+        # 本年度统计
+        df_this_year = df_cf[df_cf['year'] == current_year]
+        income_year = df_this_year[df_this_year['type'] == '收入']['amount'].sum()
+        expense_year = df_this_year[df_this_year['type'] == '支出']['amount'].sum()
+        net_input = income_year - expense_year
+        
+        st.divider()
+        st.markdown(f"### 📅 {current_year} 年度本金投入概览")
+        k1, k2, k3 = st.columns(3)
+        k1.metric("📥 本年累计大额收入", f"¥{income_year:,.2f}")
+        k2.metric("📤 本年累计大额支出", f"¥{expense_year:,.2f}")
+        k3.metric("🌱 本年净投入本金", f"¥{net_input:,.2f}", 
+                 delta="这是你的努力存下的钱" if net_input > 0 else "本金正在流出",
+                 delta_color="normal" if net_input > 0 else "inverse")
+
+    # --- 3. 底部：数据管理 (DataEditor) ---
+    st.divider()
+    st.subheader("📋 历史明细管理")
+    
+    if not df_cf.empty:
+        # 为了 DataEditor 显示友好，做一点处理
+        df_display = df_cf[['id', 'date', 'type', 'amount', 'category', 'note']].copy()
+        df_display['date'] = df_display['date'].dt.date
+        
+        edited_df = st.data_editor(
+            df_display,
+            column_config={
+                "id": st.column_config.NumberColumn("ID", disabled=True, width="small"),
+                "date": st.column_config.DateColumn("日期", format="YYYY-MM-DD"),
+                "type": st.column_config.SelectboxColumn("类型", options=["收入", "支出"], required=True),
+                "amount": st.column_config.NumberColumn("金额", format="%.2f", min_value=0),
+                "category": st.column_config.TextColumn("类别"),
+                "note": st.column_config.TextColumn("备注"),
+            },
+            use_container_width=True,
+            num_rows="dynamic",
+            key="cf_editor"
+        )
+        
+        if st.button("💾 保存修改 (支持删除)", type="secondary"):
+            # 复用你的 save_changes_to_db 逻辑，或者简单写个处理
+            # 这里简单写个处理 ID 的逻辑
+            try:
+                # 1. 找出被删除的
+                orig_ids = set(df_cf['id'].tolist())
+                new_ids = set(edited_df['id'].dropna().tolist())
+                del_ids = orig_ids - new_ids
+                
+                for did in del_ids:
+                    conn.execute("DELETE FROM cashflows WHERE id = ?", (did,))
+                
+                # 2. 更新/新增
+                for index, row in edited_df.iterrows():
+                    if pd.isna(row['id']): # 新增
+                         conn.execute("INSERT INTO cashflows (user_id, date, type, amount, category, note) VALUES (?,?,?,?,?,?)",
+                                      (user_id, row['date'], row['type'], row['amount'], row['category'], row['note']))
+                    elif row['id'] in new_ids: # 修改
+                         conn.execute("UPDATE cashflows SET date=?, type=?, amount=?, category=?, note=? WHERE id=?",
+                                      (row['date'], row['type'], row['amount'], row['category'], row['note'], row['id']))
+                
+                conn.commit()
+                st.success("更新成功")
+                st.rerun()
+            except Exception as e:
+                st.error(f"保存失败: {e}")
+    else:
+        st.info("暂无记录，请在上方添加。")
+
+    conn.close()
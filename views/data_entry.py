@@ -0,0 +1,460 @@
+"""
+📝 数据录入：按日期录入快照，以及 CSV / Excel 历史快照批量导入。
+"""
+import streamlit as st
+from datetime import datetime
+
+from core import get_db_connection, get_data_version
+from services.rates import get_rate_service
+from services.filters import NO_TAG_OPTION, get_asset_filter_index
+
+
+# ==============================================================================
+# 📥 批量导入：CSV / Excel 历史快照 (分块解析 + 向量化校验 + 批量 upsert)
+# ==============================================================================
+IMPORT_CHUNK_ROWS = 5000
+# 表头别名 (不区分大小写)：标准列名 -> 可接受的写法
+IMPORT_COLUMN_ALIASES = {
+    'date': ['date', '日期', '快照日期'],
+    'code': ['code', '代码', '资产代码'],
+    'name': ['name', '名称', '资产名称', '资产'],
+    'amount': ['amount', '市值', '金额', '总金额'],
+    'profit': ['profit', '收益', '持有收益'],
+    'currency': ['currency', '币种'],
+}
+
+def excel_import_available():
+    """装了 openpyxl 才能导入 .xlsx (只查找、不导入，不拖慢页面)"""
+    import importlib.util
+
+    return importlib.util.find_spec('openpyxl') is not None
+
+def _xlsx_cell(value):
+    """
+    Excel 单元格 -> 字符串，和 CSV (keep_default_na=False) 读出来的一样：
+    空单元格是 ''，整数代码 510300.0 还原成 510300
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _xlsx_chunk(rows, header):
+    """一块 Excel 行 -> 全字符串列的 DataFrame (object 列，不让 pandas 把带空格的代码列推断成 float)"""
+    import pandas as pd
+
+    return pd.DataFrame([[_xlsx_cell(v) for v in row] for row in rows], columns=header, dtype=object)
+
+def _iter_import_chunks(file, filename):
+    """按块读取上传文件，每块是一个全字符串列的 DataFrame (不会一次把整个文件读进内存)"""
+    import codecs
+    import pandas as pd
+
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook  # 只有导入 Excel 时才需要
+
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+            buf = []
+            for row in rows:
+                buf.append(row)
+                if len(buf) == IMPORT_CHUNK_ROWS:
+                    yield _xlsx_chunk(buf, header)
+                    buf = []
+            if buf:
+                yield _xlsx_chunk(buf, header)
+        finally:
+            wb.close()
+        return
+
+    # CSV：先用开头一段判断编码 (Excel 另存的中文 CSV 常见 GBK)
+    sample = file.read(65536)
+    file.seek(0)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'gbk'
+    yield from pd.read_csv(file, dtype=str, encoding=encoding, chunksize=IMPORT_CHUNK_ROWS,
+                           keep_default_na=False, skipinitialspace=True)
+
+def _normalize_import_columns(df):
+    """把表头映射成标准列名；缺少必需列时抛 ValueError"""
+    lookup = {alias.lower(): std for std, aliases in IMPORT_COLUMN_ALIASES.items() for alias in aliases}
+    df = df.rename(columns=lambda c: lookup.get(str(c).strip().lower(), c))
+    missing = [c for c in ('date', 'amount', 'profit') if c not in df.columns]
+    if 'code' not in df.columns and 'name' not in df.columns:
+        missing.append('code/name')
+    if missing:
+        raise ValueError(f"缺少必需的列: {', '.join(missing)}")
+    return df
+
+def validate_import_chunk(df, filter_index, first_row_no):
+    """
+    向量化校验一块数据。
+    返回 (可写入的行 [asset_id, date, amount, profit, cost, yield_rate], 错误行 [行号, 原因])
+    first_row_no: 这一块第一行在文件里的行号 (表头算第 1 行)
+    """
+    import numpy as np
+    import pandas as pd
+
+    row_no = pd.Series(np.arange(first_row_no, first_row_no + len(df)), index=df.index)
+    dates = pd.to_datetime(df['date'].str.strip(), errors='coerce', format='mixed')
+    amount = pd.to_numeric(df['amount'].str.replace(',', '', regex=False).str.strip(), errors='coerce')
+    profit = pd.to_numeric(df['profit'].str.replace(',', '', regex=False).str.strip(), errors='coerce')
+
+    # 先按代码找资产，找不到再按名称找
+    asset_id = pd.Series(np.nan, index=df.index)
+    if 'code' in df.columns:
+        asset_id = df['code'].str.strip().str.upper().map(filter_index.code_to_id)
+    if 'name' in df.columns:
+        asset_id = asset_id.fillna(df['name'].str.strip().map(filter_index.name_to_id))
+
+    currency_ok = pd.Series(True, index=df.index)
+    if 'currency' in df.columns:
+        given = df['currency'].str.strip().str.upper()
+        expected = asset_id.map(filter_index.currency_by_id).fillna('')
+        currency_ok = (given == '') | (given == expected.str.upper())
+
+    reason = pd.Series(np.select(
+        [asset_id.isna(), dates.isna(), amount.isna(), profit.isna(), ~currency_ok],
+        ["找不到对应的资产 (代码/名称)", "日期无法识别", "市值不是数字", "收益不是数字", "币种与资产设置不一致"],
+        default=''), index=df.index)
+    bad = reason != ''
+    errors = pd.DataFrame({'行号': row_no[bad], '原因': reason[bad]})
+
+    ok = ~bad
+    cost = amount[ok] - profit[ok]
+    good = pd.DataFrame({
+        'asset_id': asset_id[ok].astype(int),
+        'date': dates[ok].dt.strftime('%Y-%m-%d'),
+        'amount': amount[ok],
+        'profit': profit[ok],
+        'cost': cost,
+        # 与手工录入一致：收益率 = 收益 / 本金
+        'yield_rate': np.divide(profit[ok].to_numpy() * 100, cost.to_numpy(), out=np.zeros(len(cost)), where=cost.to_numpy() != 0),
+    })
+    return good, errors
+
+def import_snapshots(file, filename, user_id):
+    """
+    批量导入快照：逐块解析 -> 校验 -> executemany upsert，每块一个事务。
+    同一资产同一天重复出现时以后面的为准；已存在的快照会被覆盖 (清仓标记保持不变)。
+    返回 (写入条数, 错误明细 DataFrame)。
+    """
+    import pandas as pd
+
+    filter_index = get_asset_filter_index(user_id)
+    imported, error_parts, offset = 0, [], 2
+    conn = get_db_connection()
+    try:
+        for chunk in _iter_import_chunks(file, filename):
+            chunk = _normalize_import_columns(chunk)
+            good, errors = validate_import_chunk(chunk, filter_index, offset)
+            offset += len(chunk)
+            if not errors.empty:
+                error_parts.append(errors)
+            if good.empty:
+                continue
+            with conn:
+                conn.executemany('''
+                    INSERT INTO snapshots (asset_id, date, amount, profit, cost, yield_rate)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(asset_id, date) DO UPDATE SET
+                    amount=excluded.amount, profit=excluded.profit,
+                    cost=excluded.cost, yield_rate=excluded.yield_rate
+                ''', good.itertuples(index=False, name=None))
+            imported += len(good)
+    finally:
+        conn.close()
+    errors = pd.concat(error_parts, ignore_index=True) if error_parts else pd.DataFrame(columns=['行号', '原因'])
+    return imported, errors
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_entry_grid(user_id, str_date, data_version):
+    """
+    数据录入表格一次查完 (data_version 只参与缓存 key)：
+      资产基础信息 + 历史最新清仓状态 (窗口函数取每个资产最近一条快照) + 所选日期已录入的快照。
+    返回 (表格, 当天已录入条数)。
+    """
+    import pandas as pd
+
+    local_conn = get_db_connection()
+    try:
+        grid = pd.read_sql('''
+            WITH latest AS (
+                SELECT asset_id, is_cleared,
+                       ROW_NUMBER() OVER (PARTITION BY asset_id ORDER BY date DESC) AS rn
+                FROM snapshots
+                WHERE asset_id IN (SELECT asset_id FROM assets WHERE user_id = ?)
+            )
+            SELECT a.asset_id, a.name, a.code, a.currency,
+                   COALESCE(l.is_cleared, 0) AS is_cleared_last,
+                   t.amount, t.profit, t.cost, t.yield_rate,
+                   t.is_cleared AS is_cleared_today,
+                   COUNT(t.asset_id) OVER () AS exist_count
+            FROM assets a
+            LEFT JOIN latest l ON l.asset_id = a.asset_id AND l.rn = 1
+            LEFT JOIN snapshots t ON t.asset_id = a.asset_id AND t.date = ?
+            WHERE a.user_id = ?
+            ORDER BY a.asset_id
+        ''', local_conn, params=(user_id, str_date, user_id))
+    finally:
+        local_conn.close()
+
+    exist_count = int(grid['exist_count'].iloc[0]) if not grid.empty else 0
+    grid = grid.drop(columns='exist_count')
+    # 如果以前没记录，默认为 0 (未清仓)
+    grid['is_cleared_last'] = grid['is_cleared_last'].astype(bool)
+    return grid, exist_count
+
+def page_data_entry():
+    import pandas as pd  # 👈 加上这句
+    st.header("📝 每日资产快照录入")
+    user_id = st.session_state.user['user_id']
+    conn = get_db_connection()
+    
+    # 日期选择
+    col_date, _ = st.columns([1, 2])
+    with col_date:
+        date = st.date_input("选择快照日期", datetime.now())
+        str_date = date.strftime('%Y-%m-%d')
+
+    # 批量导入 (券商导出的历史记录一次导进来)
+    with st.expander("📥 批量导入历史快照 (CSV / Excel)", expanded=False):
+        st.caption("表头需包含：日期、代码 或 名称、市值、收益，可选 币种 (也支持英文 date / code / name / amount / profit / currency)。"
+                   "金额按资产原币种填写；同一资产同一天已有记录时会被覆盖。")
+        # 没装 openpyxl 时只收 CSV，不让用户传了 Excel 才报错
+        excel_ok = excel_import_available()
+        if not excel_ok:
+            st.caption("ℹ️ 当前环境未安装 openpyxl，暂时只能导入 CSV (pip install openpyxl 后即可导入 Excel)")
+        up_file = st.file_uploader("选择文件", type=['csv', 'xlsx'] if excel_ok else ['csv'], key="snapshot_import_file")
+        if up_file is not None and st.button("🚀 开始导入", key="btn_snapshot_import"):
+            try:
+                with st.spinner("正在导入..."):
+                    n_ok, import_errors = import_snapshots(up_file, up_file.name, user_id)
+            except ImportError:
+                st.error("导入 Excel 需要安装 openpyxl：pip install openpyxl (或先另存为 CSV)")
+            except ValueError as e:
+                st.error(f"文件格式不正确: {e}")
+            else:
+                if n_ok:
+                    st.cache_data.clear()
+                    st.success(f"已导入 {n_ok} 条快照！")
+                if not import_errors.empty:
+                    st.warning(f"有 {len(import_errors)} 行未导入，请修正后重新导入这些行：")
+                    st.dataframe(import_errors, hide_index=True, use_container_width=True)
+                    st.download_button("📥 下载错误明细", import_errors.to_csv(index=False).encode('utf-8-sig'),
+                                       file_name='import_errors.csv', mime='text/csv')
+
+    # 1. 准备基础数据：资产 + 清仓状态 + 当日快照，一条 SQL 取回 (按用户/日期/数据版本缓存)
+    assets, exist_count = load_entry_grid(user_id, str_date, get_data_version())
+    
+    if assets.empty:
+        st.warning("暂无资产，请先去【资产与标签管理】添加资产。")
+        conn.close()
+        return
+
+    # --- 2. 汇率录入区 (保持不变) ---
+    if 'currency' in assets.columns:
+        unique_currencies = assets['currency'].unique().tolist()
+        foreign_currencies = [c for c in unique_currencies if c and c != 'CNY']
+    else:
+        foreign_currencies = []
+    
+    if foreign_currencies:
+        with st.expander(f"💱 设置当日汇率 ({str_date})", expanded=True):
+            st.caption("检测到您持有外币资产，请确认当日汇率（对人民币）：")
+            rate_service = get_rate_service()
+            cols = st.columns(len(foreign_currencies) + 1)
+            rates_to_save = {}
+            for i, curr in enumerate(foreign_currencies):
+                # 当天已录过就回显当天的；没录过就带出截至当天最近的一次汇率
+                default_val = rate_service.on_date(str_date, curr)
+                if default_val is None:
+                    default_val = rate_service.as_of(str_date, curr)
+                with cols[i]:
+                    r = st.number_input(f"{curr} ➡️ CNY", value=float(default_val), format="%.4f", key=f"rate_{curr}_{str_date}")
+                    rates_to_save[curr] = r
+            with cols[-1]:
+                st.write(""); st.write("") 
+                if st.button("💾 保存汇率", type="secondary"):
+                    try:
+                        for curr, rate in rates_to_save.items():
+                            conn.execute("INSERT OR REPLACE INTO exchange_rates (date, currency, rate) VALUES (?, ?, ?)", (str_date, curr, rate))
+                        conn.commit()
+                        st.toast("汇率已更新", icon="💱")
+                    except Exception as e: st.error(f"汇率保存失败: {e}")
+
+    # --- 3. 筛选与排序工具 (升级版) ---
+    with st.expander("🔍 筛选与排序工具", expanded=True):
+        # 第一行：核心筛选
+        c1, c2, c3 = st.columns([2, 1, 2])
+        with c1:
+            kw = st.text_input("关键字搜索", placeholder="名称/代码")
+        with c2:
+            # 🔥 新增：隐藏已清仓开关 (默认开启)
+            hide_cleared = st.checkbox("🙈 隐藏已清仓资产", value=True, help="勾选后，上次记录为【已清仓】的资产将不会显示在下方")
+        with c3:
+            filter_index = get_asset_filter_index(user_id)
+            grp_list = ["(不筛选)"] + filter_index.groups
+            sel_group = st.selectbox("标签组", grp_list)
+            
+        # 第二行：标签细分与排序
+        s1, s2 = st.columns([2, 2])
+        with s1:
+            sel_tags = []
+            if sel_group != "(不筛选)":
+                opts = [NO_TAG_OPTION] + filter_index.tags_by_group[sel_group]
+                sel_tags = st.multiselect("标签名", opts)
+        with s2:
+            sort_option = st.radio("排序依据", ["默认 (ID)", "💰 总金额 (高→低)", "💰 总金额 (低→高)", "📈 持有收益 (高→低)"], horizontal=True)
+
+    # --- 4. 清仓状态 ---
+    # is_cleared_last 是每个资产“数据库里最新一条记录”的状态 (已在 load_entry_grid 里用窗口函数取好)
+    # 这里的逻辑是：不管你选哪天录入，我们都参考该资产最新的状态来决定是否隐藏
+
+    # --- 5. 执行筛选 ---
+    filtered_df = assets
+    
+    # A. 隐藏已清仓逻辑 (核心功能)
+    if hide_cleared:
+        # 只保留 is_cleared_last == False 的 (即未清仓的)
+        filtered_df = filtered_df[filtered_df['is_cleared_last'] == False]
+    
+    # B/C. 关键字 + 标签 (共用筛选索引，位图求交集)
+    filtered_df = filter_index.filter(filtered_df, kw, None if sel_group == "(不筛选)" else sel_group, sel_tags)
+
+    # --- 6. 准备编辑表格 ---
+    if filtered_df.empty:
+        st.info("没有符合条件的资产 (可能都被隐藏了，尝试取消勾选'隐藏已清仓')。")
+    else:
+        # 当日快照已经随表格一起查好 (amount/profit/... 为空表示当天还没录)
+        # 注意：这里有两个 is_cleared。
+        # is_cleared_last 是“历史最新状态”(用于筛选)，
+        # is_cleared_today 是“当天已保存的状态”(用于编辑)。
+        # 我们优先使用“当天已保存的状态”，如果当天还没存，默认使用“历史最新状态”来填充（这就是所谓的继承！）
+        
+        merged = filtered_df.copy()
+        
+        # 填充数值
+        merged['amount'] = merged['amount'].fillna(0.0)
+        merged['profit'] = merged['profit'].fillna(0.0)
+        merged['yield_rate'] = merged['yield_rate'].fillna(0.0)
+        
+        # 核心继承逻辑：
+        # 如果 _today 是 NaN (说明今天还没填)，就用 _last (上次的状态)
+        # 如果 _today 有值，就用 _today
+        merged['is_cleared'] = merged['is_cleared_today'].combine_first(merged['is_cleared_last'])
+        # 确保是布尔值
+        merged['is_cleared'] = merged['is_cleared'].astype(bool)
+
+        # 排序
+        if "总金额 (高→低)" in sort_option: merged = merged.sort_values(by='amount', ascending=False)
+        elif "总金额 (低→高)" in sort_option: merged = merged.sort_values(by='amount', ascending=True)
+        elif "持有收益 (高→低)" in sort_option: merged = merged.sort_values(by='profit', ascending=False)
+        
+        # --- 7. 显示表格 ---
+        st.caption(f"当前显示: {len(merged)} 条 | 💡 勾选【🏁】列表示已清仓，下次录入时会自动隐藏")
+
+        col_cfg = {
+            "asset_id": st.column_config.NumberColumn("ID", disabled=True, width="small"),
+            "name": st.column_config.TextColumn("资产名称", disabled=True),
+            "code": st.column_config.TextColumn("代码", disabled=True),
+            "amount": st.column_config.NumberColumn("💰 市值 (原币)", format="%.2f", required=True),
+            "profit": st.column_config.NumberColumn("📈 收益 (原币)", format="%.2f", required=True),
+            "cost": st.column_config.NumberColumn("本金", disabled=True, format="%.2f"),
+            "yield_rate": st.column_config.NumberColumn("收益率", disabled=True, format="%.2f%%"),
+            # 🔥 新增列配置
+            "is_cleared": st.column_config.CheckboxColumn("🏁 清仓?", help="勾选后表示该资产已清仓"),
+        }
+        if 'currency' in merged.columns:
+            col_cfg["currency"] = st.column_config.TextColumn("币", disabled=True, width="small")
+
+        edited_snapshot = st.data_editor(
+            merged,
+            column_config=col_cfg,
+            hide_index=True,
+            use_container_width=True,
+            # 这里的 key 很重要，加上 hide_cleared 状态，确保切换筛选时表格重绘
+            key=f"entry_{str_date}_{kw}_{hide_cleared}_{sort_option}"
+        )
+
+        # --- 8. 保存逻辑 ---
+        if st.button("💾 保存当前数据", type="primary"):
+            try:
+                c = 0
+                for _, row in edited_snapshot.iterrows():
+                    amt = float(row['amount'])
+                    prof = float(row['profit'])
+                    # 如果用户勾选了清仓，通常金额应该是0，但我们不强制改写，保留用户输入
+                    is_clr = 1 if row['is_cleared'] else 0
+                    
+                    cost = amt - prof
+                    y_rate = (prof / cost * 100) if cost != 0 else 0.0
+                    
+                    # 插入或更新，包含 is_cleared
+                    conn.execute('''
+                        INSERT INTO snapshots (asset_id, date, amount, profit, cost, yield_rate, is_cleared) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(asset_id, date) DO UPDATE SET 
+                        amount=excluded.amount, profit=excluded.profit, 
+                        cost=excluded.cost, yield_rate=excluded.yield_rate,
+                        is_cleared=excluded.is_cleared
+                    ''', (row['asset_id'], str_date, amt, prof, cost, y_rate, is_clr))
+                    c += 1
+                conn.commit()
+                st.cache_data.clear()
+                st.success(f"已保存 {c} 条记录！")
+                # 稍微延迟一下自动刷新，让用户看到成功提示
+                import time
+                time.sleep(0.5)
+                st.rerun()
+            except Exception as e:
+                st.error(f"保存失败: {e}")
+
+        # --- [插入位置开始] ---
+        st.write("")
+        st.write("")
+        st.divider()
+        
+        # 9. 删除/重置当日数据 (新增功能)
+        # 先检查一下当天有没有数据，有数据才显示删除按钮 (exist_count 随表格一起查出)
+
+        if exist_count > 0:
+            with st.expander(f"🗑️ 删除/重置 【{str_date}】 的数据", expanded=False):
+                st.warning(f"警告：检测到 {str_date} 已有 {exist_count} 条资产记录。")
+                st.info("如果你是不小心录错日期（例如把昨天的录成了今天），点击下方按钮可以彻底清除今日记录。清除后，看板将不会把今天算作 0，而是直接跳过今天。")
+                
+                # 双重确认按钮（防止误触）
+                col_del_1, col_del_2 = st.columns([1, 4])
+                with col_del_1:
+                    if st.button("🧨 确认彻底删除", type="primary", key="btn_delete_daily"):
+                        try:
+                            # 执行删除操作
+                            # 逻辑：删除 snapshots 表中，属于该用户且日期为选定日期的所有记录
+                            conn.execute('''
+                                DELETE FROM snapshots 
+                                WHERE date = ? 
+                                AND asset_id IN (SELECT asset_id FROM assets WHERE user_id = ?)
+                            ''', (str_date, user_id))
+                            
+                            conn.commit()
+                            st.success(f"已成功删除 {str_date} 的所有记录！")
+                            
+                            # 稍微停顿一下让用户看到提示，然后刷新页面
+                            import time
+                            time.sleep(1)
+                            st.rerun()
+                            
+                        except Exception as e:
+                            st.error(f"删除失败: {e}")
+        else:
+            # 如果当天没数据，显示一个灰色的提示
+            st.caption(f"📅 当前日期 {str_date} 暂无录入数据，无需删除。")
+        # --- [插入位置结束] ---
+    conn.close()
@@ -0,0 +1,224 @@
+"""
+📒 投资笔记：时间轴 (keyset 分页) + 全文检索。
+"""
+import re
+import streamlit as st
+from datetime import datetime
+
+from core import get_db_connection
+
+
+NOTES_PAGE_SIZE = 10
+# FTS 高亮的起止标记：用笔记里不会出现的控制字符，先转义 Markdown 再换成 Streamlit 的高亮语法，
+# 不会和标题外层的 ** 或正文里本来的 * _ [ ] 之类的符号搅在一起
+HL_START, HL_END = '\x02', '\x03'
+_MD_SPECIAL = re.compile(r'([\\`*_{}\[\]()#+\-.!|<>~$:])')
+
+def render_highlight(text):
+    """纯文本 (可带 HL_START/HL_END 标记) -> Markdown：符号全部转义，命中的词加橙色底色"""
+    escaped = _MD_SPECIAL.sub(r'\\\1', text or '')
+    return escaped.replace(HL_START, ':orange-background[').replace(HL_END, ']')
+
+def query_notes_page(conn, user_id, keyword="", cursor=None, page_size=NOTES_PAGE_SIZE):
+    """
+    只查一页笔记：按 (created_at, note_id) 倒序做 keyset 分页，翻页不用 OFFSET 扫描前面的几年笔记。
+    keyword 非空时走 FTS5 全文检索，并返回带高亮标记 (HL_START/HL_END) 的 title_hl / snippet；
+    关键字不足 3 个字 (trigram 无法匹配) 或数据库没有 FTS5 时退回 LIKE。
+    cursor: 上一页最后一条的 (created_at, note_id)
+    返回 (本页笔记 DataFrame, 下一页 cursor；没有下一页时为 None)
+    """
+    import pandas as pd
+
+    keyword = keyword.strip()
+    has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'investment_notes_fts'").fetchone()
+    where, params = ["n.user_id = ?"], [user_id]
+    if keyword and has_fts and len(keyword) >= 3:
+        select = '''
+            SELECT n.note_id, n.title, n.content, n.created_at, n.updated_at,
+                   highlight(investment_notes_fts, 0, char(2), char(3)) AS title_hl,
+                   snippet(investment_notes_fts, 1, char(2), char(3), '…', 32) AS snippet
+            FROM investment_notes_fts
+            JOIN investment_notes n ON n.note_id = investment_notes_fts.rowid
+        '''
+        where.append("investment_notes_fts MATCH ?")
+        params.append('"' + keyword.replace('"', '""') + '"')  # 整体当作一个短语
+    else:
+        select = '''
+            SELECT n.note_id, n.title, n.content, n.created_at, n.updated_at,
+                   NULL AS title_hl, NULL AS snippet
+            FROM investment_notes n
+        '''
+        if keyword:
+            like = '%' + keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            where.append("(n.title LIKE ? ESCAPE '\\' OR n.content LIKE ? ESCAPE '\\')")
+            params += [like, like]
+
+    if cursor is not None:
+        where.append("(n.created_at < ? OR (n.created_at = ? AND n.note_id < ?))")
+        params += [cursor[0], cursor[0], cursor[1]]
+
+    # 多取一条，用来判断还有没有下一页
+    sql = f"{select} WHERE {' AND '.join(where)} ORDER BY n.created_at DESC, n.note_id DESC LIMIT ?"
+    notes = pd.read_sql(sql, conn, params=params + [page_size + 1])
+    if len(notes) <= page_size:
+        return notes, None
+    notes = notes.iloc[:page_size]
+    last = notes.iloc[-1]
+    return notes, (last['created_at'], int(last['note_id']))
+
+def page_investment_notes():
+    import pandas as pd  # 👈 加上这句
+    st.header("📒 投资笔记与复盘")
+    st.caption("记录每一次决策的思考，构建自己的投资体系。")
+    
+    user_id = st.session_state.user['user_id']
+    conn = get_db_connection()
+
+    # --- 状态管理 ---
+    # 我们只需要记录当前正在编辑哪一个 note_id
+    if 'editing_note_id' not in st.session_state:
+        st.session_state.editing_note_id = None
+
+    # --- A. 顶部：仅用于新建笔记 ---
+    # 使用 expander 收纳，显得页面更干净，想写的时候再点开
+    with st.expander("✍️ 写一篇新笔记", expanded=False):
+        new_title = st.text_input("标题", placeholder="例如：美股大跌，加仓机会？", key="new_note_title")
+        new_content = st.text_area("正文", height=100, placeholder="记录你的分析、情绪和操作计划...", key="new_note_content")
+        
+        if st.button("🚀 发布笔记", type="primary"):
+            if not new_title.strip():
+                st.warning("标题不能为空")
+            else:
+                try:
+                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    conn.execute('''
+                        INSERT INTO investment_notes (user_id, title, content, created_at, updated_at) 
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (user_id, new_title, new_content, timestamp, timestamp))
+                    conn.commit()
+                    st.success("发布成功！")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"发布失败: {e}")
+
+    st.divider()
+
+    # --- B. 时间轴展示区 (含原地编辑逻辑) ---
+    st.subheader("⏳ 笔记时间轴")
+    
+    search_kw = st.text_input("🔎 搜索笔记", placeholder="标题或正文里的关键字...", key="notes_search")
+
+    # 翻页状态：每页起点的 cursor 栈，换了搜索词就回到第一页
+    if st.session_state.get('notes_cursor_query') != search_kw:
+        st.session_state.notes_cursor_query = search_kw
+        st.session_state.notes_cursors = [None]
+    cursors = st.session_state.notes_cursors
+
+    notes, next_cursor = query_notes_page(conn, user_id, search_kw, cursors[-1])
+    if notes.empty and len(cursors) > 1:
+        # 本页最后几条被删光了，退回上一页
+        cursors.pop()
+        st.rerun()
+
+    if notes.empty:
+        if search_kw.strip():
+            st.info(f"没有找到包含「{search_kw.strip()}」的笔记。")
+        else:
+            st.info("还没有笔记，快去写第一篇吧！")
+    else:
+        for index, note in notes.iterrows():
+            note_id = note['note_id']
+            
+            # 使用 container 模拟卡片
+            with st.container(border=True):
+                
+                # === 判断：当前是否处于编辑模式 ===
+                if st.session_state.editing_note_id == note_id:
+                    # >>>>> 编辑模式界面 >>>>>
+                    st.markdown("##### 📝 编辑中...")
+                    
+                    # 输入框 (默认值为当前笔记内容)
+                    edit_title = st.text_input("标题", value=note['title'], key=f"edit_title_{note_id}")
+                    edit_content = st.text_area("正文", value=note['content'], height=150, key=f"edit_content_{note_id}")
+                    
+                    col_save, col_cancel = st.columns([1, 5])
+                    with col_save:
+                        if st.button("💾 保存", type="primary", key=f"save_{note_id}"):
+                            if not edit_title.strip():
+                                st.warning("标题不能为空")
+                            else:
+                                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                                conn.execute('''
+                                    UPDATE investment_notes 
+                                    SET title = ?, content = ?, updated_at = ? 
+                                    WHERE note_id = ?
+                                ''', (edit_title, edit_content, timestamp, note_id))
+                                conn.commit()
+                                # 退出编辑模式
+                                st.session_state.editing_note_id = None
+                                st.rerun()
+                    
+                    with col_cancel:
+                        if st.button("❌ 取消", key=f"cancel_{note_id}"):
+                            # 退出编辑模式，不保存
+                            st.session_state.editing_note_id = None
+                            st.rerun()
+                    # <<<<< 编辑模式结束 <<<<<
+
+                else:
+                    # >>>>> 浏览模式界面 >>>>>
+                    # 1. 标题行
+                    col_title, col_time = st.columns([3, 1])
+                    with col_title:
+                        st.markdown(f"**{render_highlight(note['title_hl'] or note['title'])}**")
+                    with col_time:
+                        t_str = pd.to_datetime(note['created_at']).strftime('%Y-%m-%d %H:%M')
+                        st.caption(f"📅 {t_str}")
+
+                    # 2. 正文 (已修复换行显示问题)；搜索时只显示命中的高亮片段
+                    content = note['content'] or ''
+                    if note['snippet']:
+                        st.markdown(render_highlight(note['snippet']).replace('\n', '  \n'))
+                        with st.expander("查看全文"):
+                            st.markdown(content.replace('\n', '  \n'))
+                    else:
+                        st.markdown(content.replace('\n', '  \n'))
+                    
+                    # 3. 底部操作栏
+                    st.divider()
+                    f_c1, f_c2, f_c3 = st.columns([4, 1, 1])
+                    
+                    with f_c1:
+                        # 显示最后修改时间
+                        if note['updated_at'] != note['created_at']:
+                            up_str = pd.to_datetime(note['updated_at']).strftime('%Y-%m-%d %H:%M')
+                            st.caption(f"📝 修改于: {up_str}")
+                    
+                    with f_c2:
+                        # 点击编辑，更新 state，触发 rerun，下一次渲染就会进入上面的 if 分支
+                        if st.button("✏️ 编辑", key=f"btn_edit_{note_id}"):
+                            st.session_state.editing_note_id = note_id
+                            st.rerun()
+                    
+                    with f_c3:
+                        if st.button("🗑️ 删除", key=f"btn_del_{note_id}"):
+                            conn.execute('DELETE FROM investment_notes WHERE note_id = ?', (note_id,))
+                            conn.commit()
+                            st.success("已删除")
+                            st.rerun()
+                    # <<<<< 浏览模式结束 <<<<<
+
+        # --- C. 翻页 ---
+        p_prev, p_info, p_next = st.columns([1, 4, 1])
+        with p_prev:
+            if st.button("⬅️ 上一页", disabled=len(cursors) == 1, key="notes_prev"):
+                cursors.pop()
+                st.rerun()
+        with p_info:
+            st.caption(f"第 {len(cursors)} 页")
+        with p_next:
+            if st.button("下一页 ➡️", disabled=next_cursor is None, key="notes_next"):
+                cursors.append(next_cursor)
+                st.rerun()
+    
+    conn.close()
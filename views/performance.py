@@ -0,0 +1,211 @@
+"""
+🏆 累计收益：各资产/标签的收益排行。
+"""
+import streamlit as st
+
+from core import get_db_connection
+
+
+def page_performance():
+    import pandas as pd
+    import plotly.express as px
+    import calendar
+    from datetime import datetime, timedelta
+
+    st.header("🏆 投资战绩与月度复盘")
+    st.caption("手动记录每月的最终战果，不纠结过程，只看结果。")
+
+    user_id = st.session_state.user['user_id']
+    conn = get_db_connection()
+
+    # --- 1. 核心维度选择 (数据隔离墙) ---
+    all_groups_df = pd.read_sql("SELECT DISTINCT tag_group FROM tags WHERE user_id = ?", conn, params=(user_id,))
+    
+    if all_groups_df.empty:
+        st.warning("⚠️ 请先去【资产与标签管理】定义标签组（例如新建一个组叫“资金渠道”）。")
+        conn.close()
+        return
+
+    # 智能定位默认组
+    default_idx = 0
+    g_list = all_groups_df['tag_group'].tolist()
+    for kw in ["渠道", "账户", "来源"]:
+        matches = [i for i, x in enumerate(g_list) if kw in x]
+        if matches:
+            default_idx = matches[0]
+            break
+            
+    selected_group = st.selectbox("📂 记账维度", g_list, index=default_idx)
+    
+    # 获取该组下的标签
+    tags_in_group = pd.read_sql("SELECT tag_name FROM tags WHERE user_id = ? AND tag_group = ?", 
+                              conn, params=(user_id, selected_group))
+    
+    if tags_in_group.empty:
+        st.info(f"标签组【{selected_group}】下没有标签，请先去添加。")
+        conn.close()
+        return
+        
+    tag_names = tags_in_group['tag_name'].tolist()
+
+    st.divider()
+
+    # --- 2. 数据录入区 (双下拉框 + 自动覆盖) ---
+    with st.expander("📝 录入/修改 月度数据", expanded=False):
+        # 优雅的年月选择
+        today = datetime.now()
+        last_month_date = today.replace(day=1) - timedelta(days=1)
+        default_year = last_month_date.year
+        default_month = last_month_date.month
+
+        c_y, c_m, _ = st.columns([1, 1, 3])
+        with c_y:
+            sel_year = st.selectbox("年份", list(range(default_year - 5, default_year + 3)), index=5, key="perf_sel_year")
+        with c_m:
+            sel_month = st.selectbox("月份", range(1, 13), index=default_month - 1, key="perf_sel_month")
+
+        month_str = f"{sel_year}-{sel_month:02d}"
+        
+        # 预读取数据
+        existing_data = pd.read_sql('''
+            SELECT tag_name, amount FROM monthly_profits 
+            WHERE user_id = ? AND month = ? AND tag_group = ?
+        ''', conn, params=(user_id, month_str, selected_group))
+        data_map = dict(zip(existing_data['tag_name'], existing_data['amount']))
+        
+        existing_note = conn.execute('''
+            SELECT content FROM monthly_reviews 
+            WHERE user_id = ? AND month = ? AND tag_group = ?
+        ''', (user_id, month_str, selected_group)).fetchone()
+        note_val = existing_note['content'] if existing_note else ""
+
+        with st.form("perf_entry_form"):
+            st.caption(f"当前录入：{selected_group} - {month_str}")
+            cols = st.columns(3)
+            input_values = {}
+            
+            for i, tag in enumerate(tag_names):
+                col = cols[i % 3]
+                with col:
+                    input_values[tag] = st.number_input(
+                        tag, 
+                        value=float(data_map.get(tag, 0.0)), 
+                        step=100.0,
+                        format="%.2f",
+                        key=f"perf_{month_str}_{tag}"
+                    )
+            
+            st.write("")
+            new_note = st.text_area("📝 月度复盘 / 备注", value=note_val, height=80, placeholder="本月总结...")
+            
+            if st.form_submit_button("💾 保存 / 更新", type="primary", use_container_width=True):
+                try:
+                    for tag, amt in input_values.items():
+                        conn.execute('''
+                            INSERT INTO monthly_profits (user_id, month, tag_group, tag_name, amount, updated_at)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                            ON CONFLICT(user_id, month, tag_group, tag_name) 
+                            DO UPDATE SET amount=excluded.amount, updated_at=excluded.updated_at
+                        ''', (user_id, month_str, selected_group, tag, amt, datetime.now()))
+                    
+                    if new_note.strip():
+                        conn.execute('''
+                            INSERT INTO monthly_reviews (user_id, month, tag_group, content, updated_at)
+                            VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT(user_id, month, tag_group)
+                            DO UPDATE SET content=excluded.content, updated_at=excluded.updated_at
+                        ''', (user_id, month_str, selected_group, new_note, datetime.now()))
+                    else:
+                        conn.execute('DELETE FROM monthly_reviews WHERE user_id=? AND month=? AND tag_group=?', 
+                                   (user_id, month_str, selected_group))
+
+                    conn.commit()
+                    st.toast(f"✅ {month_str} 数据已保存！", icon="💾")
+                    import time
+                    time.sleep(0.5)
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"保存失败: {e}")
+
+    # --- 3. 战绩墙 (纯视觉卡片) ---
+    df_all = pd.read_sql('''
+        SELECT month, amount
+        FROM monthly_profits 
+        WHERE user_id = ? AND tag_group = ?
+        ORDER BY month DESC
+    ''', conn, params=(user_id, selected_group))
+    
+    # 因为 monthly_profits 是细分到 tag 的，我们需要先按 month 聚合总金额
+    if df_all.empty:
+        st.info(f"🏷️ 标签组【{selected_group}】暂无收益记录。")
+    else:
+        # 按月聚合
+        df_agg = df_all.groupby('month')['amount'].sum().reset_index().sort_values('month', ascending=False)
+        df_agg['year'] = df_agg['month'].str.slice(0, 4)
+        
+        unique_years = sorted(df_agg['year'].unique().tolist(), reverse=True)
+        
+        tabs = st.tabs([f"{y} 年度" for y in unique_years])
+        
+        for i, year in enumerate(unique_years):
+            with tabs[i]:
+                df_year = df_agg[df_agg['year'] == year]
+                
+                # A. 顶部统计
+                total_profit = df_year['amount'].sum()
+                
+                k1, k2, k3 = st.columns(3)
+                k1.metric("年度累计收益", f"¥{total_profit:,.2f}", delta_color="normal" if total_profit >= 0 else "inverse")
+                k2.metric("盈利月份", f"{len(df_year[df_year['amount']>0])} 个")
+                k3.metric("亏损月份", f"{len(df_year[df_year['amount']<0])} 个")
+                
+                st.divider()
+
+                # B. 月份色块矩阵
+                # 改为 6 列，让卡片看起来更窄
+                grid_cols = st.columns(6)
+                
+                for idx, row in enumerate(df_year.to_dict('records')):
+                    m_str = row['month']
+                    m_total = row['amount']
+                    
+                    # 颜色定义 (A股配色：红涨绿跌)
+                    # 使用柔和一点的色值，防止刺眼
+                    # 红: #e74c3c (Alizarin), 绿: #2ecc71 (Emerald), 灰: #95a5a6
+                    if m_total > 0:
+                        bg_color = "#e74c3c" 
+                        sign = "+"
+                    elif m_total < 0:
+                        bg_color = "#2ecc71" # 如果你习惯美股配色(绿涨红跌)，这里互换颜色即可
+                        sign = ""
+                    else:
+                        bg_color = "#95a5a6"
+                        sign = ""
+
+                    col_idx = idx % 6
+                    
+                    with grid_cols[col_idx]:
+                        # 使用 HTML/CSS 绘制卡片
+                        # height: 80px 加上 narrow column 实现了"高窄"视觉
+                        card_html = f"""
+                        <div style="
+                            background-color: {bg_color};
+                            color: white;
+                            padding: 10px 2px;
+                            border-radius: 6px;
+                            text-align: center;
+                            margin-bottom: 10px;
+                            height: 90px;
+                            display: flex;
+                            flex-direction: column;
+                            justify-content: center;
+                            align-items: center;
+                            box-shadow: 2px 2px 5px rgba(0,0,0,0.1);
+                        ">
+                            <div style="font-size: 0.85em; opacity: 0.9; margin-bottom: 4px;">{m_str}</div>
+                            <div style="font-size: 1.1em; font-weight: bold;">{sign}{m_total:,.0f}</div>
+                        </div>
+                        """
+                        st.markdown(card_html, unsafe_allow_html=True)
+
+    conn.close()
@@ -0,0 +1,223 @@
+"""
+📅 定投计划：计划维护与未来资金需求预测。
+"""
+import streamlit as st
+from datetime import datetime
+
+from core import get_db_connection, load_active_plans, project_plan_cashflows
+from services.db import save_changes_to_db
+from services.rates import get_rate_service
+from services.filters import NO_TAG_OPTION, get_asset_filter_index
+
+
+# --- 新增页面：定投计划与看板 ---
+def page_investment_plans():
+    import pandas as pd          # 👈 加上这句
+    import plotly.express as px  # 👈 加上这句
+    st.header("📅 定投计划与未来现金流")
+    user_id = st.session_state.user['user_id']
+    conn = get_db_connection()
+
+    tab1, tab2 = st.tabs(["⚙️ 计划管理", "🔮 未来现金流看板"])
+
+    # === TAB 1: 计划管理 (CRUD) ===
+    with tab1:
+        st.caption("在这里管理你的自动定投计划。注意：这里的金额是指【原币种】金额。")
+        
+        # 1. 新增计划表单 (带高级筛选)
+        with st.expander("➕ 新增定投计划", expanded=True):
+            
+            # --- A. 准备基础数据 ---
+            # 修改：同时读取 currency
+            all_assets = pd.read_sql('SELECT asset_id, name, code, currency FROM assets WHERE user_id = ?', conn, params=(user_id,))
+            
+            if all_assets.empty:
+                st.warning("⚠️ 请先去【资产与标签管理】页面添加至少一个资产。")
+            else:
+                # --- B. 筛选工具栏 (逻辑保持不变，略微省略以节省篇幅，直接使用) ---
+                st.markdown("##### 🔍 第一步：筛选资产")
+                f_col1, f_col2, f_col3 = st.columns([2, 1, 2])
+                with f_col1:
+                    filter_kw = st.text_input("关键字搜索", placeholder="名称/代码...", key="plan_filter_kw")
+                filter_index = get_asset_filter_index(user_id)
+                with f_col2:
+                    grp_list = ["(不筛选)"] + filter_index.groups
+                    sel_group = st.selectbox("标签组", grp_list, key="plan_filter_group")
+                with f_col3:
+                    sel_tags = []
+                    if sel_group != "(不筛选)":
+                        opts = [NO_TAG_OPTION] + filter_index.tags_by_group[sel_group]
+                        sel_tags = st.multiselect("标签状态", opts, key="plan_filter_tags")
+
+                # 筛选逻辑 (共用筛选索引)
+                final_assets = filter_index.filter(all_assets, filter_kw, None if sel_group == "(不筛选)" else sel_group, sel_tags).copy()
+                
+                st.divider()
+                st.markdown("##### 📝 第二步：设置定投参数")
+                
+                if final_assets.empty:
+                    st.info("没有符合筛选条件的资产。")
+                else:
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        # 格式化显示：加入币种信息
+                        sel_asset = st.selectbox(
+                            f"选择资产 (当前筛选出 {len(final_assets)} 个)", 
+                            options=final_assets['asset_id'], 
+                            format_func=lambda x: f"{final_assets[final_assets['asset_id']==x]['name'].values[0]} ({final_assets[final_assets['asset_id']==x]['currency'].values[0]})",
+                            key="plan_new_asset"
+                        )
+                        # 获取选中资产的币种，提示用户
+                        curr_symbol = final_assets[final_assets['asset_id']==sel_asset]['currency'].values[0]
+                        amount = st.number_input(f"每次定投金额 (单位: {curr_symbol})", min_value=0.0, step=100.0, key="plan_new_amount")
+                    
+                    with c2:
+                        freq = st.selectbox("频率", ["每周", "每月", "每天"], key="plan_new_freq")
+                        exec_day = 0
+                        if freq == "每周":
+                            weekdays = {0:"周一", 1:"周二", 2:"周三", 3:"周四", 4:"周五", 5:"周六", 6:"周日"}
+                            exec_day = st.selectbox("选择周几", options=list(weekdays.keys()), format_func=lambda x: weekdays[x], key="plan_new_day_week")
+                        elif freq == "每月":
+                            exec_day = st.number_input("选择每月几号", min_value=1, max_value=28, value=1, key="plan_new_day_month")
+
+                    st.write("") 
+                    
+                    if st.button("💾 保存定投计划", type="primary", key="btn_save_plan"):
+                        if amount <= 0:
+                            st.error("定投金额必须大于 0")
+                        else:
+                            try:
+                                conn.execute('''
+                                    INSERT INTO investment_plans (user_id, asset_id, amount, frequency, execution_day)
+                                    VALUES (?, ?, ?, ?, ?)
+                                ''', (user_id, sel_asset, amount, freq, exec_day))
+                                conn.commit()
+                                st.success(f"✅ 已添加定投计划！")
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"保存失败: {e}")
+
+        # 2. 现有计划列表
+        st.subheader("📋 正在运行的计划")
+        
+        # 修改：同时查出 assets 表的 currency
+        plans_df = pd.read_sql('''
+            SELECT p.plan_id, a.name, a.currency, p.amount, p.frequency, p.execution_day, p.is_active
+            FROM investment_plans p
+            JOIN assets a ON p.asset_id = a.asset_id
+            WHERE p.user_id = ?
+        ''', conn, params=(user_id,))
+
+        if not plans_df.empty:
+            def format_freq(row):
+                if row['frequency'] == '每天': return "每天"
+                if row['frequency'] == '每周': 
+                    ws = ["周一","周二","周三","周四","周五","周六","周日"]
+                    return f"每周 {ws[int(row['execution_day'])]}"
+                if row['frequency'] == '每月': return f"每月 {int(row['execution_day'])} 号"
+                return ""
+
+            plans_df['描述'] = plans_df.apply(format_freq, axis=1)
+            
+            edited_plans = st.data_editor(
+                plans_df,
+                column_config={
+                    "plan_id": st.column_config.NumberColumn("ID", disabled=True, width="small"),
+                    "name": st.column_config.TextColumn("资产名称", disabled=True),
+                    "currency": st.column_config.TextColumn("币种", disabled=True, width="small"),
+                    "amount": st.column_config.NumberColumn("金额 (原币)", format="%.2f"),
+                    "frequency": st.column_config.TextColumn("频率", disabled=True),
+                    "execution_day": None, 
+                    "描述": st.column_config.TextColumn("定投时间", disabled=True),
+                    "is_active": st.column_config.CheckboxColumn("启用中"),
+                },
+                hide_index=True,
+                use_container_width=True,
+                num_rows="dynamic",
+                key="plans_editor"
+            )
+            
+            if st.button("💾 保存计划变更"):
+                # --- 🔥 修复：剔除纯展示用的列，防止写入数据库报错 ---
+                # 'name', 'currency' 是从 assets 表联查出来的，'描述' 是前端计算的
+                # 数据库表 investment_plans 里没有这些字段
+                cols_to_drop = ['name', 'currency', '描述']
+                
+                # 过滤掉这些列，只保留数据库表里有的字段 (如 amount, frequency, execution_day, is_active)
+                df_to_save = edited_plans.drop(columns=[c for c in cols_to_drop if c in edited_plans.columns])
+                
+                if save_changes_to_db(df_to_save, plans_df, 'investment_plans', 'plan_id', user_id, fixed_cols={'user_id':user_id}):
+                    st.rerun()
+        else:
+            st.info("暂无定投计划。")
+
+    # === TAB 2: 现金流看板 (核心修改) ===
+    with tab2:
+        # 1. 计算未来现金流逻辑
+        st.subheader("🗓️ 未来 30 天资金需求推演 (折合人民币)")
+        
+        # 获取最新汇率表
+        rates_map = get_rate_service().latest_map()
+        
+        # 获取所有启用的计划 (包含币种) 与资产标签
+        active_plans, asset_tags = load_active_plans(user_id)
+
+        if active_plans.empty:
+            st.info("请先启用至少一个定投计划。")
+        else:
+            df_proj = project_plan_cashflows(active_plans, rates_map, datetime.now().date(), future_days=30)
+
+            if df_proj.empty:
+                st.warning("未来30天内没有匹配的定投日。")
+            else:
+                # --- 可视化 A: 总览 (CNY) ---
+                total_needed = df_proj['amount_cny'].sum()
+                col1, col2 = st.columns(2)
+                col1.metric("未来 30 天总定投 (CNY)", f"¥{total_needed:,.2f}")
+                col2.metric("平均每日流出 (CNY)", f"¥{total_needed/30:,.2f}")
+
+                st.divider()
+
+                # --- 可视化 B: 堆叠柱状图 ---
+                all_groups = asset_tags['tag_group'].unique().tolist() if not asset_tags.empty else []
+                dim_options = ["按具体资产"] + all_groups
+                selected_dim = st.selectbox("选择分析维度 (堆叠方式)", dim_options)
+                
+                df_viz = df_proj.copy()
+                
+                if selected_dim == "按具体资产":
+                    df_viz['category'] = df_viz['asset_name']
+                else:
+                    tags_in_group = asset_tags[asset_tags['tag_group'] == selected_dim]
+                    df_viz = pd.merge(df_viz, tags_in_group, on='asset_id', how='left')
+                    df_viz['tag_name'] = df_viz['tag_name'].fillna('未分类')
+                    df_viz['category'] = df_viz['tag_name']
+
+                # 按 amount_cny 聚合
+                df_agg = df_viz.groupby(['date', 'category'])['amount_cny'].sum().reset_index()
+                
+                daily_totals = df_agg.groupby('date')['amount_cny'].transform('sum')
+                df_agg['share'] = (df_agg['amount_cny'] / daily_totals) * 100
+
+                fig = px.bar(
+                    df_agg, 
+                    x='date', 
+                    y='amount_cny', 
+                    color='category',
+                    title=f"未来 30 天每日定投分布 ({selected_dim}) - 折合人民币",
+                    labels={'amount_cny': '金额 (CNY)', 'date': '日期', 'category': '类别'},
+                    custom_data=['share'] 
+                )
+                
+                fig.update_traces(
+                    hovertemplate='<b>%{fullData.name}</b>: ¥%{y:,.0f} (%{customdata[0]:.1f}%)<extra></extra>'
+                )
+                
+                fig.update_layout(
+                    hovermode="x unified",
+                    legend_title_text="" 
+                )
+                
+                st.plotly_chart(fig, use_container_width=True)
+
+    conn.close()
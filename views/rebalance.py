@@ -0,0 +1,195 @@
+"""
+⚖️ 投资再平衡：按目标比例计算调仓金额。
+"""
+import streamlit as st
+
+from core import get_db_connection, latest_tag_portfolio, load_rebalance_targets, rebalance_plan, REBALANCE_MIN_TRADE
+from services.analytics import get_cached_analytics_data
+
+
+def page_rebalance():
+    import pandas as pd            # 👈 加上这句
+    import plotly.graph_objects as go  # 👈 加上这句
+    st.header("⚖️ 投资组合再平衡助手")
+    st.caption("设定你的理想资产配比，系统将计算如何调整仓位以维持风险平衡。")
+    
+    user_id = st.session_state.user['user_id']
+    conn = get_db_connection()
+
+    # --- 1. 选择要进行再平衡的维度 ---
+    # 通常我们只对大的维度做再平衡，比如 "资产大类" (股/债/金) 或 "风险等级"
+    all_groups = pd.read_sql("SELECT DISTINCT tag_group FROM tags WHERE user_id = ?", conn, params=(user_id,))
+    
+    if all_groups.empty:
+        st.warning("请先去设置标签。")
+        conn.close()
+        return
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        # 默认尝试选中 "资产大类" 或 "风险等级"，如果没有就选第一个
+        default_idx = 0
+        groups_list = all_groups['tag_group'].tolist()
+        if "资产大类" in groups_list: default_idx = groups_list.index("资产大类")
+        elif "风险等级" in groups_list: default_idx = groups_list.index("风险等级")
+        
+        selected_group = st.selectbox("选择配置维度", groups_list, index=default_idx)
+
+    # --- 2. 获取当前持仓数据 (Real) ---
+    _, df_tags = get_cached_analytics_data(user_id)
+    
+    if df_tags is None or df_tags.empty:
+        st.info("暂无资产数据。")
+        conn.close()
+        return
+
+    # 过滤出当前维度的最新数据 (总资产按 CNY 计)
+    current_portfolio, total_asset_val = latest_tag_portfolio(df_tags, selected_group)
+
+    # --- 3. 获取/设置目标配置 (Target) ---
+    # 合并：标签名 + 现有目标 + 当前持仓
+    df_editor = load_rebalance_targets(user_id, selected_group)
+    
+    # 关联当前实际持仓占比，方便参考
+    current_portfolio['actual_percentage'] = (current_portfolio['amount'] / total_asset_val * 100)
+    df_editor = pd.merge(df_editor, current_portfolio[['tag_name', 'actual_percentage']], on='tag_name', how='left')
+    df_editor['actual_percentage'] = df_editor['actual_percentage'].fillna(0.0)
+    
+    st.divider()
+    
+    c_edit, c_chart = st.columns([2, 3])
+    
+    with c_edit:
+        st.subheader("🎯 设定目标比例")
+        st.caption("请直接在表格中修改【目标占比】，总和应为 100%。最小交易额填 0 表示用下方的默认值。")
+        
+        edited_df = st.data_editor(
+            df_editor[['tag_name', 'target_percentage', 'actual_percentage', 'min_trade']],
+            column_config={
+                "tag_name": st.column_config.TextColumn("类别", disabled=True),
+                "target_percentage": st.column_config.NumberColumn("目标占比 (%)", min_value=0, max_value=100, step=1.0, required=True),
+                "actual_percentage": st.column_config.NumberColumn("当前占比 (%)", disabled=True, format="%.2f%%"),
+                "min_trade": st.column_config.NumberColumn("最小交易额 (元)", min_value=0, step=100.0, format="%.0f"),
+            },
+            hide_index=True,
+            use_container_width=True,
+            key=f"rebalance_editor_{selected_group}"
+        )
+        
+        current_sum = edited_df['target_percentage'].sum()
+        if abs(current_sum - 100) > 0.01:
+            st.warning(f"⚠️ 当前目标总和为 {current_sum:.2f}%，请调整至 100%。")
+        else:
+            if st.button("💾 保存配置", type="primary"):
+                # 保存逻辑
+                try:
+                    conn.execute("DELETE FROM rebalance_targets WHERE user_id = ? AND tag_group = ?", (user_id, selected_group))
+                    for _, row in edited_df.iterrows():
+                        min_trade = 0.0 if pd.isna(row['min_trade']) else float(row['min_trade'])
+                        if row['target_percentage'] > 0 or min_trade > 0:
+                            conn.execute(
+                                "INSERT INTO rebalance_targets (user_id, tag_group, tag_name, target_percentage, min_trade) VALUES (?, ?, ?, ?, ?)",
+                                (user_id, selected_group, row['tag_name'], row['target_percentage'], min_trade)
+                            )
+                    conn.commit()
+                    st.success("配置已保存！")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"保存失败: {e}")
+
+    # --- 4. 计算与展示再平衡建议 ---
+    if abs(current_sum - 100) <= 0.01:
+        with c_chart:
+            st.subheader("📊 偏差分析")
+            
+            # 准备绘图数据
+            # 比较 Target vs Actual
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                x=edited_df['tag_name'],
+                y=edited_df['actual_percentage'],
+                name='当前实际',
+                marker_color='#95A5A6'
+            ))
+            fig.add_trace(go.Bar(
+                x=edited_df['tag_name'],
+                y=edited_df['target_percentage'],
+                name='理想目标',
+                marker_color='#3498DB'
+            ))
+            fig.update_layout(barmode='group', title=f"实际 vs 目标 ({selected_group})", hovermode="x unified")
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.divider()
+        st.subheader("💊 再平衡操作建议")
+
+        o1, o2, o3, o4 = st.columns(4)
+        with o1:
+            mode = st.radio("调仓方式", ["买卖都做", "只用新增资金"], horizontal=True, key="rebalance_mode",
+                            help="只用新增资金：不卖出任何持仓，新钱优先补给低配最多的类别")
+        with o2:
+            new_cash = st.number_input("新增资金 (元)", min_value=0.0, value=0.0, step=1000.0, key="rebalance_cash")
+        with o3:
+            band_pct = st.number_input("容忍带 (± 百分点)", min_value=0.0, max_value=50.0, value=0.0, step=1.0, key="rebalance_band",
+                                       help="占比偏离目标不超过这个范围就不动；越界的只拉回到区间边界，成交额最小")
+        with o4:
+            default_min = st.number_input("默认最小交易额 (元)", min_value=0.0, value=REBALANCE_MIN_TRADE, step=100.0, key="rebalance_min",
+                                          help="低于它的零碎单不做，钱会重新分给其他类别")
+
+        allow_sell = mode == "买卖都做"
+        if not allow_sell and new_cash <= 0:
+            st.info("只用新增资金调仓时，请先填写新增资金。")
+        df_calc, cash_left = rebalance_plan(edited_df, current_portfolio, total_asset_val,
+                                            band_pct, new_cash, allow_sell, default_min)
+        st.caption(f"基于当前总资产折合人民币：¥{total_asset_val:,.2f}" + (f" + 新增资金 ¥{new_cash:,.2f}" if new_cash else ""))
+
+        # 分类建议
+        to_buy = df_calc[df_calc['trade_amount'] > 0.5].sort_values('trade_amount', ascending=False)
+        to_sell = df_calc[df_calc['trade_amount'] < -0.5].sort_values('trade_amount', ascending=True)
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("买入合计", f"¥{to_buy['trade_amount'].sum():,.0f}")
+        m2.metric("卖出合计", f"¥{abs(to_sell['trade_amount'].sum()):,.0f}")
+        m3.metric("调仓后达标类别", f"{int(df_calc['in_band'].sum())} / {len(df_calc)}")
+        m4.metric("剩余现金" if cash_left > -0.5 else "资金缺口", f"¥{abs(cash_left):,.0f}")
+        
+        col_buy, col_sell = st.columns(2)
+        
+        with col_buy:
+            if not to_buy.empty:
+                st.success("🔵 建议买入 / 加仓")
+                for _, row in to_buy.iterrows():
+                    st.markdown(f"**{row['tag_name']}**: 需买入 **¥{row['trade_amount']:,.0f}**")
+                    st.progress(min(1.0, row['amount'] / row['target_amount']) if row['target_amount']>0 else 0)
+            else:
+                st.write("✅ 无需买入")
+
+        with col_sell:
+            if not to_sell.empty:
+                st.error("🔴 建议卖出 / 减仓")
+                for _, row in to_sell.iterrows():
+                    sell_val = abs(row['trade_amount'])
+                    st.markdown(f"**{row['tag_name']}**: 需卖出 **¥{sell_val:,.0f}**")
+                    # 进度条展示超配程度
+                    over_ratio = (row['amount'] - row['target_amount']) / row['target_amount'] if row['target_amount']>0 else 1
+                    st.progress(min(1.0, over_ratio))
+            else:
+                st.write("✅ 无需卖出")
+
+        with st.expander("📋 调仓后占比明细"):
+            st.dataframe(
+                df_calc[['tag_name', 'amount', 'trade_amount', 'post_amount', 'target_percentage', 'post_pct', 'in_band']],
+                column_config={
+                    "tag_name": "类别",
+                    "amount": st.column_config.NumberColumn("当前金额", format="¥%.0f"),
+                    "trade_amount": st.column_config.NumberColumn("交易额", format="¥%.0f"),
+                    "post_amount": st.column_config.NumberColumn("调仓后金额", format="¥%.0f"),
+                    "target_percentage": st.column_config.NumberColumn("目标占比", format="%.2f%%"),
+                    "post_pct": st.column_config.NumberColumn("调仓后占比", format="%.2f%%"),
+                    "in_band": st.column_config.CheckboxColumn("在容忍带内"),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
+    conn.close()
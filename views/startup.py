@@ -0,0 +1,72 @@
+"""
+🩺 启动诊断：每次运行的分阶段耗时 (含进程冷启动那一次) + 模块导入耗时拆解。
+"""
+import streamlit as st
+import os
+
+import startup_profile
+from services.startup import FIRST_PAINT_PHASE, get_startup_log
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 子进程在项目根目录下导入 core 等模块
+
+
+def _phase_frame(run):
+    import pandas as pd
+
+    df = pd.DataFrame(run['phases'], columns=['阶段', '耗时 (ms)'])
+    df['占比'] = df['耗时 (ms)'] / max(run['total_ms'], 1e-9) * 100
+    return df
+
+def _first_paint_ms(run):
+    total = 0.0
+    for name, ms in run['phases']:
+        total += ms
+        if name == FIRST_PAINT_PHASE:
+            break
+    return total
+
+def page_startup_profile():
+    import pandas as pd
+    st.header("🩺 启动诊断")
+    log = get_startup_log()
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("服务进程启动于", log.process_started.strftime('%m-%d %H:%M:%S'))
+    if log.cold:
+        c2.metric("冷启动首屏耗时", f"{_first_paint_ms(log.cold):,.0f} ms",
+                  help="本进程第一次运行：从脚本开始 (含导入模块) 到侧边栏画完")
+    if log.recent:
+        last = log.recent[-1]
+        c3.metric("上一次运行首屏耗时", f"{_first_paint_ms(last):,.0f} ms", help=f"{last['label']}，整页 {last['total_ms']:,.0f} ms")
+
+    pct_col = st.column_config.ProgressColumn("占比", format="%.0f%%", min_value=0, max_value=100)
+    if log.cold:
+        st.subheader("❄️ 冷启动各阶段")
+        st.caption(f"{log.cold['at'].strftime('%H:%M:%S')} · {log.cold['label']} · 整页 {log.cold['total_ms']:,.0f} ms")
+        st.dataframe(_phase_frame(log.cold), hide_index=True, use_container_width=True,
+                     column_config={'耗时 (ms)': st.column_config.NumberColumn(format="%.1f"), '占比': pct_col})
+
+    if log.recent:
+        st.subheader("🔁 最近的运行")
+        df_recent = pd.DataFrame([{
+            '时间': r['at'].strftime('%H:%M:%S'), '页面': r['label'],
+            '首屏 (ms)': _first_paint_ms(r), '整页 (ms)': r['total_ms'],
+            **{name: ms for name, ms in r['phases']},
+        } for r in reversed(log.recent)])
+        st.dataframe(df_recent, hide_index=True, use_container_width=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.1f")
+                                    for c in df_recent.columns if c not in ('时间', '页面')})
+
+    st.subheader("📦 模块导入耗时")
+    st.caption("在一个全新的 Python 进程里用 `-X importtime` 依次导入，先导入的模块已带进来的依赖不重复计时。"
+               "“延迟导入”的模块只在页面函数里用到时才加载，不占首屏时间。")
+    if st.button("🔬 分析导入耗时", key="btn_profile_imports"):
+        with st.spinner("正在新进程里导入各模块..."):
+            st.session_state['import_profile'] = startup_profile.profile_imports(cwd=PROJECT_DIR)
+    rows = st.session_state.get('import_profile')
+    if rows:
+        df_imp = pd.DataFrame(rows, columns=['模块', '分组', '自身 (ms)', '累计 (ms)'])
+        st.dataframe(df_imp, hide_index=True, use_container_width=True,
+                     column_config={'自身 (ms)': st.column_config.NumberColumn(format="%.1f"),
+                                    '累计 (ms)': st.column_config.ProgressColumn(
+                                        format="%.0f ms", min_value=0, max_value=float(df_imp['累计 (ms)'].max()))})